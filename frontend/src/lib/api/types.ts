@@ -506,10 +506,16 @@ export interface ConversationSummary {
   updated_at: string | null;
   message_count: number;
   preview: string;
+  /** Best-matching message excerpt (search results only), terms wrapped in `**`. */
+  snippet?: string | null;
+  match_message_id?: number | null;
+  /** Keyset cursor for fetching the page after this row. */
+  cursor?: string;
 }
 
 export interface ConversationListResponse {
   conversations: ConversationSummary[];
+  next_cursor?: string | null;
 }
 
 export interface SessionMessagesResponse {
@@ -532,8 +538,14 @@ export interface SessionMessagesResponse {
     tool_call_id?: string;
     created_at?: string;
     created_at_utc?: string;
+    /** Set when a tool result was shortened (`tool_result_max_chars`). */
+    content_truncated?: boolean;
+    content_length?: number;
     [key: string]: unknown;
   }>;
+  /** Present for paginated requests (`limit`). */
+  has_more?: boolean;
+  next_before_id?: number | null;
 }
 
 export interface SaveSessionResponse {
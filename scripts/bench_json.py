@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Benchmark the backend JSON layer against the standard library.
+
+Usage:
+    python scripts/bench_json.py [--iterations N]
+
+Times encode and decode of payloads shaped like the hot paths (an SSE delta
+chunk, a metadata event, stored message metadata and a model catalog) with
+``json`` defaults and with ``backend.utils.fast_json``. Install ``orjson``
+to measure the fast backend; without it both columns use the stdlib.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+# Add src to path for imports
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+SRC_DIR = PROJECT_ROOT / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from backend.utils import fast_json
+
+
+def build_payloads() -> dict[str, object]:
+    """Return representative payloads keyed by name."""
+
+    sse_chunk = {
+        "id": "gen-1234567890",
+        "model": "openai/gpt-4o-mini",
+        "choices": [{"index": 0, "delta": {"content": "Hello, wörld! "}}],
+    }
+    metadata_event = {
+        "type": "metadata",
+        "session_id": "c0ffee00-0000-4000-8000-000000000000",
+        "usage": {"prompt_tokens": 1834, "completion_tokens": 412, "cost": 0.00123},
+        "routing": {"provider": "OpenAI", "latency_ms": 412.5},
+        "tool_calls": [
+            {"id": f"call_{i}", "name": "search", "arguments": {"q": "x" * 40}}
+            for i in range(4)
+        ],
+    }
+    message_metadata = {
+        "attachments": [
+            {"attachment_id": f"att-{i}", "mime_type": "image/png", "size": 20480}
+            for i in range(3)
+        ],
+        "reasoning": [{"type": "reasoning.text", "text": "step " * 200}],
+    }
+    catalog = {
+        "data": [
+            {
+                "id": f"vendor/model-{i}",
+                "name": f"Model {i}",
+                "context_length": 128000,
+                "pricing": {"prompt": "0.000001", "completion": "0.000002"},
+                "architecture": {
+                    "input_modalities": ["text", "image"],
+                    "output_modalities": ["text"],
+                },
+                "supported_parameters": ["tools", "temperature", "max_tokens"],
+                "description": "A general purpose model. " * 10,
+            }
+            for i in range(400)
+        ]
+    }
+    return {
+        "sse_chunk": sse_chunk,
+        "metadata_event": metadata_event,
+        "message_metadata": message_metadata,
+        "model_catalog": catalog,
+    }
+
+
+def bench(func, iterations: int) -> float:
+    """Return microseconds per call (best of three runs)."""
+
+    best = min(timeit.repeat(func, number=iterations, repeat=3))
+    return best / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"fast_json backend: {fast_json.JSON_BACKEND}")
+    header = f"{'payload':<18}{'op':<8}{'json µs':>12}{'fast µs':>12}{'speedup':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for name, payload in build_payloads().items():
+        iterations = (
+            max(1, args.iterations // 50)
+            if name == "model_catalog"
+            else args.iterations
+        )
+        text = json.dumps(payload)
+        cases = (
+            ("dumps", lambda: json.dumps(payload), lambda: fast_json.dumps(payload)),
+            ("loads", lambda: json.loads(text), lambda: fast_json.loads(text)),
+        )
+        for op, baseline, candidate in cases:
+            base_us = bench(baseline, iterations)
+            fast_us = bench(candidate, iterations)
+            print(
+                f"{name:<18}{op:<8}{base_us:>12.2f}{fast_us:>12.2f}"
+                f"{base_us / fast_us:>9.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Convert the chat database to incremental auto-vacuum.
+
+Usage:
+    python scripts/compact_chat_db.py [--database PATH]
+
+Databases created before incremental auto-vacuum was enabled keep their free
+pages after sessions are archived. This rewrites the file once with a full
+``VACUUM`` so the archive job can release space incrementally from then on.
+The rewrite holds the write lock throughout: stop the backend first.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+SRC_DIR = PROJECT_ROOT / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from backend.repository import ChatRepository
+
+
+async def compact(database_path: Path) -> None:
+    repository = ChatRepository(database_path, read_pool_size=1)
+    await repository.initialize()
+    try:
+        before = database_path.stat().st_size
+        if await repository.enable_incremental_vacuum():
+            after = database_path.stat().st_size
+            print(f"Converted {database_path}: {before:,} -> {after:,} bytes")
+        else:
+            await repository.compact_storage()
+            print(f"{database_path} already uses incremental auto-vacuum")
+    finally:
+        await repository.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--database",
+        type=Path,
+        default=PROJECT_ROOT / "data" / "chat_sessions.db",
+        help="Chat database path (default: data/chat_sessions.db)",
+    )
+    args = parser.parse_args()
+    if not args.database.exists():
+        parser.error(f"{args.database} does not exist")
+    asyncio.run(compact(args.database))
+
+
+if __name__ == "__main__":
+    main()
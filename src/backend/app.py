@@ -5,6 +5,7 @@ from __future__ import annotations
 import asyncio
 import logging
 from contextlib import asynccontextmanager, suppress
+from datetime import timedelta
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -33,14 +34,26 @@ from .routers.uploads import router as uploads_router
 from .routers.weather import router as weather_router
 from .services.alarm_repository import AlarmRepository
 from .services.alarm_scheduler import AlarmSchedulerService
+from .services.attachment_storage import (
+    STORAGE_BACKEND_LOCAL,
+    LocalAttachmentStorage,
+    set_attachment_storage,
+    set_local_storage,
+)
+from .services.attachment_urls import run_signed_url_refresher
 from .services.attachments import AttachmentService
 from .services.attachments_cleanup import cleanup_expired_attachments
 from .services.client_profiles import ClientProfileService
 from .services.client_tool_preferences import ClientToolPreferences
+from .services.gcs import shutdown_executor as shutdown_gcs_executor
+from .services.image_derivatives import shutdown_pool as shutdown_image_pool
 from .services.mcp_management import MCPManagementService
 from .services.mcp_server_settings import MCPServerSettingsService
+from .services.model_registry import ModelRegistry, set_model_registry
 from .services.model_settings import ModelSettingsService
+from .services.session_archive import archive_inactive_sessions
 from .services.suggestions import SuggestionsService
+from .utils.fast_json import FastJSONResponse
 
 
 def _configure_logging() -> None:
@@ -152,6 +165,14 @@ def create_app() -> FastAPI:
     orchestrator.set_tool_preferences(client_tool_preferences)
     orchestrator.set_mcp_management(mcp_management_service)
 
+    # Records written to disk stay readable whichever backend is configured.
+    local_storage = LocalAttachmentStorage(
+        _resolve_under(project_root, settings.attachments_local_dir),
+        public_base_url=settings.attachments_public_base_url,
+    )
+    set_local_storage(local_storage)
+    if settings.attachments_storage_backend == STORAGE_BACKEND_LOCAL:
+        set_attachment_storage(local_storage)
     attachment_service = AttachmentService(
         orchestrator.repository,
         max_size_bytes=settings.attachments_max_size_bytes,
@@ -160,9 +181,17 @@ def create_app() -> FastAPI:
     orchestrator.set_attachment_service(attachment_service)
     orchestrator.set_profile_service(client_profile_service)
 
+    model_registry = ModelRegistry(
+        cache_path=_resolve_under(project_root, settings.model_catalog_cache_path)
+    )
+    set_model_registry(model_registry)
+
     cleanup_interval_hours = max(1, min(24, settings.attachments_retention_days or 1))
     cleanup_interval_seconds = cleanup_interval_hours * 3600
     cleanup_task: asyncio.Task | None = None
+    signed_url_refresh_task: asyncio.Task | None = None
+    archive_task: asyncio.Task | None = None
+    archive_interval_seconds = 6 * 3600
 
     # Alarm scheduler setup
     alarms_db_path = _resolve_under(project_root, Path("data/alarms.db"))
@@ -182,9 +211,24 @@ def create_app() -> FastAPI:
             except asyncio.CancelledError:
                 raise
 
+    async def _session_archive_loop() -> None:
+        older_than = timedelta(days=settings.chat_archive_after_days)
+        while True:
+            try:
+                await archive_inactive_sessions(
+                    orchestrator.repository,
+                    orchestrator.session_archive,
+                    older_than=older_than,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logging.warning("Session archive run failed: %s", exc)
+            await asyncio.sleep(archive_interval_seconds)
+
     @asynccontextmanager
     async def lifespan(app: FastAPI):
-        nonlocal cleanup_task
+        nonlocal cleanup_task, signed_url_refresh_task, archive_task
         await orchestrator.initialize()
 
         # Initialize alarm scheduler (loads pending alarms from DB)
@@ -216,13 +260,23 @@ def create_app() -> FastAPI:
         except Exception as exc:
             logging.warning("Initial attachment cleanup failed: %s", exc)
         cleanup_task = asyncio.create_task(_attachment_cleanup_loop())
+        signed_url_refresh_task = asyncio.create_task(
+            run_signed_url_refresher(
+                orchestrator.repository, ttl=settings.attachment_signed_url_ttl
+            )
+        )
+        if settings.chat_archive_after_days > 0:
+            archive_task = asyncio.create_task(_session_archive_loop())
+        model_registry.start_background_refresh(orchestrator.get_openrouter_client())
         try:
             yield
         finally:
-            if cleanup_task is not None:
-                cleanup_task.cancel()
-                with suppress(asyncio.CancelledError):
-                    await cleanup_task
+            await model_registry.stop_background_refresh()
+            for task in (cleanup_task, signed_url_refresh_task, archive_task):
+                if task is not None:
+                    task.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await task
             # Shutdown alarm scheduler
             try:
                 await asyncio.wait_for(alarm_scheduler.shutdown(), timeout=5.0)
@@ -230,6 +284,14 @@ def create_app() -> FastAPI:
                 logging.warning("Alarm scheduler shutdown timed out after 5s")
             except Exception as exc:
                 logging.warning("Error during alarm scheduler shutdown: %s", exc)
+            shutdown_gcs_executor()
+            shutdown_image_pool()
+            tts_service = getattr(app.state, "tts_service", None)
+            if tts_service is not None:
+                try:
+                    await tts_service.aclose()
+                except Exception as exc:
+                    logging.warning("Error closing TTS connection pool: %s", exc)
             # Add timeout to prevent hanging during shutdown (especially in tests)
             try:
                 await asyncio.wait_for(orchestrator.shutdown(), timeout=10.0)
@@ -243,6 +305,7 @@ def create_app() -> FastAPI:
         version="0.1.0",
         description="Streaming chat backend powered by OpenRouter and MCP.",
         lifespan=lifespan,
+        default_response_class=FastJSONResponse,
     )
 
     app.state.model_settings_service = model_settings_service
@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
 import uuid
 from pathlib import Path
@@ -19,12 +18,16 @@ from ..openrouter import OpenRouterClient
 from ..repository import ChatRepository
 from ..schemas.chat import ChatCompletionRequest
 from ..services.attachment_urls import refresh_message_attachments
+from ..services.image_derivatives import VARIANT_MODEL
 from ..services.conversation_logging import ConversationLogWriter, MemoryBackupLogger
 from ..services.mcp_server_settings import MCPServerSettingsService
 from ..services.model_settings import ModelSettingsService
+from ..services.session_archive import SessionArchive, restore_archived_session
 from ..services.time_context import build_prompt_context_block, create_time_snapshot
+from ..utils import fast_json
 from .mcp_registry import MCPToolAggregator
 from .streaming import SseEvent, StreamingHandler
+from .streaming.context_window import ContextWindow
 
 if TYPE_CHECKING:
     from ..config import Settings
@@ -78,7 +81,13 @@ class ChatOrchestrator:
         if not db_path.is_absolute():
             db_path = project_root / db_path
 
-        self._repo = ChatRepository(db_path)
+        self._repo = ChatRepository(
+            db_path, storage_format=settings.chat_storage_format
+        )
+        archive_path = settings.chat_archive_path
+        if not archive_path.is_absolute():
+            archive_path = project_root / archive_path
+        self._archive = SessionArchive(archive_path)
         self._client = OpenRouterClient(settings)
         self._mcp_client = MCPToolAggregator(
             [],
@@ -110,6 +119,16 @@ class ChatOrchestrator:
             model_settings=model_settings,
             conversation_logger=self._conversation_logger,
             memory_backup_logger=self._memory_backup_logger,
+            context_window=(
+                ContextWindow(
+                    budget_ratio=settings.context_budget_ratio,
+                    default_budget_tokens=settings.context_default_budget_tokens,
+                    keep_recent_turns=settings.context_keep_recent_turns,
+                    keep_recent_tool_results=settings.context_keep_recent_tool_results,
+                )
+                if settings.context_compaction_enabled
+                else None
+            ),
         )
         self._settings = settings
         self._init_lock = asyncio.Lock()
@@ -138,6 +157,7 @@ class ChatOrchestrator:
                 return
 
             await self._repo.initialize()
+            await self._archive.initialize()
 
             # Connect to configured MCP servers and discover new ones
             # on known hosts. Servers are external (always-on).
@@ -181,6 +201,11 @@ class ChatOrchestrator:
         except (asyncio.TimeoutError, Exception) as exc:
             logger.warning("Error closing repository: %s", exc)
 
+        try:
+            await asyncio.wait_for(self._archive.close(), timeout=2.0)
+        except (asyncio.TimeoutError, Exception) as exc:
+            logger.warning("Error closing session archive: %s", exc)
+
         self._ready.clear()
 
     async def wait_until_ready(self) -> None:
@@ -194,6 +219,23 @@ class ChatOrchestrator:
 
         return self._repo
 
+    @property
+    def session_archive(self) -> SessionArchive:
+        """Expose the archive of idle sessions moved out of the repository."""
+
+        return self._archive
+
+    async def restore_archived_session(self, session_id: str) -> bool:
+        """Bring an archived session back; False when it is not archived."""
+
+        try:
+            return await restore_archived_session(
+                self._repo, self._archive, session_id
+            )
+        except Exception as exc:
+            logger.warning("Failed to restore archived session %s: %s", session_id, exc)
+            return False
+
     def set_attachment_service(self, service: "AttachmentService | None") -> None:
         """Inject the attachment service after application startup wiring."""
 
@@ -262,6 +304,8 @@ class ChatOrchestrator:
 
         session_id = request.session_id or uuid.uuid4().hex
         existing = await self._repo.session_exists(session_id)
+        if not existing and request.session_id:
+            existing = await self.restore_archived_session(session_id)
         await self._repo.ensure_session(session_id)
 
         request_metadata = (
@@ -276,7 +320,9 @@ class ChatOrchestrator:
 
         client_id = self._resolve_client_id(session_id, request_metadata)
         model_settings = self._get_model_settings_for_client(client_id)
-        stored_messages = await self._repo.get_messages(session_id)
+        stored_messages = await self._repo.get_messages(
+            session_id, include_details=False
+        )
         system_messages = [
             message for message in stored_messages if message.get("role") == "system"
         ]
@@ -334,11 +380,14 @@ class ChatOrchestrator:
             if attachment_ids:
                 await self._repo.mark_attachments_used(session_id, attachment_ids)
 
-        conversation = await self._repo.get_messages(session_id)
+        conversation = await self._repo.get_messages(
+            session_id, include_details=False
+        )
         conversation = await refresh_message_attachments(
             conversation,
             self._repo,
             ttl=self._settings.attachment_signed_url_ttl,
+            variant=VARIANT_MODEL,
         )
 
         # Reconnect configured MCP servers if none connected yet
@@ -399,7 +448,7 @@ class ChatOrchestrator:
         if not existing:
             yield {
                 "event": "session",
-                "data": json.dumps({"session_id": session_id}),
+                "data": fast_json.dumps({"session_id": session_id}),
             }
 
         async for event in self._streaming.stream_conversation(
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
 import binascii
 import logging
@@ -11,7 +12,7 @@ from urllib.parse import unquote_to_bytes
 import httpx
 
 from ...config import get_settings
-from ...services.attachments import AttachmentService
+from ...services.attachments import AttachmentService, sniff_mime_from_bytes
 from .messages import deep_copy_jsonable
 
 
@@ -122,7 +123,7 @@ async def persist_image_fragment(
         data_bytes,
         mime_type,
         filename_hint,
-    ) = extract_image_payload(fragment)
+    ) = await asyncio.to_thread(extract_image_payload, fragment)
 
     if image_payload is not None:
         logger.debug(
@@ -249,28 +250,33 @@ async def normalize_structured_fragments(
 ) -> tuple[list[Any], list[str], bool]:
     """Persist image fragments and report whether content mutated."""
 
-    normalized: list[Any] = []
+    normalized: list[Any] = list(fragments)
     created_ids: list[str] = []
     mutated = False
 
-    for fragment in fragments:
-        if isinstance(fragment, dict):
-            processed, attachment_id = await process_assistant_fragment(
-                fragment,
+    # Images are decoded, downloaded and uploaded concurrently; results are
+    # placed back at their original positions.
+    positions = [
+        index for index, fragment in enumerate(fragments) if isinstance(fragment, dict)
+    ]
+    results = await asyncio.gather(
+        *(
+            process_assistant_fragment(
+                fragments[index],
                 session_id,
                 attachment_service,
                 http_client,
             )
-            if processed is not None:
-                normalized.append(processed)
-                if processed is not fragment:
-                    mutated = True
-            else:
-                normalized.append(fragment)
-            if attachment_id:
-                created_ids.append(attachment_id)
-        else:
-            normalized.append(fragment)
+            for index in positions
+        )
+    )
+    for index, (processed, attachment_id) in zip(positions, results):
+        if processed is not None:
+            normalized[index] = processed
+            if processed is not fragments[index]:
+                mutated = True
+        if attachment_id:
+            created_ids.append(attachment_id)
 
     return normalized, created_ids, mutated
 
@@ -394,26 +400,6 @@ async def download_image(
         return data, mime
 
 
-def sniff_mime_from_bytes(data: bytes) -> str | None:
-    """Guess image mime type from magic bytes for common formats."""
-
-    if not data or len(data) < 12:
-        return None
-    if data.startswith(b"\x89PNG\r\n\x1a\n"):
-        return "image/png"
-    if data[:3] == b"\xff\xd8\xff":
-        return "image/jpeg"
-    if data.startswith(b"GIF87a") or data.startswith(b"GIF89a"):
-        return "image/gif"
-    if data.startswith(b"RIFF") and data[8:12] == b"WEBP":
-        return "image/webp"
-    if data.startswith(b"BM"):
-        return "image/bmp"
-    if b"ftypheic" in data[:64] or b"ftypheif" in data[:64]:
-        return "image/heic"
-    return None
-
-
 def extract_image_payload(
     fragment: dict[str, Any],
 ) -> tuple[dict[str, Any] | None, str, bytes | None, str | None, str | None]:
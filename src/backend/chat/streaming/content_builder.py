@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import re
+from collections import deque
 from typing import Any, Sequence
 
 import httpx
@@ -20,15 +22,26 @@ INLINE_DATA_URI_PATTERN = re.compile(
     re.IGNORECASE,
 )
 
+# Cleanups of abandoned turns; referenced here so they outlive the request.
+_discard_tasks: set[asyncio.Task] = set()
+
 
 class AssistantContentBuilder:
-    """Accumulate assistant content fragments and persist generated images."""
+    """Accumulate assistant content fragments and persist generated images.
+
+    Structured fragments added with :meth:`schedule_structured` start
+    persisting in background tasks straight away, so image decoding,
+    downloads and uploads overlap with the rest of the stream;
+    :meth:`take_resolved` hands their stored form back for the SSE stream and
+    :meth:`finalize` only waits for whatever is still outstanding.
+    """
 
-    __slots__ = ("_segments", "_created_attachment_ids")
+    __slots__ = ("_segments", "_created_attachment_ids", "_unannounced")
 
     def __init__(self) -> None:
         self._segments: list[tuple[str, Any]] = []
         self._created_attachment_ids: list[str] = []
+        self._unannounced: deque[tuple[dict[str, Any], asyncio.Task | None]] = deque()
 
     def add_text(self, text: str) -> None:
         if not isinstance(text, str) or not text:
@@ -74,6 +87,99 @@ class AssistantContentBuilder:
             elif isinstance(fragment, str):
                 self.add_text(fragment)
 
+    def schedule_structured(
+        self,
+        fragments: Sequence[Any],
+        session_id: str,
+        attachment_service: AttachmentService | None,
+        http_client: httpx.AsyncClient | None = None,
+        *,
+        announce: bool = True,
+    ) -> None:
+        """Add fragments and start persisting them without waiting.
+
+        With ``announce`` the fragments are also queued for
+        :meth:`take_resolved`.
+        """
+
+        if not fragments:
+            return
+        for fragment in fragments:
+            if isinstance(fragment, dict):
+                task = asyncio.create_task(
+                    process_assistant_fragment(
+                        fragment,
+                        session_id,
+                        attachment_service,
+                        http_client,
+                    )
+                )
+                self._segments.append(("pending", (fragment, task)))
+                if announce:
+                    self._unannounced.append((fragment, task))
+            elif isinstance(fragment, str):
+                self.add_text(fragment)
+                if announce and fragment:
+                    self._unannounced.append(({"type": "text", "text": fragment}, None))
+
+    def take_resolved(self) -> list[dict[str, Any]]:
+        """Return the stored form of scheduled fragments that have finished.
+
+        Fragments are released in the order they were scheduled, so a slow
+        image holds back the ones behind it. A failed fragment is returned as
+        received, matching what :meth:`finalize` persists.
+        """
+
+        resolved: list[dict[str, Any]] = []
+        while self._unannounced:
+            original, task = self._unannounced[0]
+            if task is not None and not task.done():
+                break
+            self._unannounced.popleft()
+            if task is None:
+                resolved.append(original)
+                continue
+            if task.cancelled():
+                continue
+            if task.exception() is not None:
+                resolved.append(original)
+                continue
+            processed, _ = task.result()
+            if processed is not None:
+                resolved.append(processed)
+        return resolved
+
+    async def wait_resolved(self) -> list[dict[str, Any]]:
+        """Wait for every scheduled fragment, then :meth:`take_resolved`."""
+
+        tasks = [task for _, task in self._unannounced if task is not None]
+        if tasks:
+            await asyncio.wait(tasks)
+        return self.take_resolved()
+
+    async def discard_pending(
+        self, attachment_service: AttachmentService | None
+    ) -> None:
+        """Abandon scheduled fragments and delete the attachments they stored.
+
+        Processing that already started may be mid-upload, so it is allowed
+        to finish rather than cancelled; whatever it persisted is then
+        deleted. The cleanup is shielded: if the caller is cancelled while
+        waiting, it still runs to completion in the background.
+        """
+
+        tasks = [payload[1] for kind, payload in self._segments if kind == "pending"]
+        self._segments = [
+            segment for segment in self._segments if segment[0] != "pending"
+        ]
+        self._unannounced.clear()
+        if not tasks:
+            return
+        cleanup = asyncio.create_task(_delete_created(tasks, attachment_service))
+        _discard_tasks.add(cleanup)
+        cleanup.add_done_callback(_discard_tasks.discard)
+        await asyncio.shield(cleanup)
+
     @property
     def created_attachment_ids(self) -> Sequence[str]:
         return tuple(self._created_attachment_ids)
@@ -95,13 +201,40 @@ class AssistantContentBuilder:
         text_buffer: list[str] = []
         structured_parts: list[dict[str, Any]] = []
 
+        # Start any fragments that were not scheduled during the stream, then
+        # wait for all of them together.
+        fragment_jobs: list[tuple[dict[str, Any], asyncio.Task]] = []
+        for kind, payload in self._segments:
+            if kind == "pending":
+                fragment_jobs.append(payload)
+            elif kind == "fragment" and isinstance(payload, dict):
+                fragment_jobs.append(
+                    (
+                        payload,
+                        asyncio.create_task(
+                            process_assistant_fragment(
+                                payload,
+                                session_id,
+                                attachment_service,
+                                http_client,
+                            )
+                        ),
+                    )
+                )
+        outcomes = iter(
+            await asyncio.gather(
+                *(task for _, task in fragment_jobs), return_exceptions=True
+            )
+        )
+        originals = iter(fragment for fragment, _ in fragment_jobs)
+
         for kind, payload in self._segments:
             if kind == "text":
                 if isinstance(payload, str):
                     text_buffer.append(payload)
                 continue
 
-            if not isinstance(payload, dict):
+            if kind == "fragment" and not isinstance(payload, dict):
                 continue
 
             if text_buffer:
@@ -109,14 +242,19 @@ class AssistantContentBuilder:
                 text_buffer.clear()
             structured_mode = True
 
-            processed, attachment_id = await process_assistant_fragment(
-                payload,
-                session_id,
-                attachment_service,
-                http_client,
-            )
+            original = next(originals)
+            outcome = next(outcomes)
+            if isinstance(outcome, BaseException):
+                logger.error(
+                    "[IMG-GEN] Failed to process assistant fragment for session %s: %s",
+                    session_id,
+                    outcome,
+                )
+                processed, attachment_id = original, None
+            else:
+                processed, attachment_id = outcome
             if attachment_id:
-                self._created_attachment_ids.append(attachment_id)
+                self.register_attachment(attachment_id)
             if processed is None:
                 continue
             structured_parts.append(processed)
@@ -130,6 +268,28 @@ class AssistantContentBuilder:
         return structured_parts if structured_parts else None
 
 
+async def _delete_created(
+    tasks: Sequence[asyncio.Task], attachment_service: AttachmentService | None
+) -> None:
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    if attachment_service is None:
+        return
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            continue
+        _, attachment_id = outcome
+        if not attachment_id:
+            continue
+        try:
+            await attachment_service.delete(attachment_id)
+        except Exception:
+            logger.warning(
+                "Failed to delete attachment %s of an abandoned turn",
+                attachment_id,
+                exc_info=True,
+            )
+
+
 def split_text_and_inline_images(text: str) -> list[tuple[str, str]]:
     """Split text into tuples of (kind, value) for text and inline images."""
 
@@ -0,0 +1,330 @@
+"""Token-budgeted compaction of the conversation sent to the model.
+
+Every tool hop resends the whole conversation, including historical tool
+results. :class:`ContextWindow` keeps each request under a token budget
+derived from the model's context length:
+
+1. Old tool results are replaced by a summary (the head of the output and a
+   note of how much was dropped).
+2. If that is not enough, the oldest turns are folded into one system
+   message with a line per message.
+3. A single long agentic turn can still outgrow the budget, so tool results
+   inside the most recent turns are summarised next, and then reduced to an
+   omission note, except for the latest few.
+
+Leading system messages and the messages of the most recent turns are never
+removed, and the latest tool results are always sent verbatim. Summaries are extractive and cheap to rebuild, so they are recomputed on
+each hop rather than stored. Token counts are estimates (about four
+characters per token) cached per message id.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_RATIO = 0.75
+DEFAULT_BUDGET_TOKENS = 32000
+DEFAULT_KEEP_RECENT_TURNS = 2
+DEFAULT_KEEP_RECENT_TOOL_RESULTS = 2
+
+_CHARS_PER_TOKEN = 4
+_MESSAGE_OVERHEAD_TOKENS = 4
+_IMAGE_TOKENS = 1000
+_SUMMARY_HEAD_CHARS = 600
+_DIGEST_LINE_CHARS = 200
+_TOKEN_CACHE_SIZE = 8192
+_DIGEST_HEADER = "Earlier conversation, compacted to fit the context window:"
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Rough token count for ``text``."""
+
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(message: dict[str, Any]) -> int:
+    """Rough token count for a chat message, including tool calls."""
+
+    tokens = _MESSAGE_OVERHEAD_TOKENS
+    content = message.get("content")
+    if isinstance(content, str):
+        tokens += estimate_text_tokens(content)
+    elif isinstance(content, list):
+        for fragment in content:
+            if not isinstance(fragment, dict):
+                continue
+            fragment_type = fragment.get("type")
+            if fragment_type == "text" and isinstance(fragment.get("text"), str):
+                tokens += estimate_text_tokens(fragment["text"])
+            elif fragment_type == "image_url":
+                # Billed per image, not per character of its (data) URL.
+                tokens += _IMAGE_TOKENS
+            else:
+                tokens += estimate_text_tokens(_dumps(fragment))
+    tool_calls = message.get("tool_calls")
+    if tool_calls:
+        tokens += estimate_text_tokens(_dumps(tool_calls))
+    return tokens
+
+
+def message_text(message: dict[str, Any]) -> str:
+    """Return the readable text of a message (images become placeholders)."""
+
+    content = message.get("content")
+    parts: list[str] = []
+    if isinstance(content, str):
+        parts.append(content)
+    elif isinstance(content, list):
+        for fragment in content:
+            if not isinstance(fragment, dict):
+                continue
+            if fragment.get("type") == "text" and isinstance(fragment.get("text"), str):
+                parts.append(fragment["text"])
+            elif fragment.get("type") == "image_url":
+                parts.append("[image]")
+    names = [
+        call.get("function", {}).get("name")
+        for call in message.get("tool_calls") or []
+        if isinstance(call, dict) and isinstance(call.get("function"), dict)
+    ]
+    if any(names):
+        parts.append(f"(called tools: {', '.join(name for name in names if name)})")
+    return "\n".join(part for part in parts if part).strip()
+
+
+def omission_note(message: dict[str, Any]) -> str:
+    """Return a note standing in for a message's dropped text."""
+
+    return (
+        f"[{len(message_text(message))} characters omitted to fit the "
+        "context window]"
+    )
+
+
+def summarize_message(message: dict[str, Any]) -> str:
+    """Return a summary of a message: its head and an omission note."""
+
+    text = message_text(message)
+    if len(text) <= _SUMMARY_HEAD_CHARS:
+        return text
+    omitted = len(text) - _SUMMARY_HEAD_CHARS
+    return (
+        f"{text[:_SUMMARY_HEAD_CHARS].rstrip()}\n"
+        f"[{omitted} characters omitted to fit the context window]"
+    )
+
+
+class ContextWindow:
+    """Fit a conversation into a token budget before it is sent to the model."""
+
+    def __init__(
+        self,
+        *,
+        budget_ratio: float = DEFAULT_BUDGET_RATIO,
+        default_budget_tokens: int = DEFAULT_BUDGET_TOKENS,
+        keep_recent_turns: int = DEFAULT_KEEP_RECENT_TURNS,
+        keep_recent_tool_results: int = DEFAULT_KEEP_RECENT_TOOL_RESULTS,
+    ) -> None:
+        self._budget_ratio = budget_ratio
+        self._default_budget_tokens = default_budget_tokens
+        self._keep_recent_turns = max(1, keep_recent_turns)
+        self._keep_recent_tool_results = max(1, keep_recent_tool_results)
+        self._token_cache: OrderedDict[int, int] = OrderedDict()
+
+    def budget_for(
+        self,
+        context_length: int | None,
+        *,
+        max_output_tokens: int | None = None,
+        reserved_tokens: int = 0,
+    ) -> int:
+        """Return the message budget for a model with ``context_length``."""
+
+        if not context_length:
+            budget = self._default_budget_tokens
+        else:
+            budget = int(context_length * self._budget_ratio)
+            if max_output_tokens:
+                budget = min(budget, context_length - max_output_tokens)
+        return max(budget - reserved_tokens, 1)
+
+    def estimate(self, message: dict[str, Any]) -> int:
+        """Token estimate for a message, cached for stored non-system messages."""
+
+        message_id = message.get("message_id")
+        if not isinstance(message_id, int) or message.get("role") == "system":
+            return estimate_message_tokens(message)
+        cached = self._token_cache.get(message_id)
+        if cached is not None:
+            self._token_cache.move_to_end(message_id)
+            return cached
+        tokens = estimate_message_tokens(message)
+        self._token_cache[message_id] = tokens
+        if len(self._token_cache) > _TOKEN_CACHE_SIZE:
+            self._token_cache.popitem(last=False)
+        return tokens
+
+    def fit(
+        self,
+        session_id: str,
+        messages: Sequence[dict[str, Any]],
+        *,
+        budget: int,
+    ) -> list[dict[str, Any]]:
+        """Return ``messages`` compacted to fit ``budget`` where possible.
+
+        The input is not modified; it is returned as a new list unchanged
+        when it already fits.
+        """
+
+        costs = [self.estimate(message) for message in messages]
+        total = sum(costs)
+        if total <= budget:
+            return list(messages)
+
+        head_end = 0
+        while head_end < len(messages) and messages[head_end].get("role") == "system":
+            head_end += 1
+        tail_start = self._recent_start(messages, head_end)
+
+        middle = list(messages[head_end:tail_start])
+        middle_costs = costs[head_end:tail_start]
+
+        # Pass 1: shorten old tool results in place, oldest first.
+        total = _shorten_tool_results(
+            middle,
+            middle_costs,
+            _tool_indexes(middle),
+            summarize_message,
+            total=total,
+            budget=budget,
+        )
+
+        # Pass 2: fold whole turns, oldest first, into a single digest so tool
+        # calls are never separated from their results.
+        digest_lines: list[str] = []
+        digest_cost = 0
+        while total > budget and middle:
+            turn_end = 1
+            while turn_end < len(middle) and middle[turn_end].get("role") != "user":
+                turn_end += 1
+            for message in middle[:turn_end]:
+                digest_lines.append(_digest_line(message, summarize_message(message)))
+            total -= sum(middle_costs[:turn_end])
+            del middle[:turn_end]
+            del middle_costs[:turn_end]
+            total -= digest_cost
+            digest_cost = estimate_message_tokens(_digest_message(digest_lines))
+            total += digest_cost
+
+        # Pass 3: shorten tool results of the recent turns, oldest first,
+        # keeping the latest ones verbatim; summaries first, then notes.
+        tail = list(messages[tail_start:])
+        tail_costs = costs[tail_start:]
+        older_tool_indexes = _tool_indexes(tail)[: -self._keep_recent_tool_results]
+        for shorten in (summarize_message, omission_note):
+            total = _shorten_tool_results(
+                tail,
+                tail_costs,
+                older_tool_indexes,
+                shorten,
+                total=total,
+                budget=budget,
+                originals=messages[tail_start:],
+            )
+
+        compacted_messages = list(messages[:head_end])
+        if digest_lines:
+            compacted_messages.append(_digest_message(digest_lines))
+        compacted_messages.extend(middle)
+        compacted_messages.extend(tail)
+        logger.debug(
+            "Compacted context for session %s to ~%d tokens (budget %d)",
+            session_id,
+            total,
+            budget,
+        )
+        return compacted_messages
+
+    def _recent_start(self, messages: Sequence[dict[str, Any]], floor: int) -> int:
+        """Index of the first message in the protected recent turns."""
+
+        remaining = self._keep_recent_turns
+        for index in range(len(messages) - 1, floor - 1, -1):
+            if messages[index].get("role") == "user":
+                remaining -= 1
+                if remaining == 0:
+                    return index
+        return floor
+
+
+def _tool_indexes(messages: Sequence[dict[str, Any]]) -> list[int]:
+    return [
+        index for index, message in enumerate(messages) if message.get("role") == "tool"
+    ]
+
+
+def _shorten_tool_results(
+    messages: list[dict[str, Any]],
+    costs: list[int],
+    indexes: Sequence[int],
+    shorten: Callable[[dict[str, Any]], str],
+    *,
+    total: int,
+    budget: int,
+    originals: Sequence[dict[str, Any]] | None = None,
+) -> int:
+    """Replace tool results at ``indexes`` in place until ``total`` fits.
+
+    ``shorten`` is applied to the original message (``originals`` when given)
+    and a replacement is only kept when it is cheaper. Returns the new total.
+    """
+
+    for index in indexes:
+        if total <= budget:
+            break
+        source = messages[index] if originals is None else originals[index]
+        compacted = dict(source)
+        compacted["content"] = shorten(source)
+        cost = estimate_message_tokens(compacted)
+        if cost >= costs[index]:
+            continue
+        total -= costs[index] - cost
+        messages[index] = compacted
+        costs[index] = cost
+    return total
+
+
+def _digest_line(message: dict[str, Any], summary: str) -> str:
+    role = message.get("role") or "message"
+    label = "tool result" if role == "tool" else role
+    text = " ".join(summary.split())
+    if len(text) > _DIGEST_LINE_CHARS:
+        text = text[: _DIGEST_LINE_CHARS - 1].rstrip() + "…"
+    return f"- {label}: {text}" if text else f"- {label}"
+
+
+def _digest_message(lines: list[str]) -> dict[str, Any]:
+    return {"role": "system", "content": "\n".join([_DIGEST_HEADER, *lines])}
+
+
+def _dumps(value: Any) -> str:
+    try:
+        return json.dumps(value, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+__all__ = [
+    "ContextWindow",
+    "estimate_message_tokens",
+    "estimate_text_tokens",
+    "message_text",
+    "omission_note",
+    "summarize_message",
+]
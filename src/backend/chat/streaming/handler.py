@@ -12,14 +12,17 @@ from ...config import get_settings
 from ...openrouter import OpenRouterClient, OpenRouterError
 from ...repository import ChatRepository, format_timestamp_for_client
 from ...schemas.chat import ChatCompletionRequest
-from ...services.attachment_urls import refresh_message_attachments
+from ...services.attachment_urls import (
+    inline_private_attachments,
+    refresh_message_attachments,
+)
 from ...services.attachments import AttachmentService
 from ...services.conversation_logging import ConversationLogWriter, MemoryBackupLogger
+from ...services.image_derivatives import VARIANT_MODEL
 from ...services.model_settings import ModelCapabilities, ModelSettingsService
-from .attachments import (
-    normalize_structured_fragments as _normalize_structured_fragments,
-)
+from ...utils import fast_json
 from .content_builder import AssistantContentBuilder as _AssistantContentBuilder
+from .context_window import ContextWindow, estimate_text_tokens
 from .messages import (
     parse_attachment_references as _parse_attachment_references,
 )
@@ -55,6 +58,24 @@ from .types import AssistantTurn, SseEvent, ToolExecutor
 logger = logging.getLogger(__name__)
 
 
+def _fragment_event(fragments: list[dict[str, Any]]) -> SseEvent:
+    """Return an SSE delta that adds ``fragments`` to the assistant message."""
+
+    return {
+        "event": "message",
+        "data": fast_json.dumps(
+            {
+                "choices": [
+                    {
+                        "delta": {"content": fragments, "role": "assistant"},
+                        "index": 0,
+                    }
+                ],
+            }
+        ),
+    }
+
+
 class StreamingHandler:
     """Stream chat responses, execute tools, and persist conversation state."""
 
@@ -71,6 +92,7 @@ class StreamingHandler:
         attachment_service: AttachmentService | None = None,
         conversation_logger: ConversationLogWriter | None = None,
         memory_backup_logger: MemoryBackupLogger | None = None,
+        context_window: ContextWindow | None = None,
     ) -> None:
         self._client = client
         self._repo = repository
@@ -82,6 +104,7 @@ class StreamingHandler:
         self._attachment_service = attachment_service
         self._conversation_logger = conversation_logger
         self._memory_backup_logger = memory_backup_logger
+        self._context_window = context_window
 
     def set_attachment_service(self, service: AttachmentService | None) -> None:
         """Attach or replace the attachment service used for image persistence."""
@@ -129,6 +152,39 @@ class StreamingHandler:
                 "Failed to write conversation log for session %s: %s", session_id, exc
             )
 
+    async def _context_budget(
+        self,
+        model_settings: ModelSettingsService | None,
+        model_id: str,
+        payload: dict[str, Any],
+        tools_payload: list[dict[str, Any]],
+    ) -> int:
+        """Return the token budget for the messages of the next request."""
+
+        assert self._context_window is not None
+        context_length: int | None = None
+        if model_settings is not None and hasattr(
+            model_settings, "get_model_capabilities"
+        ):
+            try:
+                capability = await model_settings.get_model_capabilities(
+                    model_id=model_id, client=self._client
+                )
+            except Exception as exc:  # pragma: no cover - defensive
+                logger.debug("Model capabilities unavailable for %s: %s", model_id, exc)
+                capability = None
+            context_length = getattr(capability, "context_length", None)
+        max_tokens = payload.get("max_tokens")
+        # Tool schemas are sent with every request and share the window.
+        reserved = (
+            estimate_text_tokens(fast_json.dumps(tools_payload)) if tools_payload else 0
+        )
+        return self._context_window.budget_for(
+            context_length,
+            max_output_tokens=max_tokens if isinstance(max_tokens, int) else None,
+            reserved_tokens=reserved,
+        )
+
     async def stream_conversation(
         self,
         session_id: str,
@@ -172,6 +228,8 @@ class StreamingHandler:
         # Track tool attachments to inject into next assistant response
         pending_tool_attachments: list[dict[str, Any]] = []
         consecutive_tool_errors = 0
+        # Data URIs of private attachments, shared by every hop of this turn.
+        inlined_attachments: dict[str, str | None] = {}
 
         while True:
             tools_available = bool(active_tools_payload)
@@ -195,10 +253,10 @@ class StreamingHandler:
                 conversation_state,
                 self._repo,
                 ttl=get_settings().attachment_signed_url_ttl,
+                variant=VARIANT_MODEL,
             )
 
             payload = request.to_openrouter_payload(active_model)
-            payload["messages"] = _prepare_messages_for_model(conversation_state)
 
             if overrides:
                 provider_overrides = overrides.get("provider")
@@ -216,6 +274,24 @@ class StreamingHandler:
                         continue
                     payload.setdefault(key, value)
 
+            model_messages = conversation_state
+            if self._context_window is not None:
+                model_messages = self._context_window.fit(
+                    session_id,
+                    conversation_state,
+                    budget=await self._context_budget(
+                        active_model_settings,
+                        active_model,
+                        payload,
+                        active_tools_payload,
+                    ),
+                )
+            payload["messages"] = await inline_private_attachments(
+                _prepare_messages_for_model(model_messages),
+                self._repo,
+                cache=inlined_attachments,
+            )
+
             if active_model_settings is not None:
                 if hasattr(active_model_settings, "sanitize_payload_for_model"):
                     capability = await active_model_settings.sanitize_payload_for_model(  # type: ignore[attr-defined]
@@ -279,22 +355,7 @@ class StreamingHandler:
                     content_builder.add_structured([clean_fragment])
 
                     # Emit attachment as SSE delta for frontend
-                    yield {
-                        "event": "message",
-                        "data": json.dumps(
-                            {
-                                "choices": [
-                                    {
-                                        "delta": {
-                                            "content": [clean_fragment],
-                                            "role": "assistant",
-                                        },
-                                        "index": 0,
-                                    }
-                                ],
-                            }
-                        ),
-                    }
+                    yield _fragment_event([clean_fragment])
 
                 pending_tool_attachments.clear()
 
@@ -315,7 +376,7 @@ class StreamingHandler:
 
                     if event_name == "openrouter_headers":
                         try:
-                            parsed_headers = json.loads(data)
+                            parsed_headers = fast_json.loads(data)
                         except json.JSONDecodeError:
                             logger.debug(
                                 "Skipping invalid routing metadata payload: %s", data
@@ -332,7 +393,7 @@ class StreamingHandler:
                     if data == "[DONE]":
                         break
                     try:
-                        chunk = json.loads(data)
+                        chunk = fast_json.loads(data)
                     except json.JSONDecodeError:
                         logger.debug("Skipping non-JSON SSE payload: %s", data)
                         continue
@@ -371,22 +432,16 @@ class StreamingHandler:
                                         await self._client._get_http_client()
                                     )
                                 http_client = http_client_cache
-                            (
-                                new_fragments,
-                                attachment_ids,
-                                mutated,
-                            ) = await _normalize_structured_fragments(
+                            content_builder.schedule_structured(
                                 delta_content,
                                 session_id,
                                 self._attachment_service,
                                 http_client,
                             )
-                            if mutated:
-                                delta["content"] = new_fragments
-                                chunk_modified = True
-                            content_builder.add_structured(new_fragments)
-                            for attachment_id in attachment_ids:
-                                content_builder.register_attachment(attachment_id)
+                            # Raw fragments can be megabytes of base64; the
+                            # stored form follows once it is persisted.
+                            del delta["content"]
+                            chunk_modified = True
 
                         delta_images = delta.get("images")
                         if isinstance(delta_images, list) and delta_images:
@@ -397,22 +452,14 @@ class StreamingHandler:
                                         await self._client._get_http_client()
                                     )
                                 http_client = http_client_cache
-                            (
-                                normalized_images,
-                                image_attachment_ids,
-                                images_mutated,
-                            ) = await _normalize_structured_fragments(
+                            content_builder.schedule_structured(
                                 delta_images,
                                 session_id,
                                 self._attachment_service,
                                 http_client,
                             )
-                            if images_mutated:
-                                delta["images"] = normalized_images
-                                chunk_modified = True
-                            content_builder.add_structured(normalized_images)
-                            for attachment_id in image_attachment_ids:
-                                content_builder.register_attachment(attachment_id)
+                            del delta["images"]
+                            chunk_modified = True
 
                         if tool_deltas := delta.get("tool_calls"):
                             _merge_tool_calls(streamed_tool_calls, tool_deltas)
@@ -482,22 +529,17 @@ class StreamingHandler:
                                         await self._client._get_http_client()
                                     )
                                 http_client = http_client_cache
-                            (
-                                new_fragments,
-                                attachment_ids,
-                                mutated,
-                            ) = await _normalize_structured_fragments(
+                            content_builder.schedule_structured(
                                 message_content,
                                 session_id,
                                 self._attachment_service,
                                 http_client,
+                                announce=False,
                             )
-                            if mutated:
-                                message_payload["content"] = new_fragments
-                                chunk_modified = True
-                            content_builder.add_structured(new_fragments)
-                            for attachment_id in attachment_ids:
-                                content_builder.register_attachment(attachment_id)
+                            # Clients render deltas, not the final message; the
+                            # stored content is in the persisted message.
+                            del message_payload["content"]
+                            chunk_modified = True
 
                         message_images = message_payload.get("images")
                         if isinstance(message_images, list) and message_images:
@@ -508,28 +550,27 @@ class StreamingHandler:
                                         await self._client._get_http_client()
                                     )
                                 http_client = http_client_cache
-                            (
-                                normalized_images,
-                                image_attachment_ids,
-                                images_mutated,
-                            ) = await _normalize_structured_fragments(
+                            content_builder.schedule_structured(
                                 message_images,
                                 session_id,
                                 self._attachment_service,
                                 http_client,
+                                announce=False,
                             )
-                            if images_mutated:
-                                message_payload["images"] = normalized_images
-                                chunk_modified = True
-                            content_builder.add_structured(normalized_images)
-                            for attachment_id in image_attachment_ids:
-                                content_builder.register_attachment(attachment_id)
+                            del message_payload["images"]
+                            chunk_modified = True
 
                     if chunk_modified:
-                        event["data"] = json.dumps(chunk)
-
+                        event["data"] = fast_json.dumps(chunk)
                     yield event
+
+                    if resolved := content_builder.take_resolved():
+                        yield _fragment_event(resolved)
+
+                if resolved := await content_builder.wait_resolved():
+                    yield _fragment_event(resolved)
             except OpenRouterError as exc:
+                await content_builder.discard_pending(self._attachment_service)
                 if (
                     allow_tools
                     and can_retry_without_tools
@@ -546,7 +587,7 @@ class StreamingHandler:
                     )
                     yield {
                         "event": "tool",
-                        "data": json.dumps(
+                        "data": fast_json.dumps(
                             {
                                 "status": "notice",
                                 "name": "system",
@@ -556,6 +597,10 @@ class StreamingHandler:
                     }
                     continue
                 raise
+            except BaseException:
+                # Client disconnects and cancellation abandon the turn.
+                await content_builder.discard_pending(self._attachment_service)
+                raise
 
             tool_calls = _finalize_tool_calls(streamed_tool_calls)
             if streamed_tool_calls:
@@ -672,7 +717,7 @@ class StreamingHandler:
                 metadata_event_payload["created_at_utc"] = assistant_turn.created_at_utc
             yield {
                 "event": "metadata",
-                "data": json.dumps(metadata_event_payload),
+                "data": fast_json.dumps(metadata_event_payload),
             }
             routing_headers = None
 
@@ -701,7 +746,7 @@ class StreamingHandler:
                 # Stream the pause message using 'tool' event (frontend handles this)
                 yield {
                     "event": "tool",
-                    "data": json.dumps(
+                    "data": fast_json.dumps(
                         {
                             "status": "hop_limit",
                             "name": "system",
@@ -755,7 +800,7 @@ class StreamingHandler:
                     conversation_state.append(tool_message)
                     yield {
                         "event": "tool",
-                        "data": json.dumps(
+                        "data": fast_json.dumps(
                             {
                                 "status": "error",
                                 "name": "unknown",
@@ -773,7 +818,7 @@ class StreamingHandler:
 
                 yield {
                     "event": "tool",
-                    "data": json.dumps(
+                    "data": fast_json.dumps(
                         {
                             "status": "started",
                             "name": tool_name,
@@ -793,7 +838,7 @@ class StreamingHandler:
                     arguments = {}
                 else:
                     try:
-                        arguments = json.loads(arguments_raw)
+                        arguments = fast_json.loads(arguments_raw)
                     except json.JSONDecodeError as exc:  # pragma: no cover - defensive
                         result_text = (
                             f"Invalid JSON arguments for tool {tool_name}: {exc}"
@@ -997,7 +1042,7 @@ class StreamingHandler:
 
                 yield {
                     "event": "tool",
-                    "data": json.dumps(tool_event_data),
+                    "data": fast_json.dumps(tool_event_data),
                 }
 
                 notice_reason = _classify_tool_followup(
@@ -1017,7 +1062,7 @@ class StreamingHandler:
                     }
                     yield {
                         "event": "notice",
-                        "data": json.dumps(notice_payload),
+                        "data": fast_json.dumps(notice_payload),
                     }
 
                 processed_tool_calls += 1
@@ -1055,7 +1100,7 @@ class StreamingHandler:
                 )
                 yield {
                     "event": "tool",
-                    "data": json.dumps(
+                    "data": fast_json.dumps(
                         {
                             "status": "tool_error_limit",
                             "name": "system",
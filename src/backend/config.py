@@ -3,7 +3,7 @@
 from datetime import timedelta
 from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import AliasChoices, AnyHttpUrl, Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -107,6 +107,41 @@ class Settings(BaseSettings):
         default_factory=lambda: Path("data/chat_sessions.db"),
         validation_alias=AliasChoices("CHAT_DATABASE_PATH", "chat_db"),
     )
+    chat_storage_format: Literal["json", "msgpack", "zstd"] = Field(
+        default="json",
+        validation_alias=AliasChoices("CHAT_STORAGE_FORMAT", "chat_storage_format"),
+        description=(
+            "Encoding of bulky message metadata (usage, routing, reasoning); "
+            "msgpack and zstd need the optional msgpack/zstandard packages."
+        ),
+    )
+    chat_archive_path: Path = Field(
+        default_factory=lambda: Path("data/chat_archive.db"),
+        validation_alias=AliasChoices("CHAT_ARCHIVE_PATH", "chat_archive_path"),
+    )
+    chat_archive_after_days: int = Field(
+        default=30,
+        ge=0,
+        validation_alias=AliasChoices(
+            "CHAT_ARCHIVE_AFTER_DAYS",
+            "chat_archive_after_days",
+        ),
+        description=(
+            "Move unsaved sessions idle this long to the archive database "
+            "(0 disables archiving)."
+        ),
+    )
+    model_catalog_cache_path: Path = Field(
+        default_factory=lambda: Path("data/model_catalog.json"),
+        validation_alias=AliasChoices(
+            "MODEL_CATALOG_CACHE_PATH",
+            "model_catalog_cache_path",
+        ),
+        description=(
+            "Last good OpenRouter model catalog, served on cold start while "
+            "a fresh copy is fetched."
+        ),
+    )
     conversation_log_dir: Path = Field(
         default_factory=lambda: Path("logs/conversations"),
         validation_alias=AliasChoices(
@@ -114,6 +149,52 @@ class Settings(BaseSettings):
             "conversation_log_dir",
         ),
     )
+    context_compaction_enabled: bool = Field(
+        default=False,
+        validation_alias=AliasChoices(
+            "CONTEXT_COMPACTION_ENABLED",
+            "context_compaction_enabled",
+        ),
+        description=(
+            "Compact old tool results and turns to fit the model context. "
+            "Off by default: the budget is an estimate and compaction drops "
+            "detail the model would otherwise see."
+        ),
+    )
+    context_budget_ratio: float = Field(
+        default=0.75,
+        gt=0,
+        le=1,
+        validation_alias=AliasChoices("CONTEXT_BUDGET_RATIO", "context_budget_ratio"),
+        description="Share of the model's context length used for the prompt.",
+    )
+    context_default_budget_tokens: int = Field(
+        default=32000,
+        ge=1024,
+        validation_alias=AliasChoices(
+            "CONTEXT_DEFAULT_BUDGET_TOKENS",
+            "context_default_budget_tokens",
+        ),
+        description="Prompt budget when the model's context length is unknown.",
+    )
+    context_keep_recent_turns: int = Field(
+        default=2,
+        ge=1,
+        validation_alias=AliasChoices(
+            "CONTEXT_KEEP_RECENT_TURNS",
+            "context_keep_recent_turns",
+        ),
+        description="Most recent user turns that are never compacted.",
+    )
+    context_keep_recent_tool_results: int = Field(
+        default=2,
+        ge=1,
+        validation_alias=AliasChoices(
+            "CONTEXT_KEEP_RECENT_TOOL_RESULTS",
+            "context_keep_recent_tool_results",
+        ),
+        description="Latest tool results that are always sent verbatim.",
+    )
 
     attachments_max_size_bytes: int = Field(
         default=10 * 1024 * 1024,
@@ -135,6 +216,32 @@ class Settings(BaseSettings):
         default_factory=lambda: Path("data/uploads"),
         validation_alias=AliasChoices("LEGACY_ATTACHMENTS_DIR"),
     )
+    attachments_storage_backend: Literal["gcs", "local"] = Field(
+        default="gcs",
+        validation_alias=AliasChoices(
+            "ATTACHMENTS_STORAGE_BACKEND",
+            "attachments_storage_backend",
+        ),
+        description="Where new attachment binaries are stored.",
+    )
+    attachments_local_dir: Path = Field(
+        default_factory=lambda: Path("data/attachments"),
+        validation_alias=AliasChoices(
+            "ATTACHMENTS_LOCAL_DIR",
+            "attachments_local_dir",
+        ),
+    )
+    attachments_public_base_url: str = Field(
+        default="",
+        validation_alias=AliasChoices(
+            "ATTACHMENTS_PUBLIC_BASE_URL",
+            "attachments_public_base_url",
+        ),
+        description=(
+            "Absolute base URL for locally stored attachments. When empty, "
+            "local images are inlined as data URIs for the model."
+        ),
+    )
     gcs_bucket_name: str = Field(
         default="openrouter-chat",
         validation_alias=AliasChoices("GCS_BUCKET_NAME", "gcs_bucket_name"),
@@ -143,6 +250,12 @@ class Settings(BaseSettings):
         default="pihome123",
         validation_alias=AliasChoices("GCP_PROJECT_ID", "gcp_project_id"),
     )
+    gcs_max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        validation_alias=AliasChoices("GCS_MAX_CONCURRENCY", "gcs_max_concurrency"),
+        description="Maximum number of GCS uploads/signing calls run in parallel.",
+    )
     google_application_credentials: Path = Field(
         default_factory=lambda: Path("credentials/googlecloud/sa.json"),
         validation_alias=AliasChoices(
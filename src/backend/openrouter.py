@@ -13,6 +13,7 @@ from fastapi import status
 
 from .config import Settings
 from .schemas.chat import ChatCompletionRequest
+from .utils import fast_json
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +42,14 @@ class ServerSentEvent:
         return payload
 
 
+@dataclass
+class ModelCatalogResponse:
+    """Result of a conditional ``/models`` request."""
+
+    payload: dict[str, Any] | None  # None when the catalog was not modified
+    etag: Optional[str] = None
+
+
 class OpenRouterClient:
     """Client responsible for streaming chat completions from OpenRouter."""
 
@@ -142,7 +151,7 @@ class OpenRouterClient:
                     if routing_headers:
                         yield {
                             "event": "openrouter_headers",
-                            "data": json.dumps(routing_headers),
+                            "data": fast_json.dumps(routing_headers),
                         }
 
                     logger.debug("[IMG-GEN] Starting to read OpenRouter SSE stream")
@@ -150,7 +159,7 @@ class OpenRouterClient:
                         # Log if event contains structured content
                         if event.data and event.data != "[DONE]":
                             try:
-                                chunk = json.loads(event.data)
+                                chunk = fast_json.loads(event.data)
                                 if "choices" in chunk and chunk["choices"]:
                                     choice = chunk["choices"][0]
                                     delta = choice.get("delta", {})
@@ -225,6 +234,35 @@ class OpenRouterClient:
 
         return response.json()
 
+    async def fetch_model_catalog(
+        self, *, etag: Optional[str] = None
+    ) -> ModelCatalogResponse:
+        """Fetch `/models`, revalidating with ``If-None-Match`` when possible.
+
+        Returns a response without a payload when OpenRouter answers
+        ``304 Not Modified`` for ``etag``.
+        """
+
+        url = f"{self._base_url}/models"
+        headers = dict(self._headers)
+        headers["Accept"] = "application/json"
+        if etag:
+            headers["If-None-Match"] = etag
+
+        client = await self._get_http_client()
+        try:
+            response = await client.get(url, headers=headers)
+        except httpx.HTTPError as exc:
+            raise OpenRouterError(status.HTTP_502_BAD_GATEWAY, str(exc)) from exc
+
+        if response.status_code == status.HTTP_304_NOT_MODIFIED:
+            return ModelCatalogResponse(None, response.headers.get("etag") or etag)
+        if response.status_code >= 400:
+            detail = self._extract_error_detail(response.content)
+            raise OpenRouterError(response.status_code, detail)
+
+        return ModelCatalogResponse(response.json(), response.headers.get("etag"))
+
     async def list_providers(self) -> dict[str, Any]:
         """Return the raw payload from OpenRouter's `/providers` endpoint."""
 
@@ -376,4 +414,9 @@ class OpenRouterClient:
         return payload
 
 
-__all__ = ["OpenRouterClient", "OpenRouterError", "ServerSentEvent"]
+__all__ = [
+    "ModelCatalogResponse",
+    "OpenRouterClient",
+    "OpenRouterError",
+    "ServerSentEvent",
+]
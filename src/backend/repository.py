@@ -2,10 +2,16 @@
 
 from __future__ import annotations
 
+import asyncio
+import base64
 import json
+import logging
+import re
+import sqlite3
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, AsyncIterator, Iterable, Sequence
 
 import aiosqlite
 
@@ -14,52 +20,285 @@ from backend.utils.datetime_utils import (
     normalize_db_timestamp,
     parse_db_timestamp,
 )
+from backend.utils import fast_json
+from backend.utils.payload_codec import FORMAT_JSON, PayloadCodec, decode_payload
+
+logger = logging.getLogger(__name__)
 
 MessageRecord = dict[str, Any]
 AttachmentRecord = dict[str, Any]
 
 _CONTENT_JSON_METADATA_KEY = "__structured_content__"
 
+# Bulky message metadata only the UI shows. Stored encoded in the
+# ``metadata_detail`` column and skipped when loading model input.
+_DETAIL_METADATA_KEYS = frozenset({"usage", "routing", "reasoning", "meta"})
+
+_DEFAULT_READ_POOL_SIZE = 4
+_PREVIEW_MAX_CHARS = 200
+
+# Recomputes the denormalized listing columns of conversations matching the
+# appended WHERE clause.
+_REFRESH_CONVERSATION_SUMMARY_SQL = f"""
+    UPDATE conversations
+    SET
+        message_count = (
+            SELECT COUNT(*) FROM messages m
+            WHERE m.session_id = conversations.session_id
+        ),
+        preview = (
+            SELECT substr(m.content, 1, {_PREVIEW_MAX_CHARS}) FROM messages m
+            WHERE m.session_id = conversations.session_id AND m.role = 'user'
+            ORDER BY m.id ASC LIMIT 1
+        )
+"""
+
+# Roles whose text is indexed for conversation search.
+_SEARCHABLE_ROLES = ("user", "assistant")
+_SEARCH_TEXT_FRAGMENT_TYPES = {"text", "output_text", "input_text"}
+_SEARCH_BACKFILL_BATCH = 1000
+_SEARCH_SNIPPET_TOKENS = 16
+_INLINE_DATA_URI = re.compile(r"data:[\w/.+-]+;base64,[A-Za-z0-9+/=\s]+")
+_LONE_SURROGATE = re.compile("[\ud800-\udfff]")
+
+# Tables copied into a session archive snapshot, with their session column.
+# Attachments are not archived: sessions holding any are skipped until the
+# expiry cleanup has released them.
+_ARCHIVED_TABLES = (
+    ("conversations", "session_id"),
+    ("messages", "session_id"),
+    ("events", "session_id"),
+)
+_ARCHIVE_BYTES_KEY = "__bytes__"
+
+# Applied to every connection. WAL makes NORMAL sync durable across crashes
+# of the process (only an OS crash can drop the last commits).
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA busy_timeout=5000;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA cache_size=-16384;",  # negative = KiB, i.e. 16 MiB per connection
+    f"PRAGMA mmap_size={128 * 1024 * 1024};",
+)
+
 
 def _encode_content(value: Any) -> tuple[str | None, bool]:
     if value is None:
         return None, False
     if isinstance(value, str):
         return value, False
-    serialized = json.dumps(value)
+    serialized = fast_json.dumps(value)
     return serialized, True
 
 
+def _searchable_text(content: Any) -> str:
+    """Return the plain text of message content for the search index."""
+
+    if isinstance(content, str):
+        stripped = content.lstrip()
+        if stripped.startswith("["):
+            try:
+                content = fast_json.loads(stripped)
+            except json.JSONDecodeError:
+                pass
+    if isinstance(content, list):
+        content = " ".join(
+            item.get("text", "")
+            for item in content
+            if isinstance(item, dict)
+            and item.get("type") in _SEARCH_TEXT_FRAGMENT_TYPES
+            and isinstance(item.get("text"), str)
+        )
+    if not isinstance(content, str):
+        return ""
+    # SQLite cannot encode lone surrogates, and they carry no searchable text.
+    return _LONE_SURROGATE.sub("", _INLINE_DATA_URI.sub(" ", content)).strip()
+
+
+def _fts_query(search: str) -> str:
+    """Turn free text into an FTS5 query matching every term as a prefix."""
+
+    terms = [term.replace('"', '""') for term in search.split()]
+    return " ".join(f'"{term}"*' for term in terms if term.strip('"'))
+
+
+def encode_conversation_cursor(last_activity_at: str | None, session_id: str) -> str:
+    """Return an opaque keyset cursor for a conversation listing row."""
+
+    raw = json.dumps([last_activity_at, session_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_conversation_cursor(cursor: str) -> tuple[str, str] | None:
+    """Parse a cursor from :func:`encode_conversation_cursor`; None if invalid."""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    if (
+        isinstance(value, list)
+        and len(value) == 2
+        and all(isinstance(item, str) for item in value)
+    ):
+        return value[0], value[1]
+    return None
+
+
+def _archive_value(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return {_ARCHIVE_BYTES_KEY: base64.b64encode(value).decode("ascii")}
+    return value
+
+
+def _restore_value(value: Any) -> Any:
+    if isinstance(value, dict) and _ARCHIVE_BYTES_KEY in value:
+        return base64.b64decode(value[_ARCHIVE_BYTES_KEY])
+    return value
+
+
+def _db_timestamp(value: datetime) -> str:
+    """Format ``value`` like SQLite's CURRENT_TIMESTAMP (UTC)."""
+
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
 def _decode_content(value: str | None, is_structured: bool) -> Any:
     if value is None:
         return None
     if is_structured:
         try:
-            return json.loads(value)
+            return fast_json.loads(value)
         except json.JSONDecodeError:
             return value
     return value
 
 
-class ChatRepository:
-    """Persist chat sessions, messages, and auxiliary events."""
+async def _open_connection(path: Path, *, read_only: bool) -> aiosqlite.Connection:
+    connection = await aiosqlite.connect(path)
+    connection.row_factory = aiosqlite.Row
+    if not read_only:
+        # Only takes effect on a new, empty database; existing ones are
+        # converted by enable_incremental_vacuum().
+        await connection.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+        await connection.execute("PRAGMA journal_mode=WAL;")
+        await connection.execute("PRAGMA foreign_keys=ON;")
+    for pragma in _CONNECTION_PRAGMAS:
+        await connection.execute(pragma)
+    if read_only:
+        await connection.execute("PRAGMA query_only=ON;")
+    return connection
+
+
+class _ReadPool:
+    """Fixed set of read-only connections, each used by one caller at a time."""
+
+    def __init__(self, path: Path, size: int) -> None:
+        self._path = path
+        self._size = max(1, size)
+        self._connections: list[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+
+    async def open(self) -> None:
+        for _ in range(self._size):
+            connection = await _open_connection(self._path, read_only=True)
+            self._connections.append(connection)
+            self._idle.put_nowait(connection)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        connection = await self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put_nowait(connection)
 
-    def __init__(self, database_path: Path):
+    async def close(self) -> None:
+        connections, self._connections = self._connections, []
+        self._idle = asyncio.Queue()
+        for connection in connections:
+            await connection.close()
+
+
+class ChatRepository:
+    """Persist chat sessions, messages, and auxiliary events.
+
+    Writes go through a single writer connection. Each logical write runs
+    under :meth:`_write`, which holds a lock for its statements and commits
+    or rolls them back together, so concurrent coroutines never interleave
+    statements inside one another's transaction. Plain reads
+    use a small pool of read-only connections and, thanks to WAL, run in
+    parallel with each other and with an in-flight write instead of
+    waiting behind it. Methods that read as part of a write stay on the
+    writer connection.
+    """
+
+    def __init__(
+        self,
+        database_path: Path,
+        *,
+        read_pool_size: int = _DEFAULT_READ_POOL_SIZE,
+        storage_format: str = FORMAT_JSON,
+    ):
         self._path = database_path
+        self._codec = PayloadCodec(storage_format)
         self._connection: aiosqlite.Connection | None = None
+        self._readers = _ReadPool(database_path, read_pool_size)
+        self._search_enabled = False
+        self._write_lock = asyncio.Lock()
 
     async def initialize(self) -> None:
-        """Open the SQLite connection and ensure tables exist."""
+        """Open the SQLite connections and ensure tables exist."""
 
         if self._connection is not None:
             return
 
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        self._connection = await aiosqlite.connect(self._path)
-        self._connection.row_factory = aiosqlite.Row
-        await self._connection.execute("PRAGMA journal_mode=WAL;")
-        await self._connection.execute("PRAGMA foreign_keys=ON;")
+        self._connection = await _open_connection(self._path, read_only=False)
         await self._create_schema()
+        await self._readers.open()
+
+    @asynccontextmanager
+    async def _write(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Run one logical write as a single transaction on the writer.
+
+        Commits when the block exits normally and rolls back on any error,
+        including cancellation, so partial writes are never left behind.
+        """
+
+        assert self._connection is not None
+        async with self._write_lock:
+            try:
+                yield self._connection
+            except BaseException:
+                await self._connection.rollback()
+                raise
+            await self._connection.commit()
+
+    async def _fetchall(
+        self, query: str, params: Sequence[Any] = ()
+    ) -> list[aiosqlite.Row]:
+        """Run a read-only query on a pooled reader and return all rows."""
+
+        assert self._connection is not None
+        async with self._readers.acquire() as reader:
+            cursor = await reader.execute(query, params)
+            rows = await cursor.fetchall()
+            await cursor.close()
+        return list(rows)
+
+    async def _fetchone(
+        self, query: str, params: Sequence[Any] = ()
+    ) -> aiosqlite.Row | None:
+        """Run a read-only query on a pooled reader and return the first row."""
+
+        assert self._connection is not None
+        async with self._readers.acquire() as reader:
+            cursor = await reader.execute(query, params)
+            row = await cursor.fetchone()
+            await cursor.close()
+        return row
 
     async def _create_schema(self) -> None:
         assert self._connection is not None
@@ -97,7 +336,8 @@ class ChatRepository:
                 metadata TEXT,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 expires_at DATETIME,
-                last_used_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                last_used_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                content_hash TEXT
             );
 
             CREATE TABLE IF NOT EXISTS events (
@@ -115,14 +355,22 @@ class ChatRepository:
             CREATE INDEX IF NOT EXISTS idx_messages_parent_client_message_id ON messages(parent_client_message_id);
             CREATE INDEX IF NOT EXISTS idx_attachments_session_id ON attachments(session_id);
             CREATE INDEX IF NOT EXISTS idx_attachments_last_used_at ON attachments(last_used_at);
+            CREATE INDEX IF NOT EXISTS idx_attachments_storage_path ON attachments(storage_path);
             """
         )
         await self._connection.commit()
         await self._ensure_column("messages", "client_message_id", "TEXT")
         await self._ensure_column("messages", "parent_client_message_id", "TEXT")
+        await self._ensure_column("messages", "metadata_detail", "BLOB")
         await self._ensure_column("attachments", "gcs_blob", "TEXT")
         await self._ensure_column("attachments", "signed_url", "TEXT")
         await self._ensure_column("attachments", "signed_url_expires_at", "TEXT")
+        await self._ensure_column("attachments", "content_hash", "TEXT")
+        await self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_attachments_content_hash "
+            "ON attachments(content_hash)"
+        )
+        await self._connection.commit()
         await self._ensure_column("conversations", "title", "TEXT")
         await self._ensure_column("conversations", "saved", "INTEGER DEFAULT 0")
         await self._ensure_column("conversations", "updated_at", "DATETIME")
@@ -130,9 +378,33 @@ class ChatRepository:
             "conversations", "title_source", "TEXT DEFAULT 'auto'"
         )
         await self._ensure_column("conversations", "llm_settings", "TEXT")
+        summary_added = [
+            await self._ensure_column(
+                "conversations", "message_count", "INTEGER NOT NULL DEFAULT 0"
+            ),
+            await self._ensure_column("conversations", "preview", "TEXT"),
+            await self._ensure_column("conversations", "last_activity_at", "DATETIME"),
+        ]
+        if any(summary_added):
+            await self._connection.execute(_REFRESH_CONVERSATION_SUMMARY_SQL)
+            await self._connection.execute(
+                """
+                UPDATE conversations
+                SET last_activity_at = COALESCE(updated_at, created_at)
+                WHERE last_activity_at IS NULL
+                """
+            )
+        await self._connection.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_conversations_saved_activity
+            ON conversations(saved, last_activity_at DESC, session_id DESC)
+            """
+        )
+        await self._connection.commit()
+        await self._ensure_search_index()
 
-    async def _ensure_column(self, table: str, column: str, definition: str) -> None:
-        """Ensure a column exists on a table, adding it if necessary."""
+    async def _ensure_column(self, table: str, column: str, definition: str) -> bool:
+        """Ensure a column exists on a table; return True when it was added."""
 
         assert self._connection is not None
         cursor = await self._connection.execute(f"PRAGMA table_info({table})")
@@ -140,13 +412,82 @@ class ChatRepository:
         await cursor.close()
         existing = {row[1] for row in rows}
         if column in existing:
-            return
+            return False
         await self._connection.execute(
             f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
         )
         await self._connection.commit()
+        return True
+
+    async def _ensure_search_index(self) -> None:
+        """Create the FTS5 message index, backfilling it on first creation.
+
+        Inserts are indexed by :meth:`add_message`; a trigger drops index rows
+        with their messages (including cascaded session deletes). Builds of
+        SQLite without FTS5 fall back to ``LIKE`` search.
+        """
+
+        assert self._connection is not None
+        cursor = await self._connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+        )
+        exists = await cursor.fetchone() is not None
+        await cursor.close()
+        try:
+            await self._connection.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    text,
+                    session_id UNINDEXED,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                );
+
+                CREATE TRIGGER IF NOT EXISTS messages_fts_delete
+                AFTER DELETE ON messages
+                BEGIN
+                    DELETE FROM messages_fts WHERE rowid = old.id;
+                END;
+                """
+            )
+        except sqlite3.OperationalError as exc:  # pragma: no cover - no FTS5
+            if "fts5" not in str(exc).lower():
+                raise
+            return
+        self._search_enabled = True
+        if exists:
+            return
+
+        placeholders = ", ".join("?" for _ in _SEARCHABLE_ROLES)
+        last_id = 0
+        while True:
+            cursor = await self._connection.execute(
+                f"""
+                SELECT id, session_id, content
+                FROM messages
+                WHERE id > ? AND role IN ({placeholders})
+                ORDER BY id
+                LIMIT ?
+                """,
+                (last_id, *_SEARCHABLE_ROLES, _SEARCH_BACKFILL_BATCH),
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            entries = [
+                (row["id"], text, row["session_id"])
+                for row in rows
+                if (text := _searchable_text(row["content"]))
+            ]
+            await self._connection.executemany(
+                "INSERT INTO messages_fts(rowid, text, session_id) VALUES (?, ?, ?)",
+                entries,
+            )
+        await self._connection.commit()
 
     async def close(self) -> None:
+        await self._readers.close()
         if self._connection is not None:
             await self._connection.close()
             self._connection = None
@@ -154,30 +495,28 @@ class ChatRepository:
     async def ensure_session(self, session_id: str) -> None:
         """Insert the session if it does not already exist."""
 
-        assert self._connection is not None
-        await self._connection.execute(
-            "INSERT OR IGNORE INTO conversations(session_id) VALUES (?)",
-            (session_id,),
-        )
-        await self._connection.commit()
+        async with self._write() as connection:
+            await connection.execute(
+                """
+                INSERT OR IGNORE INTO conversations(session_id, last_activity_at)
+                VALUES (?, CURRENT_TIMESTAMP)
+                """,
+                (session_id,),
+            )
 
     async def session_exists(self, session_id: str) -> bool:
         """Return True if the session is present in the database."""
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
+        row = await self._fetchone(
             "SELECT 1 FROM conversations WHERE session_id = ? LIMIT 1",
             (session_id,),
         )
-        row = await cursor.fetchone()
-        await cursor.close()
         return row is not None
 
     async def get_session_metadata(self, session_id: str) -> dict[str, Any] | None:
         """Return metadata for a stored session, if available."""
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
+        row = await self._fetchone(
             """
             SELECT session_id, created_at, timezone, title, saved, updated_at, llm_settings
             FROM conversations
@@ -186,8 +525,6 @@ class ChatRepository:
             """,
             (session_id,),
         )
-        row = await cursor.fetchone()
-        await cursor.close()
         if row is None:
             return None
 
@@ -197,7 +534,7 @@ class ChatRepository:
         llm_settings = None
         if llm_settings_raw:
             try:
-                llm_settings = json.loads(llm_settings_raw)
+                llm_settings = fast_json.loads(llm_settings_raw)
             except json.JSONDecodeError:
                 pass
         return {
@@ -215,11 +552,10 @@ class ChatRepository:
     async def clear_session(self, session_id: str) -> None:
         """Remove all messages and events for the given session."""
 
-        assert self._connection is not None
-        await self._connection.execute(
-            "DELETE FROM conversations WHERE session_id = ?", (session_id,)
-        )
-        await self._connection.commit()
+        async with self._write() as connection:
+            await connection.execute(
+                "DELETE FROM conversations WHERE session_id = ?", (session_id,)
+            )
 
     async def add_message(
         self,
@@ -234,177 +570,285 @@ class ChatRepository:
     ) -> tuple[int, str | None]:
         """Persist a single chat message."""
 
-        assert self._connection is not None
         serialized_content, structured = _encode_content(content)
 
-        stored_metadata: dict[str, Any] | None
-        if metadata:
-            stored_metadata = dict(metadata)
-        else:
-            stored_metadata = {}
+        stored_metadata: dict[str, Any] = {}
+        detail: dict[str, Any] = {}
+        for key, value in (metadata or {}).items():
+            (detail if key in _DETAIL_METADATA_KEYS else stored_metadata)[key] = value
         if structured:
             stored_metadata[_CONTENT_JSON_METADATA_KEY] = True
-        metadata_json = json.dumps(stored_metadata) if stored_metadata else None
-        cursor = await self._connection.execute(
-            """
-            INSERT INTO messages(
-                session_id,
-                role,
-                content,
-                tool_call_id,
-                metadata,
-                client_message_id,
-                parent_client_message_id
+        metadata_json = fast_json.dumps(stored_metadata) if stored_metadata else None
+        detail_blob = self._codec.encode(detail) if detail else None
+        preview = serialized_content[:_PREVIEW_MAX_CHARS] if role == "user" else None
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                """
+                INSERT INTO messages(
+                    session_id,
+                    role,
+                    content,
+                    tool_call_id,
+                    metadata,
+                    metadata_detail,
+                    client_message_id,
+                    parent_client_message_id
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    session_id,
+                    role,
+                    serialized_content,
+                    tool_call_id,
+                    metadata_json,
+                    detail_blob,
+                    client_message_id,
+                    parent_client_message_id,
+                ),
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                session_id,
-                role,
-                serialized_content,
-                tool_call_id,
-                metadata_json,
-                client_message_id,
-                parent_client_message_id,
-            ),
-        )
-        await self._connection.commit()
-        try:
-            inserted_id = cursor.lastrowid
-        finally:
-            await cursor.close()
-        if inserted_id is None:  # pragma: no cover - defensive
-            raise RuntimeError("Insert failed: lastrowid is None")
-        timestamp_cursor = await self._connection.execute(
-            "SELECT created_at FROM messages WHERE id = ?",
-            (inserted_id,),
-        )
-        timestamp_row = await timestamp_cursor.fetchone()
-        await timestamp_cursor.close()
+            try:
+                inserted_id = cursor.lastrowid
+            finally:
+                await cursor.close()
+            if inserted_id is None:  # pragma: no cover - defensive
+                raise RuntimeError("Insert failed: lastrowid is None")
+            if self._search_enabled and role in _SEARCHABLE_ROLES:
+                text = _searchable_text(content)
+                if text:
+                    await connection.execute(
+                        "INSERT INTO messages_fts(rowid, text, session_id) VALUES (?, ?, ?)",
+                        (inserted_id, text, session_id),
+                    )
+            timestamp_cursor = await connection.execute(
+                "SELECT created_at FROM messages WHERE id = ?",
+                (inserted_id,),
+            )
+            timestamp_row = await timestamp_cursor.fetchone()
+            await timestamp_cursor.close()
+
+            # Touch activity, maintain the listing summary and auto-title
+            await connection.execute(
+                """
+                UPDATE conversations
+                SET
+                    updated_at = CURRENT_TIMESTAMP,
+                    last_activity_at = CURRENT_TIMESTAMP,
+                    message_count = message_count + 1,
+                    preview = COALESCE(preview, ?)
+                WHERE session_id = ?
+                """,
+                (preview, session_id),
+            )
+            if role == "user":
+                await self._auto_title_if_needed(connection, session_id)
+
         created_at: str | None = None
         if timestamp_row is not None:
             created_at = normalize_db_timestamp(timestamp_row["created_at"])
-
-        # Touch updated_at and auto-title saved sessions
-        await self._connection.execute(
-            "UPDATE conversations SET updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
-            (session_id,),
-        )
-        await self._connection.commit()
-        if role == "user":
-            await self._auto_title_if_needed(session_id)
-
         return int(inserted_id), created_at
 
-    async def get_messages(self, session_id: str) -> list[MessageRecord]:
-        """Return conversation messages ordered by insertion."""
+    async def get_messages(
+        self,
+        session_id: str,
+        *,
+        before_id: int | None = None,
+        limit: int | None = None,
+        tool_result_max_chars: int | None = None,
+        include_details: bool = True,
+    ) -> list[MessageRecord]:
+        """Return conversation messages ordered by insertion.
+
+        By default the whole conversation is returned. With ``limit`` only the
+        newest ``limit`` messages older than ``before_id`` (or the tail of the
+        conversation when ``before_id`` is None) are returned, still in
+        ascending order. ``tool_result_max_chars`` truncates long tool results
+        in SQL; such messages carry ``content_truncated`` and
+        ``content_length`` and can be fetched in full with :meth:`get_message`.
+        ``include_details=False`` leaves out UI-only metadata (usage, routing,
+        reasoning, meta) without reading or decoding it; use it for model input.
+        """
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
-            """
+        clauses = ["session_id = ?"]
+        params: list[Any] = [tool_result_max_chars] * 3 + [session_id]
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        query = f"""
             SELECT
                 id,
                 role,
-                content,
+                CASE
+                    WHEN ? IS NOT NULL AND role = 'tool' AND length(content) > ?
+                    THEN substr(content, 1, ?)
+                    ELSE content
+                END AS content,
+                length(content) AS content_length,
                 tool_call_id,
                 metadata,
+                {"metadata_detail" if include_details else "NULL AS metadata_detail"},
                 client_message_id,
                 parent_client_message_id,
                 created_at
             FROM messages
-            WHERE session_id = ?
-            ORDER BY id ASC
-            """,
-            (session_id,),
-        )
-        rows = await cursor.fetchall()
-        await cursor.close()
+            WHERE {" AND ".join(clauses)}
+        """
+        if limit is None:
+            rows = await self._fetchall(query + " ORDER BY id ASC", params)
+        else:
+            rows = await self._fetchall(
+                query + " ORDER BY id DESC LIMIT ?", [*params, limit]
+            )
+            rows.reverse()
 
-        messages: list[MessageRecord] = []
-        for row in rows:
-            metadata = json.loads(row["metadata"]) if row["metadata"] else None
-            is_structured = False
-            if metadata and metadata.pop(_CONTENT_JSON_METADATA_KEY, None):
-                is_structured = True
-            message: MessageRecord = {
-                "role": row["role"],
-            }
-            message["message_id"] = row["id"]
-            content = _decode_content(row["content"], is_structured)
-            if content is not None:
-                message["content"] = content
-            if row["tool_call_id"]:
-                message["tool_call_id"] = row["tool_call_id"]
-            if metadata:
-                message.update(metadata)
-            client_message_id = row["client_message_id"]
-            if client_message_id:
-                message["client_message_id"] = client_message_id
-            parent_client_message_id = row["parent_client_message_id"]
-            if parent_client_message_id:
-                message["parent_client_message_id"] = parent_client_message_id
-            created_at = normalize_db_timestamp(row["created_at"])
-            edt_iso, utc_iso = format_timestamp_for_client(created_at)
-            if edt_iso is not None:
-                message["created_at"] = edt_iso
-            if utc_iso is not None:
-                message["created_at_utc"] = utc_iso
-            messages.append(message)
-        return messages
+        return [
+            self._row_to_message(
+                row,
+                tool_result_max_chars=tool_result_max_chars,
+                include_details=include_details,
+            )
+            for row in rows
+        ]
 
-    async def update_latest_system_message(self, session_id: str, content: Any) -> bool:
-        """Update the most recent system message for a session."""
+    async def get_message(
+        self, session_id: str, message_id: int
+    ) -> MessageRecord | None:
+        """Return a single message with its full content."""
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
+        row = await self._fetchone(
             """
-            SELECT id, metadata
+            SELECT
+                id,
+                role,
+                content,
+                length(content) AS content_length,
+                tool_call_id,
+                metadata,
+                metadata_detail,
+                client_message_id,
+                parent_client_message_id,
+                created_at
             FROM messages
-            WHERE session_id = ? AND role = ?
-            ORDER BY id DESC
-            LIMIT 1
+            WHERE session_id = ? AND id = ?
             """,
-            (session_id, "system"),
+            (session_id, message_id),
         )
-        row = await cursor.fetchone()
-        await cursor.close()
         if row is None:
-            return False
-
-        serialized_content, structured = _encode_content(content)
+            return None
+        return self._row_to_message(row)
 
-        metadata_json = row["metadata"]
-        metadata: dict[str, Any] | None
-        if metadata_json:
+    @staticmethod
+    def _row_to_message(
+        row: aiosqlite.Row,
+        *,
+        tool_result_max_chars: int | None = None,
+        include_details: bool = True,
+    ) -> MessageRecord:
+        metadata = fast_json.loads(row["metadata"]) if row["metadata"] else None
+        is_structured = False
+        if metadata and metadata.pop(_CONTENT_JSON_METADATA_KEY, None):
+            is_structured = True
+        if include_details and row["metadata_detail"] is not None:
             try:
-                metadata = json.loads(metadata_json)
-            except json.JSONDecodeError:
+                details = decode_payload(row["metadata_detail"])
+            except Exception as exc:
+                # e.g. written as msgpack/zstd and that package is now missing;
+                # the message itself is still readable without its details.
+                logger.warning(
+                    "Skipping unreadable detail metadata of message %s: %s",
+                    row["id"],
+                    exc,
+                )
+            else:
+                metadata = {**(metadata or {}), **details}
+        elif not include_details and metadata:
+            # Rows written before the detail column kept these inline.
+            for key in _DETAIL_METADATA_KEYS:
+                metadata.pop(key, None)
+        message: MessageRecord = {
+            "role": row["role"],
+        }
+        message["message_id"] = row["id"]
+        content = _decode_content(row["content"], is_structured)
+        if content is not None:
+            message["content"] = content
+        if row["tool_call_id"]:
+            message["tool_call_id"] = row["tool_call_id"]
+        if metadata:
+            message.update(metadata)
+        if (
+            tool_result_max_chars is not None
+            and row["role"] == "tool"
+            and (row["content_length"] or 0) > tool_result_max_chars
+        ):
+            message["content_truncated"] = True
+            message["content_length"] = row["content_length"]
+        client_message_id = row["client_message_id"]
+        if client_message_id:
+            message["client_message_id"] = client_message_id
+        parent_client_message_id = row["parent_client_message_id"]
+        if parent_client_message_id:
+            message["parent_client_message_id"] = parent_client_message_id
+        created_at = normalize_db_timestamp(row["created_at"])
+        edt_iso, utc_iso = format_timestamp_for_client(created_at)
+        if edt_iso is not None:
+            message["created_at"] = edt_iso
+        if utc_iso is not None:
+            message["created_at_utc"] = utc_iso
+        return message
+
+    async def update_latest_system_message(self, session_id: str, content: Any) -> bool:
+        """Update the most recent system message for a session."""
+
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                """
+                SELECT id, metadata
+                FROM messages
+                WHERE session_id = ? AND role = ?
+                ORDER BY id DESC
+                LIMIT 1
+                """,
+                (session_id, "system"),
+            )
+            row = await cursor.fetchone()
+            await cursor.close()
+            if row is None:
+                return False
+
+            serialized_content, structured = _encode_content(content)
+
+            metadata_json = row["metadata"]
+            metadata: dict[str, Any] | None
+            if metadata_json:
+                try:
+                    metadata = fast_json.loads(metadata_json)
+                except json.JSONDecodeError:
+                    metadata = None
+            else:
                 metadata = None
-        else:
-            metadata = None
 
-        if metadata:
-            metadata = dict(metadata)
-        else:
-            metadata = {}
+            if metadata:
+                metadata = dict(metadata)
+            else:
+                metadata = {}
 
-        if structured:
-            metadata[_CONTENT_JSON_METADATA_KEY] = True
-        else:
-            metadata.pop(_CONTENT_JSON_METADATA_KEY, None)
+            if structured:
+                metadata[_CONTENT_JSON_METADATA_KEY] = True
+            else:
+                metadata.pop(_CONTENT_JSON_METADATA_KEY, None)
 
-        metadata_payload = json.dumps(metadata) if metadata else None
+            metadata_payload = fast_json.dumps(metadata) if metadata else None
 
-        await self._connection.execute(
-            """
-            UPDATE messages
-            SET content = ?, metadata = ?
-            WHERE id = ?
-            """,
-            (serialized_content, metadata_payload, row["id"]),
-        )
-        await self._connection.commit()
-        return True
+            await connection.execute(
+                """
+                UPDATE messages
+                SET content = ?, metadata = ?
+                WHERE id = ?
+                """,
+                (serialized_content, metadata_payload, row["id"]),
+            )
+            return True
 
     async def add_event(
         self,
@@ -416,15 +860,14 @@ class ChatRepository:
     ) -> None:
         """Persist auxiliary metadata for debugging or replay."""
 
-        assert self._connection is not None
-        await self._connection.execute(
-            """
-            INSERT INTO events(session_id, request_id, kind, payload)
-            VALUES (?, ?, ?, ?)
-            """,
-            (session_id, request_id, kind, json.dumps(payload)),
-        )
-        await self._connection.commit()
+        async with self._write() as connection:
+            await connection.execute(
+                """
+                INSERT INTO events(session_id, request_id, kind, payload)
+                VALUES (?, ?, ?, ?)
+                """,
+                (session_id, request_id, kind, fast_json.dumps(payload)),
+            )
 
     def _row_to_attachment(self, row: aiosqlite.Row) -> AttachmentRecord:
         record: AttachmentRecord = {
@@ -441,9 +884,10 @@ class ChatRepository:
             "created_at": row["created_at"],
             "expires_at": row["expires_at"],
             "last_used_at": row["last_used_at"],
+            "content_hash": row["content_hash"],
         }
         metadata = row["metadata"]
-        record["metadata"] = json.loads(metadata) if metadata else None
+        record["metadata"] = fast_json.loads(metadata) if metadata else None
         return record
 
     async def add_attachment(
@@ -461,11 +905,11 @@ class ChatRepository:
         gcs_blob: str | None = None,
         signed_url: str | None = None,
         signed_url_expires_at: datetime | str | None = None,
+        content_hash: str | None = None,
     ) -> AttachmentRecord:
         """Persist an uploaded attachment and return the stored record."""
 
-        assert self._connection is not None
-        metadata_json = json.dumps(metadata) if metadata else None
+        metadata_json = fast_json.dumps(metadata) if metadata else None
         expires_value = (
             expires_at.isoformat(timespec="seconds")
             if isinstance(expires_at, datetime)
@@ -479,9 +923,54 @@ class ChatRepository:
         else:
             signed_url_expires_value = signed_url_expires_at
         storage_value = storage_path or gcs_blob or attachment_id
-        await self._connection.execute(
+        async with self._write() as connection:
+            await connection.execute(
+                """
+                INSERT INTO attachments(
+                    attachment_id,
+                    session_id,
+                    storage_path,
+                    mime_type,
+                    size_bytes,
+                    display_url,
+                    delivery_url,
+                    gcs_blob,
+                    signed_url,
+                    signed_url_expires_at,
+                    metadata,
+                    expires_at,
+                    content_hash,
+                    last_used_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (
+                    attachment_id,
+                    session_id,
+                    storage_value,
+                    mime_type,
+                    size_bytes,
+                    display_url,
+                    delivery_url,
+                    gcs_blob,
+                    signed_url,
+                    signed_url_expires_value,
+                    metadata_json,
+                    expires_value,
+                    content_hash,
+                ),
+            )
+        record = await self.get_attachment(attachment_id)
+        if record is None:  # pragma: no cover - defensive
+            raise RuntimeError("Attachment failed to persist")
+        return record
+
+    async def get_attachment(self, attachment_id: str) -> AttachmentRecord | None:
+        """Return a single attachment record, if present."""
+
+        row = await self._fetchone(
             """
-            INSERT INTO attachments(
+            SELECT
                 attachment_id,
                 session_id,
                 storage_path,
@@ -493,61 +982,16 @@ class ChatRepository:
                 signed_url,
                 signed_url_expires_at,
                 metadata,
+                created_at,
                 expires_at,
-                last_used_at
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """,
-            (
-                attachment_id,
-                session_id,
-                storage_value,
-                mime_type,
-                size_bytes,
-                display_url,
-                delivery_url,
-                gcs_blob,
-                signed_url,
-                signed_url_expires_value,
-                metadata_json,
-                expires_value,
-            ),
-        )
-        await self._connection.commit()
-        record = await self.get_attachment(attachment_id)
-        if record is None:  # pragma: no cover - defensive
-            raise RuntimeError("Attachment failed to persist")
-        return record
-
-    async def get_attachment(self, attachment_id: str) -> AttachmentRecord | None:
-        """Return a single attachment record, if present."""
-
-        assert self._connection is not None
-        cursor = await self._connection.execute(
-            """
-            SELECT
-                attachment_id,
-                session_id,
-                storage_path,
-                mime_type,
-                size_bytes,
-                display_url,
-                delivery_url,
-                gcs_blob,
-                signed_url,
-                signed_url_expires_at,
-                metadata,
-                created_at,
-                expires_at,
-                last_used_at
-            FROM attachments
-            WHERE attachment_id = ?
-            LIMIT 1
+                last_used_at,
+                content_hash
+            FROM attachments
+            WHERE attachment_id = ?
+            LIMIT 1
             """,
             (attachment_id,),
         )
-        row = await cursor.fetchone()
-        await cursor.close()
         if row is None:
             return None
         return self._row_to_attachment(row)
@@ -561,9 +1005,8 @@ class ChatRepository:
         if not ids:
             return {}
 
-        assert self._connection is not None
         placeholders = ",".join("?" for _ in ids)
-        cursor = await self._connection.execute(
+        rows = await self._fetchall(
             f"""
             SELECT
                 attachment_id,
@@ -579,14 +1022,13 @@ class ChatRepository:
                 metadata,
                 created_at,
                 expires_at,
-                last_used_at
+                last_used_at,
+                content_hash
             FROM attachments
             WHERE attachment_id IN ({placeholders})
             """,
             ids,
         )
-        rows = await cursor.fetchall()
-        await cursor.close()
         return {row["attachment_id"]: self._row_to_attachment(row) for row in rows}
 
     async def get_attachment_by_storage_path(
@@ -598,8 +1040,7 @@ class ChatRepository:
         (e.g., `session_id/attachment_id.ext`).
         """
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
+        row = await self._fetchone(
             """
             SELECT
                 attachment_id,
@@ -615,60 +1056,138 @@ class ChatRepository:
                 metadata,
                 created_at,
                 expires_at,
-                last_used_at
+                last_used_at,
+                content_hash
             FROM attachments
             WHERE storage_path = ?
             LIMIT 1
             """,
             (storage_path,),
         )
-        row = await cursor.fetchone()
-        await cursor.close()
         if row is None:
             return None
         return self._row_to_attachment(row)
 
+    async def find_attachment_by_content_hash(
+        self,
+        content_hash: str,
+        *,
+        in_gcs: bool,
+        valid_after: datetime,
+        exclude_attachment_id: str | None = None,
+    ) -> AttachmentRecord | None:
+        """Return a record whose stored object can be shared for ``content_hash``.
+
+        Only records in the requested backend whose retention extends past
+        ``valid_after`` qualify, so a reused object is not about to be
+        removed by expiry cleanup.
+        """
+
+        rows = await self._fetchall(
+            f"""
+            SELECT
+                attachment_id,
+                session_id,
+                storage_path,
+                mime_type,
+                size_bytes,
+                display_url,
+                delivery_url,
+                gcs_blob,
+                signed_url,
+                signed_url_expires_at,
+                metadata,
+                created_at,
+                expires_at,
+                last_used_at,
+                content_hash
+            FROM attachments
+            WHERE content_hash = ?
+              AND gcs_blob IS {"NOT NULL" if in_gcs else "NULL"}
+            ORDER BY created_at DESC
+            """,
+            (content_hash,),
+        )
+        reference = valid_after.astimezone(timezone.utc)
+        for row in rows:
+            if row["attachment_id"] == exclude_attachment_id:
+                continue
+            record = self._row_to_attachment(row)
+            expires_at = parse_db_timestamp(record.get("expires_at"))
+            if expires_at is None or expires_at > reference:
+                return record
+        return None
+
+    async def count_attachments_by_storage_path(self, storage_path: str) -> int:
+        """Return how many attachment records reference a stored object."""
+
+        row = await self._fetchone(
+            "SELECT COUNT(*) FROM attachments WHERE storage_path = ?",
+            (storage_path,),
+        )
+        return int(row[0]) if row else 0
+
+    async def count_attachments_by_storage_paths(
+        self, storage_paths: Sequence[str]
+    ) -> dict[str, int]:
+        """Return reference counts for several stored objects at once."""
+
+        unique = list(dict.fromkeys(storage_paths))
+        if not unique:
+            return {}
+        placeholders = ", ".join("?" for _ in unique)
+        rows = await self._fetchall(
+            f"""
+            SELECT storage_path, COUNT(*)
+            FROM attachments
+            WHERE storage_path IN ({placeholders})
+            GROUP BY storage_path
+            """,
+            tuple(unique),
+        )
+        counts = {path: 0 for path in unique}
+        counts.update({row[0]: int(row[1]) for row in rows})
+        return counts
+
     async def touch_attachment(
         self, attachment_id: str, *, session_id: str | None = None
     ) -> bool:
         """Refresh the last-used timestamp for an attachment."""
 
-        assert self._connection is not None
-        if session_id:
-            cursor = await self._connection.execute(
-                """
-                UPDATE attachments
-                SET last_used_at = CURRENT_TIMESTAMP
-                WHERE attachment_id = ? AND session_id = ?
-                """,
-                (attachment_id, session_id),
-            )
-        else:
-            cursor = await self._connection.execute(
-                """
-                UPDATE attachments
-                SET last_used_at = CURRENT_TIMESTAMP
-                WHERE attachment_id = ?
-                """,
-                (attachment_id,),
-            )
-        updated = cursor.rowcount
-        await cursor.close()
-        await self._connection.commit()
-        return bool(updated)
+        async with self._write() as connection:
+            if session_id:
+                cursor = await connection.execute(
+                    """
+                    UPDATE attachments
+                    SET last_used_at = CURRENT_TIMESTAMP
+                    WHERE attachment_id = ? AND session_id = ?
+                    """,
+                    (attachment_id, session_id),
+                )
+            else:
+                cursor = await connection.execute(
+                    """
+                    UPDATE attachments
+                    SET last_used_at = CURRENT_TIMESTAMP
+                    WHERE attachment_id = ?
+                    """,
+                    (attachment_id,),
+                )
+            updated = cursor.rowcount
+            await cursor.close()
+            return bool(updated)
 
     async def delete_attachment(self, attachment_id: str) -> bool:
         """Remove an attachment record."""
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
-            "DELETE FROM attachments WHERE attachment_id = ?",
-            (attachment_id,),
-        )
-        deleted = cursor.rowcount
-        await cursor.close()
-        await self._connection.commit()
-        return bool(deleted)
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                "DELETE FROM attachments WHERE attachment_id = ?",
+                (attachment_id,),
+            )
+            deleted = cursor.rowcount
+            await cursor.close()
+            return bool(deleted)
 
     async def update_attachment_signed_url(
         self,
@@ -679,41 +1198,86 @@ class ChatRepository:
     ) -> None:
         """Persist refreshed signed URL metadata for an attachment."""
 
-        assert self._connection is not None
         if isinstance(signed_url_expires_at, datetime):
             expires_value = signed_url_expires_at.isoformat(timespec="seconds")
         else:
             expires_value = signed_url_expires_at
-        await self._connection.execute(
-            """
-            UPDATE attachments
-            SET
-                signed_url = ?,
-                signed_url_expires_at = ?,
-                display_url = ?,
-                delivery_url = ?
-            WHERE attachment_id = ?
-            """,
-            (
-                signed_url,
-                expires_value,
-                signed_url,
-                signed_url,
-                attachment_id,
-            ),
-        )
-        await self._connection.commit()
+        async with self._write() as connection:
+            await connection.execute(
+                """
+                UPDATE attachments
+                SET
+                    signed_url = ?,
+                    signed_url_expires_at = ?,
+                    display_url = ?,
+                    delivery_url = ?
+                WHERE attachment_id = ?
+                """,
+                (
+                    signed_url,
+                    expires_value,
+                    signed_url,
+                    signed_url,
+                    attachment_id,
+                ),
+            )
+
+    async def update_attachment_metadata(
+        self, attachment_id: str, metadata: dict[str, Any] | None
+    ) -> None:
+        """Replace the metadata JSON stored for an attachment."""
+
+        async with self._write() as connection:
+            await connection.execute(
+                "UPDATE attachments SET metadata = ? WHERE attachment_id = ?",
+                (fast_json.dumps(metadata) if metadata else None, attachment_id),
+            )
+
+    async def update_attachment_signed_urls(
+        self,
+        updates: list[tuple[str, str, datetime | str]],
+    ) -> None:
+        """Persist many refreshed signed URLs in a single transaction.
+
+        Each update is ``(attachment_id, signed_url, signed_url_expires_at)``.
+        """
+
+        if not updates:
+            return
+        rows = []
+        for attachment_id, signed_url, expires_at in updates:
+            if isinstance(expires_at, datetime):
+                expires_at = expires_at.isoformat(timespec="seconds")
+            rows.append((signed_url, expires_at, signed_url, signed_url, attachment_id))
+        async with self._write() as connection:
+            await connection.executemany(
+                """
+                UPDATE attachments
+                SET
+                    signed_url = ?,
+                    signed_url_expires_at = ?,
+                    display_url = ?,
+                    delivery_url = ?
+                WHERE attachment_id = ?
+                """,
+                rows,
+            )
 
     async def find_expired_attachments(
         self,
         *,
         now: datetime,
+        limit: int | None = None,
+        after_id: str | None = None,
     ) -> list[AttachmentRecord]:
-        """Return attachment records whose retention windows have elapsed."""
+        """Return attachment records whose retention windows have elapsed.
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
-            """
+        Records are ordered by ``attachment_id``; pass ``limit`` and the last
+        id of the previous page as ``after_id`` to walk them in pages.
+        """
+
+        reference = now.astimezone(timezone.utc)
+        query = """
             SELECT
                 attachment_id,
                 session_id,
@@ -728,16 +1292,22 @@ class ChatRepository:
                 metadata,
                 created_at,
                 expires_at,
-                last_used_at
+                last_used_at,
+                content_hash
             FROM attachments
-            WHERE expires_at IS NOT NULL
-               OR signed_url_expires_at IS NOT NULL
-            """,
-        )
-        rows = await cursor.fetchall()
-        await cursor.close()
+            WHERE julianday(COALESCE(expires_at, signed_url_expires_at))
+                  <= julianday(?)
+        """
+        params: list[Any] = [reference.isoformat()]
+        if after_id is not None:
+            query += " AND attachment_id > ?"
+            params.append(after_id)
+        query += " ORDER BY attachment_id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        rows = await self._fetchall(query, params)
 
-        reference = now.astimezone(timezone.utc)
         expired: list[AttachmentRecord] = []
         for row in rows:
             record = self._row_to_attachment(row)
@@ -750,6 +1320,21 @@ class ChatRepository:
                 expired.append(record)
         return expired
 
+    async def delete_attachments(self, attachment_ids: Sequence[str]) -> int:
+        """Remove many attachment records in one transaction; return the count."""
+
+        if not attachment_ids:
+            return 0
+        placeholders = ", ".join("?" for _ in attachment_ids)
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                f"DELETE FROM attachments WHERE attachment_id IN ({placeholders})",
+                tuple(attachment_ids),
+            )
+            deleted = cursor.rowcount
+            await cursor.close()
+            return deleted
+
     async def mark_attachments_used(
         self, session_id: str, attachment_ids: Iterable[str]
     ) -> None:
@@ -758,10 +1343,11 @@ class ChatRepository:
         if not attachment_ids:
             return
 
-        assert self._connection is not None
         params = [(attachment_id, session_id) for attachment_id in attachment_ids]
-        if params:
-            await self._connection.executemany(
+        if not params:
+            return
+        async with self._write() as connection:
+            await connection.executemany(
                 """
                 UPDATE attachments
                 SET last_used_at = CURRENT_TIMESTAMP
@@ -769,7 +1355,6 @@ class ChatRepository:
                 """,
                 params,
             )
-        await self._connection.commit()
 
     async def delete_message(
         self,
@@ -778,46 +1363,49 @@ class ChatRepository:
     ) -> int:
         """Delete a message and recursively remove dependent children."""
 
-        assert self._connection is not None
-
         numeric_identifier: int | None
         try:
             numeric_identifier = int(client_message_id)
         except (TypeError, ValueError):
             numeric_identifier = None
 
-        cursor = await self._connection.execute(
-            """
-            WITH RECURSIVE target_messages AS (
-                SELECT id, client_message_id
-                FROM messages
-                WHERE session_id = ?
-                  AND (
-                    client_message_id = ?
-                    OR (? IS NOT NULL AND id = ?)
-                  )
-                UNION ALL
-                SELECT child.id, child.client_message_id
-                FROM messages AS child
-                JOIN target_messages AS parent
-                  ON child.parent_client_message_id = parent.client_message_id
-                WHERE child.session_id = ?
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                """
+                WITH RECURSIVE target_messages AS (
+                    SELECT id, client_message_id
+                    FROM messages
+                    WHERE session_id = ?
+                      AND (
+                        client_message_id = ?
+                        OR (? IS NOT NULL AND id = ?)
+                      )
+                    UNION ALL
+                    SELECT child.id, child.client_message_id
+                    FROM messages AS child
+                    JOIN target_messages AS parent
+                      ON child.parent_client_message_id = parent.client_message_id
+                    WHERE child.session_id = ?
+                )
+                DELETE FROM messages
+                WHERE id IN (SELECT id FROM target_messages)
+                """,
+                (
+                    session_id,
+                    client_message_id,
+                    numeric_identifier,
+                    numeric_identifier,
+                    session_id,
+                ),
             )
-            DELETE FROM messages
-            WHERE id IN (SELECT id FROM target_messages)
-            """,
-            (
-                session_id,
-                client_message_id,
-                numeric_identifier,
-                numeric_identifier,
-                session_id,
-            ),
-        )
-        deleted = cursor.rowcount
-        await cursor.close()
-        await self._connection.commit()
-        return deleted
+            deleted = cursor.rowcount
+            await cursor.close()
+            if deleted:
+                await connection.execute(
+                    _REFRESH_CONVERSATION_SUMMARY_SQL + " WHERE session_id = ?",
+                    (session_id,),
+                )
+            return deleted
 
     async def list_saved_conversations(
         self,
@@ -825,14 +1413,27 @@ class ChatRepository:
         limit: int = 50,
         offset: int = 0,
         search: str | None = None,
+        cursor: str | None = None,
     ) -> list[dict[str, Any]]:
-        """Return saved conversations with title, date, and message preview."""
+        """Return saved conversations with title, date, and message preview.
+
+        Results are ordered by most recent activity and read from summary
+        columns maintained at write time, walking
+        ``idx_conversations_saved_activity``. Pass the ``cursor`` of the last
+        row to fetch the next page by keyset instead of ``offset``. With
+        ``search`` and an FTS5-enabled SQLite, results come from
+        :meth:`search_conversations` (ranked, with snippets).
+        """
+
+        if search and self._search_enabled and _fts_query(search):
+            return await self.search_conversations(search, limit=limit, offset=offset)
 
-        assert self._connection is not None
         params: list[Any] = []
         where_clauses = ["c.saved = 1"]
 
         if search:
+            # Match the whole first user message, not just its 200-character
+            # preview; only this unindexed fallback pays for the lookup.
             where_clauses.append(
                 "(c.title LIKE ? OR "
                 "(SELECT m.content FROM messages m "
@@ -842,10 +1443,19 @@ class ChatRepository:
             like_term = f"%{search}%"
             params.extend([like_term, like_term])
 
+        keyset = decode_conversation_cursor(cursor) if cursor else None
+        if keyset is not None:
+            where_clauses.append(
+                "(c.last_activity_at < ? "
+                "OR (c.last_activity_at = ? AND c.session_id < ?))"
+            )
+            params.extend([keyset[0], keyset[0], keyset[1]])
+            offset = 0
+
         where_sql = " AND ".join(where_clauses)
         params.extend([limit, offset])
 
-        cursor = await self._connection.execute(
+        rows = await self._fetchall(
             f"""
             SELECT
                 c.session_id,
@@ -853,39 +1463,111 @@ class ChatRepository:
                 c.title_source,
                 c.created_at,
                 c.updated_at,
-                (SELECT COUNT(*) FROM messages m WHERE m.session_id = c.session_id) AS message_count,
-                (SELECT m.content FROM messages m
-                 WHERE m.session_id = c.session_id AND m.role = 'user'
-                 ORDER BY m.id ASC LIMIT 1) AS preview
+                c.last_activity_at,
+                c.message_count,
+                c.preview
             FROM conversations c
             WHERE {where_sql}
-            ORDER BY COALESCE(c.updated_at, c.created_at) DESC
+            ORDER BY c.last_activity_at DESC, c.session_id DESC
             LIMIT ? OFFSET ?
             """,
             tuple(params),
         )
-        rows = await cursor.fetchall()
-        await cursor.close()
-        results: list[dict[str, Any]] = []
-        for row in rows:
-            preview_text = row["preview"] or ""
-            if len(preview_text) > 200:
-                preview_text = preview_text[:200]
-            created_at = normalize_db_timestamp(row["created_at"])
-            updated_at = (
-                normalize_db_timestamp(row["updated_at"]) if row["updated_at"] else None
+        return [self._row_to_conversation_summary(row) for row in rows]
+
+    @staticmethod
+    def _row_to_conversation_summary(row: aiosqlite.Row) -> dict[str, Any]:
+        created_at = normalize_db_timestamp(row["created_at"])
+        updated_at = (
+            normalize_db_timestamp(row["updated_at"]) if row["updated_at"] else None
+        )
+        return {
+            "session_id": row["session_id"],
+            "title": row["title"],
+            "title_source": row["title_source"] or "auto",
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "message_count": row["message_count"],
+            "preview": row["preview"] or "",
+            "cursor": encode_conversation_cursor(
+                row["last_activity_at"], row["session_id"]
+            ),
+        }
+
+    async def search_conversations(
+        self,
+        search: str,
+        *,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]:
+        """Rank saved conversations by full-text matches in their messages.
+
+        Every term matches as a prefix against user and assistant message
+        text; conversations whose title contains the search text rank first.
+        Each result carries a ``snippet`` of its best-matching message (terms
+        wrapped in ``**``) and that message's id as ``match_message_id``.
+        """
+
+        match = _fts_query(search)
+        if not match:
+            return []
+        like_term = f"%{search}%"
+        rows = await self._fetchall(
+            """
+            WITH best AS (
+                SELECT session_id, rowid AS message_id, MIN(rank) AS score
+                FROM messages_fts
+                WHERE messages_fts MATCH ?
+                GROUP BY session_id
             )
-            results.append(
-                {
-                    "session_id": row["session_id"],
-                    "title": row["title"],
-                    "title_source": row["title_source"] or "auto",
-                    "created_at": created_at,
-                    "updated_at": updated_at,
-                    "message_count": row["message_count"],
-                    "preview": preview_text,
-                }
+            SELECT
+                c.session_id,
+                c.title,
+                c.title_source,
+                c.created_at,
+                c.updated_at,
+                c.last_activity_at,
+                c.message_count,
+                c.preview,
+                best.message_id AS match_message_id,
+                COALESCE(c.title LIKE ?, 0) AS title_match
+            FROM conversations c
+            LEFT JOIN best ON best.session_id = c.session_id
+            WHERE c.saved = 1
+              AND (best.session_id IS NOT NULL OR c.title LIKE ?)
+            ORDER BY
+                title_match DESC,
+                best.score IS NULL,
+                best.score,
+                c.last_activity_at DESC
+            LIMIT ? OFFSET ?
+            """,
+            (match, like_term, like_term, limit, offset),
+        )
+
+        message_ids = [
+            row["match_message_id"] for row in rows if row["match_message_id"]
+        ]
+        snippets: dict[int, str] = {}
+        if message_ids:
+            placeholders = ", ".join("?" for _ in message_ids)
+            snippet_rows = await self._fetchall(
+                f"""
+                SELECT rowid, snippet(messages_fts, 0, '**', '**', '…', ?) AS snippet
+                FROM messages_fts
+                WHERE messages_fts MATCH ? AND rowid IN ({placeholders})
+                """,
+                (_SEARCH_SNIPPET_TOKENS, match, *message_ids),
             )
+            snippets = {row["rowid"]: row["snippet"] for row in snippet_rows}
+
+        results: list[dict[str, Any]] = []
+        for row in rows:
+            summary = self._row_to_conversation_summary(row)
+            summary["snippet"] = snippets.get(row["match_message_id"])
+            summary["match_message_id"] = row["match_message_id"]
+            results.append(summary)
         return results
 
     async def save_session(
@@ -897,20 +1579,19 @@ class ChatRepository:
     ) -> bool:
         """Mark a session as saved, optionally setting its title and LLM settings."""
 
-        assert self._connection is not None
-        llm_settings_json = json.dumps(llm_settings) if llm_settings else None
-        if title:
-            await self._connection.execute(
-                "UPDATE conversations SET saved = 1, title = ?, title_source = 'user', llm_settings = ?, updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
-                (title, llm_settings_json, session_id),
-            )
-        else:
-            await self._connection.execute(
-                "UPDATE conversations SET saved = 1, llm_settings = ?, updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
-                (llm_settings_json, session_id),
-            )
-        await self._connection.commit()
-        return True
+        llm_settings_json = fast_json.dumps(llm_settings) if llm_settings else None
+        async with self._write() as connection:
+            if title:
+                await connection.execute(
+                    "UPDATE conversations SET saved = 1, title = ?, title_source = 'user', llm_settings = ?, updated_at = CURRENT_TIMESTAMP, last_activity_at = CURRENT_TIMESTAMP WHERE session_id = ?",
+                    (title, llm_settings_json, session_id),
+                )
+            else:
+                await connection.execute(
+                    "UPDATE conversations SET saved = 1, llm_settings = ?, updated_at = CURRENT_TIMESTAMP, last_activity_at = CURRENT_TIMESTAMP WHERE session_id = ?",
+                    (llm_settings_json, session_id),
+                )
+            return True
 
     async def update_session_llm_settings(
         self,
@@ -919,50 +1600,49 @@ class ChatRepository:
     ) -> bool:
         """Update the LLM settings for a session."""
 
-        assert self._connection is not None
-        llm_settings_json = json.dumps(llm_settings) if llm_settings else None
-        cursor = await self._connection.execute(
-            "UPDATE conversations SET llm_settings = ?, updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
-            (llm_settings_json, session_id),
-        )
-        updated = cursor.rowcount
-        await cursor.close()
-        await self._connection.commit()
-        return bool(updated)
-        await self._connection.commit()
-        return True
+        llm_settings_json = fast_json.dumps(llm_settings) if llm_settings else None
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                "UPDATE conversations SET llm_settings = ?, updated_at = CURRENT_TIMESTAMP, last_activity_at = CURRENT_TIMESTAMP WHERE session_id = ?",
+                (llm_settings_json, session_id),
+            )
+            updated = cursor.rowcount
+            await cursor.close()
+            return bool(updated)
 
     async def unsave_session(self, session_id: str) -> bool:
         """Remove the saved flag from a session."""
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
-            "UPDATE conversations SET saved = 0 WHERE session_id = ?",
-            (session_id,),
-        )
-        updated = cursor.rowcount
-        await cursor.close()
-        await self._connection.commit()
-        return bool(updated)
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                "UPDATE conversations SET saved = 0 WHERE session_id = ?",
+                (session_id,),
+            )
+            updated = cursor.rowcount
+            await cursor.close()
+            return bool(updated)
 
     async def update_session_title(self, session_id: str, title: str) -> bool:
         """Update the display title for a session."""
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
-            "UPDATE conversations SET title = ?, title_source = 'user', updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
-            (title, session_id),
-        )
-        updated = cursor.rowcount
-        await cursor.close()
-        await self._connection.commit()
-        return bool(updated)
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                "UPDATE conversations SET title = ?, title_source = 'user', updated_at = CURRENT_TIMESTAMP, last_activity_at = CURRENT_TIMESTAMP WHERE session_id = ?",
+                (title, session_id),
+            )
+            updated = cursor.rowcount
+            await cursor.close()
+            return bool(updated)
 
-    async def _auto_title_if_needed(self, session_id: str) -> None:
-        """Set a title from the first user message if the session has no title."""
+    async def _auto_title_if_needed(
+        self, connection: aiosqlite.Connection, session_id: str
+    ) -> None:
+        """Set a title from the first user message if the session has no title.
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
+        Runs inside the caller's :meth:`_write` transaction.
+        """
+
+        cursor = await connection.execute(
             "SELECT title FROM conversations WHERE session_id = ?",
             (session_id,),
         )
@@ -971,7 +1651,7 @@ class ChatRepository:
         if row is None or row["title"]:
             return
 
-        cursor = await self._connection.execute(
+        cursor = await connection.execute(
             """
             SELECT content FROM messages
             WHERE session_id = ? AND role = 'user'
@@ -987,7 +1667,7 @@ class ChatRepository:
         content = msg_row["content"]
         # Handle structured content (JSON array)
         try:
-            parsed = json.loads(content)
+            parsed = fast_json.loads(content)
             if isinstance(parsed, list):
                 text_parts = [
                     item.get("text", "")
@@ -1002,44 +1682,221 @@ class ChatRepository:
         if len(title) > 60:
             title = title[:57] + "..."
         if title:
-            await self._connection.execute(
+            await connection.execute(
                 "UPDATE conversations SET title = ?, title_source = 'auto' WHERE session_id = ? AND title IS NULL",
                 (title, session_id),
             )
-            await self._connection.commit()
 
     async def delete_saved_conversation(self, session_id: str) -> bool:
         """Permanently delete a saved conversation and all its data."""
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
-            "DELETE FROM conversations WHERE session_id = ?",
-            (session_id,),
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                "DELETE FROM conversations WHERE session_id = ?",
+                (session_id,),
+            )
+            deleted = cursor.rowcount
+            await cursor.close()
+            return bool(deleted)
+
+    async def find_archivable_sessions(
+        self, *, inactive_before: datetime, limit: int
+    ) -> list[str]:
+        """Return unsaved sessions idle since before ``inactive_before``.
+
+        Sessions that still reference attachments are left alone; the expiry
+        cleanup removes those first.
+        """
+
+        rows = await self._fetchall(
+            """
+            SELECT c.session_id
+            FROM conversations c
+            WHERE c.saved = 0
+              AND c.last_activity_at < ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM attachments a WHERE a.session_id = c.session_id
+              )
+            ORDER BY c.last_activity_at ASC
+            LIMIT ?
+            """,
+            (_db_timestamp(inactive_before), limit),
         )
-        deleted = cursor.rowcount
+        return [row["session_id"] for row in rows]
+
+    async def export_session(self, session_id: str) -> dict[str, Any] | None:
+        """Return the raw rows of a session for archiving, or None if missing."""
+
+        snapshot: dict[str, Any] = {"session_id": session_id, "tables": {}}
+        async with self._readers.acquire() as reader:
+            for table, column in _ARCHIVED_TABLES:
+                cursor = await reader.execute(
+                    f"SELECT * FROM {table} WHERE {column} = ?", (session_id,)
+                )
+                rows = await cursor.fetchall()
+                await cursor.close()
+                snapshot["tables"][table] = [
+                    {key: _archive_value(row[key]) for key in row.keys()}
+                    for row in rows
+                ]
+        if not snapshot["tables"]["conversations"]:
+            return None
+        return snapshot
+
+    async def import_session(self, snapshot: dict[str, Any]) -> bool:
+        """Re-insert a session from :meth:`export_session` in one transaction.
+
+        Returns False when a session with the same id already exists. Columns
+        unknown to the current schema are dropped and the session's activity
+        timestamp is refreshed, so it is not archived again right away.
+        """
+
+        session_id = snapshot["session_id"]
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                "SELECT 1 FROM conversations WHERE session_id = ?", (session_id,)
+            )
+            exists = await cursor.fetchone() is not None
+            await cursor.close()
+            if exists:
+                return False
+
+            for table, _ in _ARCHIVED_TABLES:
+                rows = snapshot["tables"].get(table) or []
+                if not rows:
+                    continue
+                cursor = await connection.execute(f"PRAGMA table_info({table})")
+                known = {row[1] for row in await cursor.fetchall()}
+                await cursor.close()
+                columns = [column for column in rows[0] if column in known]
+                placeholders = ", ".join("?" for _ in columns)
+                await connection.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({placeholders})",
+                    [
+                        tuple(_restore_value(row.get(column)) for column in columns)
+                        for row in rows
+                    ],
+                )
+            if self._search_enabled:
+                entries = [
+                    (row["id"], text, session_id)
+                    for row in snapshot["tables"].get("messages") or []
+                    if row.get("role") in _SEARCHABLE_ROLES
+                    and (text := _searchable_text(row.get("content")))
+                ]
+                await connection.executemany(
+                    "INSERT INTO messages_fts(rowid, text, session_id) "
+                    "VALUES (?, ?, ?)",
+                    entries,
+                )
+            await connection.execute(
+                """
+                UPDATE conversations SET last_activity_at = CURRENT_TIMESTAMP
+                WHERE session_id = ?
+                """,
+                (session_id,),
+            )
+        return True
+
+    async def delete_inactive_sessions(
+        self, session_ids: Sequence[str], *, inactive_before: datetime
+    ) -> list[str]:
+        """Delete archived sessions that are still unsaved and idle.
+
+        Re-checking the archiving conditions keeps a session that became
+        active (or was saved) after it was exported. Returns the deleted ids.
+        """
+
+        if not session_ids:
+            return []
+        placeholders = ", ".join("?" for _ in session_ids)
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                f"""
+                DELETE FROM conversations
+                WHERE session_id IN ({placeholders})
+                  AND saved = 0
+                  AND last_activity_at < ?
+                RETURNING session_id
+                """,
+                (*session_ids, _db_timestamp(inactive_before)),
+            )
+            deleted = [row["session_id"] for row in await cursor.fetchall()]
+            await cursor.close()
+            return deleted
+
+    async def compact_storage(self) -> None:
+        """Return free pages to the filesystem and truncate the WAL.
+
+        Only databases with incremental auto-vacuum release pages; older ones
+        need :meth:`enable_incremental_vacuum` run once while the app is
+        stopped (``scripts/compact_chat_db.py``).
+        """
+
+        if not await self._incremental_vacuum_enabled():
+            logger.info(
+                "%s predates incremental auto-vacuum; run "
+                "scripts/compact_chat_db.py to reclaim free pages",
+                self._path,
+            )
+        else:
+            async with self._write() as connection:
+                # Each result row is one freed page; the pragma runs as it is read.
+                cursor = await connection.execute("PRAGMA incremental_vacuum")
+                await cursor.fetchall()
+                await cursor.close()
+        # A checkpoint cannot run inside a transaction; hold the lock so no
+        # write starts one underneath it.
+        assert self._connection is not None
+        async with self._write_lock:
+            cursor = await self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            await cursor.fetchall()
+            await cursor.close()
+
+    async def enable_incremental_vacuum(self) -> bool:
+        """Convert the database to incremental auto-vacuum with a full ``VACUUM``.
+
+        A maintenance step: the rewrite holds the write lock for its whole
+        duration, so run it while nothing else uses the database. Returns
+        False when the database was already converted.
+        """
+
+        assert self._connection is not None
+        if await self._incremental_vacuum_enabled():
+            return False
+        # VACUUM cannot run inside a transaction, so take the lock directly.
+        async with self._write_lock:
+            await self._connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            await self._connection.execute("VACUUM")
+            cursor = await self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            await cursor.fetchall()
+            await cursor.close()
+        return True
+
+    async def _incremental_vacuum_enabled(self) -> bool:
+        assert self._connection is not None
+        cursor = await self._connection.execute("PRAGMA auto_vacuum")
+        row = await cursor.fetchone()
         await cursor.close()
-        await self._connection.commit()
-        return bool(deleted)
+        return row is not None and row[0] == 2  # 2 = INCREMENTAL
 
     async def get_session_messages_for_title(
         self, session_id: str
     ) -> list[dict[str, str]]:
         """Fetch user/assistant messages for title generation, capped at ~4000 chars."""
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
+        rows = await self._fetchall(
             "SELECT role, content FROM messages WHERE session_id = ? AND role IN ('user', 'assistant') ORDER BY id ASC",
             (session_id,),
         )
-        rows = await cursor.fetchall()
-        await cursor.close()
         messages: list[dict[str, str]] = []
         total_chars = 0
         for row in rows:
             content = row["content"] or ""
             # Handle structured content (JSON arrays with text parts)
             try:
-                parsed = json.loads(content)
+                parsed = fast_json.loads(content)
                 if isinstance(parsed, list):
                     text_parts = [
                         item.get("text", "")
@@ -1060,26 +1917,22 @@ class ChatRepository:
     async def update_session_ai_title(self, session_id: str, title: str) -> bool:
         """Set an AI-generated title and mark title_source as 'ai'."""
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
-            "UPDATE conversations SET title = ?, title_source = 'ai', updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
-            (title, session_id),
-        )
-        updated = cursor.rowcount
-        await cursor.close()
-        await self._connection.commit()
-        return bool(updated)
+        async with self._write() as connection:
+            cursor = await connection.execute(
+                "UPDATE conversations SET title = ?, title_source = 'ai', updated_at = CURRENT_TIMESTAMP, last_activity_at = CURRENT_TIMESTAMP WHERE session_id = ?",
+                (title, session_id),
+            )
+            updated = cursor.rowcount
+            await cursor.close()
+            return bool(updated)
 
     async def get_conversation_metadata(self, session_id: str) -> dict[str, Any] | None:
         """Return basic metadata for a single conversation."""
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
+        row = await self._fetchone(
             "SELECT session_id, title, title_source, saved, created_at, updated_at FROM conversations WHERE session_id = ?",
             (session_id,),
         )
-        row = await cursor.fetchone()
-        await cursor.close()
         if row is None:
             return None
         return {
@@ -1094,4 +1947,9 @@ class ChatRepository:
         }
 
 
-__all__ = ["ChatRepository", "format_timestamp_for_client"]
+__all__ = [
+    "ChatRepository",
+    "decode_conversation_cursor",
+    "encode_conversation_cursor",
+    "format_timestamp_for_client",
+]
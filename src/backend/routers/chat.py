@@ -5,7 +5,7 @@ from __future__ import annotations
 import asyncio
 import json
 import re
-import time
+from collections import OrderedDict
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
@@ -15,14 +15,31 @@ from ..chat.orchestrator import ChatOrchestrator
 from ..config import Settings, get_settings
 from ..openrouter import OpenRouterClient, OpenRouterError
 from ..schemas.chat import ChatCompletionRequest
+from ..services.attachment_urls import refresh_message_attachments
+from ..services.image_derivatives import VARIANT_DISPLAY
+from ..services.model_registry import get_model_registry
+from ..utils import fast_json
+from ..utils.http_cache import (
+    EncodedJSON,
+    content_etag,
+    json_response,
+    make_etag,
+    not_modified,
+)
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
 
-_MODELS_CACHE_TTL_SECONDS = 60
-_models_cache: dict[str, Any] | None = None
-_models_cache_expiry: float = 0.0
-_models_cache_lock: asyncio.Lock = asyncio.Lock()
+_models_index: _ModelCatalogIndex | None = None
+_models_index_lock: asyncio.Lock = asyncio.Lock()
+# Distinct search tokens whose matches are memoised per catalog index.
+_MODELS_SEARCH_MEMO_SIZE = 512
+# Filter paths whose per-model values are memoised per catalog index; paths
+# come from the client, so the memo is an LRU rather than unbounded.
+_MODELS_FILTER_PATH_MEMO_SIZE = 64
+# Bytes of serialized (and compressed) ``/models`` responses memoised per
+# catalog index; the most recently used response is always kept.
+_MODELS_RESPONSE_MEMO_BYTES = 32 * 1024 * 1024
 
 
 def get_openrouter_client(
@@ -49,11 +66,11 @@ async def stream_chat_completions(
                 exc.detail if isinstance(exc.detail, str) else json.dumps(exc.detail)
             )
             error_chunk = {"choices": [{"delta": {"content": f"Error: {detail}"}}]}
-            yield {"event": "message", "data": json.dumps(error_chunk)}
+            yield {"event": "message", "data": fast_json.dumps(error_chunk)}
             yield {"event": "message", "data": "[DONE]"}
         except Exception as exc:  # pragma: no cover
             error_chunk = {"choices": [{"delta": {"content": f"Error: {str(exc)}"}}]}
-            yield {"event": "message", "data": json.dumps(error_chunk)}
+            yield {"event": "message", "data": fast_json.dumps(error_chunk)}
             yield {"event": "message", "data": "[DONE]"}
 
     return EventSourceResponse(event_publisher())
@@ -85,30 +102,98 @@ async def list_conversations(
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
     search: str | None = Query(None, min_length=1, max_length=200),
+    cursor: str | None = Query(None, max_length=512),
 ) -> dict[str, Any]:
-    """List saved conversations, optionally filtered by search term."""
+    """List saved conversations, optionally filtered by search term.
+
+    Searches are full-text over user and assistant messages (plus titles);
+    results are ranked by relevance and include a ``snippet``. Without a
+    search, pass ``next_cursor`` back as ``cursor`` to page by keyset.
+    """
 
     orchestrator: ChatOrchestrator = request.app.state.chat_orchestrator
     conversations = await orchestrator.repository.list_saved_conversations(
-        limit=limit, offset=offset, search=search
+        limit=limit, offset=offset, search=search, cursor=cursor
     )
-    return {"conversations": conversations}
+    next_cursor = None
+    if not search and len(conversations) == limit:
+        next_cursor = conversations[-1]["cursor"]
+    return {"conversations": conversations, "next_cursor": next_cursor}
 
 
 @router.get("/chat/session/{session_id}/messages", status_code=200)
 async def get_session_messages(
     session_id: str,
     request: Request,
-) -> dict[str, Any]:
-    """Load all messages for a saved session."""
+    limit: int | None = Query(None, ge=1, le=500),
+    before_id: int | None = Query(None, ge=1),
+    tool_result_max_chars: int | None = Query(None, ge=0),
+) -> Response:
+    """Load messages for a saved session.
+
+    Without ``limit`` the whole conversation is returned. With ``limit`` the
+    newest messages are returned (the tail, for the initial render); pass
+    ``next_before_id`` back as ``before_id`` to load older pages.
+    ``tool_result_max_chars`` truncates long tool results; fetch them in
+    full from ``/chat/session/{session_id}/messages/{message_id}``.
+    """
 
     orchestrator: ChatOrchestrator = request.app.state.chat_orchestrator
     repo = orchestrator.repository
     metadata = await repo.get_session_metadata(session_id)
+    if metadata is None and await orchestrator.restore_archived_session(session_id):
+        metadata = await repo.get_session_metadata(session_id)
     if metadata is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    messages = await repo.get_messages(session_id)
-    return {"session_id": session_id, "metadata": metadata, "messages": messages}
+    messages = await repo.get_messages(
+        session_id,
+        before_id=before_id,
+        limit=limit + 1 if limit is not None else None,
+        tool_result_max_chars=tool_result_max_chars,
+    )
+    has_more = limit is not None and len(messages) > limit
+    if has_more:
+        messages = messages[1:]
+    messages = await refresh_message_attachments(
+        messages,
+        repo,
+        ttl=get_settings().attachment_signed_url_ttl,
+        variant=VARIANT_DISPLAY,
+    )
+    # Signed attachment URLs are refreshed per request, so the ETag hashes the
+    # body rather than a session version.
+    return await json_response(
+        request,
+        {
+            "session_id": session_id,
+            "metadata": metadata,
+            "messages": messages,
+            "has_more": has_more,
+            "next_before_id": messages[0]["message_id"] if has_more else None,
+        },
+    )
+
+
+@router.get("/chat/session/{session_id}/messages/{message_id}", status_code=200)
+async def get_session_message(
+    session_id: str,
+    message_id: int,
+    request: Request,
+) -> dict[str, Any]:
+    """Load a single message in full (e.g. to expand a truncated tool result)."""
+
+    orchestrator: ChatOrchestrator = request.app.state.chat_orchestrator
+    repo = orchestrator.repository
+    message = await repo.get_message(session_id, message_id)
+    if message is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    [message] = await refresh_message_attachments(
+        [message],
+        repo,
+        ttl=get_settings().attachment_signed_url_ttl,
+        variant=VARIANT_DISPLAY,
+    )
+    return {"session_id": session_id, "message": message}
 
 
 @router.post("/chat/session/{session_id}/save", status_code=200)
@@ -121,6 +206,8 @@ async def save_session(
     orchestrator: ChatOrchestrator = request.app.state.chat_orchestrator
     repo = orchestrator.repository
     exists = await repo.session_exists(session_id)
+    if not exists:
+        exists = await orchestrator.restore_archived_session(session_id)
     if not exists:
         # Session doesn't exist yet — create it so the save flag is stored
         await repo.ensure_session(session_id)
@@ -275,7 +362,7 @@ async def test_stream() -> EventSourceResponse:
         parts = ["Hello ", "from ", "server!"]
         for part in parts:
             chunk = {"choices": [{"delta": {"content": part}}]}
-            yield {"event": "message", "data": json.dumps(chunk)}
+            yield {"event": "message", "data": fast_json.dumps(chunk)}
             await asyncio.sleep(0.2)
         yield {"event": "message", "data": "[DONE]"}
 
@@ -296,32 +383,193 @@ async def get_generation_details(
 
 
 async def _get_models_payload(client: OpenRouterClient) -> dict[str, Any]:
-    global _models_cache, _models_cache_expiry, _models_cache_lock
+    return await get_model_registry().get_catalog(client)
 
-    now = time.monotonic()
-    if _models_cache is not None and now < _models_cache_expiry:
-        return _models_cache
 
-    async with _models_cache_lock:
-        if _models_cache is not None and now < _models_cache_expiry:
-            return _models_cache
+def _invalidate_models_cache() -> None:
+    """Reset the shared OpenRouter model catalog and its index."""
 
-        payload = await client.list_models()
-        _models_cache = payload
-        _models_cache_expiry = now + _MODELS_CACHE_TTL_SECONDS
-        return payload
+    global _models_index
+    get_model_registry().invalidate()
+    _models_index = None
 
 
-def _invalidate_models_cache() -> None:
-    """Reset the cached OpenRouter model payload."""
+async def _get_models_index(client: OpenRouterClient) -> _ModelCatalogIndex:
+    """Return the index for the current catalog, rebuilding it on refresh."""
+
+    global _models_index
+
+    payload = await _get_models_payload(client)
+    index = _models_index
+    if index is not None and index.payload is payload:
+        return index
+
+    async with _models_index_lock:
+        index = _models_index
+        if index is None or index.payload is not payload:
+            # Enriching and indexing several MB of JSON is CPU-bound.
+            index = await asyncio.to_thread(_ModelCatalogIndex, payload)
+            _models_index = index
+        return index
+
 
-    global _models_cache, _models_cache_expiry
-    _models_cache = None
-    _models_cache_expiry = 0.0
+class _ModelCatalogIndex:
+    """Enriched model catalog with lookup structures for the models routes.
+
+    Built once per catalog payload: requests then resolve search tokens via
+    an inverted index over the distinct field values, filter paths via
+    per-path value lists and facets via a cached summary, instead of
+    re-enriching and walking every model.
+    """
+
+    def __init__(self, payload: dict[str, Any]) -> None:
+        self.payload = payload
+        self.annotated = _annotate_and_enrich_models(payload)
+        data = self.annotated.get("data")
+        self.data: list[Any] | None = data if isinstance(data, list) else None
+        self.models: list[dict[str, Any]] = [
+            item for item in self.data or [] if isinstance(item, dict)
+        ]
+        self.tool_positions = [
+            position
+            for position, model in enumerate(self.models)
+            if model.get("supports_tools") is True
+        ]
+        self._postings: dict[str, set[int]] = {}
+        for position, model in enumerate(self.models):
+            for value in _iterate_values(model):
+                self._postings.setdefault(value, set()).add(position)
+        self._token_matches: dict[str, frozenset[int]] = {}
+        self._path_values: OrderedDict[str, list[list[Any]]] = OrderedDict()
+        self._metadata: EncodedJSON | None = None
+        # Content hash of the upstream catalog; response ETags derive from it.
+        self.version = content_etag(payload)
+        self._responses: OrderedDict[str, EncodedJSON] = OrderedDict()
+
+    def response_etag(
+        self, *, tools_only: bool, search: str | None, filters: dict[str, Any]
+    ) -> str:
+        return make_etag(self.version, _response_key(tools_only, search, filters))
+
+    async def response(
+        self, *, tools_only: bool, search: str | None, filters: dict[str, Any]
+    ) -> EncodedJSON:
+        """Return the serialized ``/models`` body for a query, memoised."""
+
+        key = _response_key(tools_only, search, filters)
+        cached = self._responses.get(key)
+        if cached is not None:
+            self._responses.move_to_end(key)
+            return cached
+
+        if self.data is None:
+            content = self.annotated
+        else:
+            models, base_count = self.query(
+                tools_only=tools_only, search=search, filters=filters
+            )
+            content = dict(self.annotated)
+            content["data"] = models
+            content["metadata"] = {
+                "total": len(self.data),
+                "base_count": base_count,
+                "count": len(models),
+            }
+        encoded = await EncodedJSON.encode(content, etag=make_etag(self.version, key))
+        self._responses[key] = encoded
+        self._responses.move_to_end(key)
+        # Compressed variants are added after insertion, so sizes are summed
+        # here rather than tracked incrementally.
+        total = sum(entry.nbytes for entry in self._responses.values())
+        while total > _MODELS_RESPONSE_MEMO_BYTES and len(self._responses) > 1:
+            _, evicted = self._responses.popitem(last=False)
+            total -= evicted.nbytes
+        return encoded
+
+    def query(
+        self,
+        *,
+        tools_only: bool,
+        search: str | None,
+        filters: dict[str, Any],
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Return the matching models and the size of the unfiltered base."""
+
+        if tools_only:
+            positions = list(self.tool_positions)
+            base_count = len(positions)
+        else:
+            positions = list(range(len(self.models)))
+            base_count = len(self.data or [])
+
+        for token in _normalize_search_query(search):
+            matches = self._matches_for(token)
+            positions = [position for position in positions if position in matches]
+
+        for path, criterion in filters.items():
+            values = self._values_at(str(path))
+            positions = [
+                position
+                for position in positions
+                if _match_values(values[position], criterion)
+            ]
+
+        return [self.models[position] for position in positions], base_count
+
+    async def metadata(self) -> EncodedJSON:
+        """Return the serialized property summary and facets of the catalog."""
+
+        if self._metadata is None:
+            # Summarising every model is CPU-bound, like the encoding.
+            self._metadata = await asyncio.to_thread(self._encode_metadata)
+        return self._metadata
+
+    def _encode_metadata(self) -> EncodedJSON:
+        models = self.data or []
+        return EncodedJSON(
+            {
+                "total": len(models),
+                "base_count": len(models),
+                "properties": _build_model_metadata(models),
+                "facets": _build_faceted_metadata(models),
+            },
+            etag=self.metadata_etag(),
+        )
+
+    def metadata_etag(self) -> str:
+        return make_etag(self.version, "metadata")
+
+    def _matches_for(self, token: str) -> frozenset[int]:
+        # Search is substring-based, so a token is resolved against the
+        # distinct values once and the union of their postings memoised.
+        matches = self._token_matches.get(token)
+        if matches is None:
+            found: set[int] = set()
+            for value, positions in self._postings.items():
+                if token in value:
+                    found.update(positions)
+            matches = frozenset(found)
+            if len(self._token_matches) >= _MODELS_SEARCH_MEMO_SIZE:
+                self._token_matches.clear()
+            self._token_matches[token] = matches
+        return matches
+
+    def _values_at(self, path: str) -> list[list[Any]]:
+        values = self._path_values.get(path)
+        if values is not None:
+            self._path_values.move_to_end(path)
+            return values
+        parts = [part for part in path.split(".") if part]
+        values = [_resolve_path(model, parts) for model in self.models]
+        self._path_values[path] = values
+        if len(self._path_values) > _MODELS_FILTER_PATH_MEMO_SIZE:
+            self._path_values.popitem(last=False)
+        return values
 
 
 @router.get("/models", status_code=200)
 async def list_models(
+    request: Request,
     tools_only: bool = Query(
         False,
         alias="tools_only",
@@ -341,68 +589,37 @@ async def list_models(
         ),
     ),
     client: OpenRouterClient = Depends(get_openrouter_client),
-) -> dict[str, Any]:
+) -> Response:
     """Expose the available OpenRouter models to the frontend."""
 
     try:
-        payload = await _get_models_payload(client)
+        index = await _get_models_index(client)
     except OpenRouterError as exc:
         raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
 
-    annotated = _annotate_and_enrich_models(
-        payload,
-    )
-
     parsed_filters = _parse_filter_query(filters)
+    query = {"tools_only": tools_only, "search": search, "filters": parsed_filters}
 
-    data = annotated.get("data")
-    if not isinstance(data, list):
-        return annotated
-
-    base_models = _apply_tools_filter(data, tools_only)
-
-    filtered_models = _apply_search_and_filters(
-        base_models,
-        search=search,
-        filters=parsed_filters,
-    )
-
-    response_payload = dict(annotated)
-    response_payload["data"] = filtered_models
-    response_payload["metadata"] = {
-        "total": len(data),
-        "base_count": len(base_models),
-        "count": len(filtered_models),
-    }
-    return response_payload
+    cached = not_modified(request, index.response_etag(**query))
+    if cached is not None:
+        return cached
+    return await json_response(request, await index.response(**query))
 
 
 @router.get("/models/metadata", status_code=200)
 async def get_models_metadata(
+    request: Request,
     client: OpenRouterClient = Depends(get_openrouter_client),
-) -> dict[str, Any]:
+) -> Response:
     try:
-        payload = await _get_models_payload(client)
+        index = await _get_models_index(client)
     except OpenRouterError as exc:
         raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
 
-    annotated = _annotate_and_enrich_models(payload)
-    data = annotated.get("data")
-    if not isinstance(data, list):
-        return {
-            "total": 0,
-            "base_count": 0,
-            "properties": [],
-            "facets": _build_faceted_metadata([]),
-        }
-
-    base_models = _apply_tools_filter(data, tools_only=False)
-    return {
-        "total": len(data),
-        "base_count": len(base_models),
-        "properties": _build_model_metadata(base_models),
-        "facets": _build_faceted_metadata(base_models),
-    }
+    cached = not_modified(request, index.metadata_etag())
+    if cached is not None:
+        return cached
+    return await json_response(request, await index.metadata())
 
 
 def _annotate_and_enrich_models(payload: dict[str, Any]) -> dict[str, Any]:
@@ -423,19 +640,6 @@ def _annotate_and_enrich_models(payload: dict[str, Any]) -> dict[str, Any]:
     return filtered_payload
 
 
-def _apply_tools_filter(models: list[Any], tools_only: bool) -> list[Any]:
-    if not tools_only:
-        return [dict(item) if isinstance(item, dict) else item for item in models]
-
-    filtered: list[Any] = []
-    for item in models:
-        if not isinstance(item, dict):
-            continue
-        if item.get("supports_tools") is True:
-            filtered.append(dict(item))
-    return filtered
-
-
 def _model_supports_tools(model: dict[str, Any]) -> bool:
     capabilities = model.get("capabilities")
     if isinstance(capabilities, dict):
@@ -641,6 +845,16 @@ def _is_truthy(value: Any) -> bool:
     return True
 
 
+def _response_key(
+    tools_only: bool, search: str | None, filters: dict[str, Any]
+) -> str:
+    return json.dumps(
+        [tools_only, " ".join(_normalize_search_query(search)), filters],
+        sort_keys=True,
+        default=str,
+    )
+
+
 def _parse_filter_query(raw_filters: str | None) -> dict[str, Any]:
     if raw_filters is None or raw_filters == "":
         return {}
@@ -662,33 +876,6 @@ def _parse_filter_query(raw_filters: str | None) -> dict[str, Any]:
     return parsed
 
 
-def _apply_search_and_filters(
-    models: list[Any],
-    *,
-    search: str | None,
-    filters: dict[str, Any],
-) -> list[Any]:
-    if not models:
-        return []
-
-    normalized_query = _normalize_search_query(search)
-    filtered: list[Any] = []
-
-    for item in models:
-        if not isinstance(item, dict):
-            continue
-
-        if normalized_query and not _matches_search(item, normalized_query):
-            continue
-
-        if filters and not _matches_filters(item, filters):
-            continue
-
-        filtered.append(dict(item))
-
-    return filtered
-
-
 def _normalize_search_query(query: str | None) -> list[str]:
     if not query:
         return []
@@ -696,21 +883,6 @@ def _normalize_search_query(query: str | None) -> list[str]:
     return [_canonicalize_token(token) for token in tokens]
 
 
-def _matches_search(model: dict[str, Any], tokens: list[str]) -> bool:
-    if not tokens:
-        return True
-
-    haystack = list(_iterate_values(model))
-    if not haystack:
-        return False
-
-    for token in tokens:
-        token_found = any(token in value for value in haystack)
-        if not token_found:
-            return False
-    return True
-
-
 def _iterate_values(value: Any) -> list[str]:
     results: list[str] = []
 
@@ -733,15 +905,6 @@ def _iterate_values(value: Any) -> list[str]:
     return results
 
 
-def _matches_filters(model: dict[str, Any], filters: dict[str, Any]) -> bool:
-    for path, raw_criterion in filters.items():
-        path_parts = [part for part in str(path).split(".") if part]
-        values = _resolve_path(model, path_parts)
-        if not _match_values(values, raw_criterion):
-            return False
-    return True
-
-
 def _resolve_path(subject: Any, parts: list[str]) -> list[Any]:
     if not parts:
         if isinstance(subject, list):
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
 from ..schemas.mcp_servers import (
     ClientPreferences,
@@ -18,6 +18,7 @@ from ..schemas.mcp_servers import (
 from ..services.client_tool_preferences import ClientToolPreferences
 from ..services.mcp_management import MCPManagementService
 from ..services.mcp_server_settings import MCPServerSettingsService
+from ..utils.http_cache import json_response
 
 router = APIRouter(prefix="/api/mcp", tags=["mcp"])
 
@@ -85,11 +86,13 @@ async def _build_status_response(
 
 @router.get("/servers/", response_model=MCPServerStatusResponse)
 async def read_mcp_servers(
+    request: Request,
     mgmt: MCPManagementService = Depends(get_mcp_management),
     settings: MCPServerSettingsService = Depends(get_mcp_settings_service),
-) -> MCPServerStatusResponse:
+) -> Response:
     """List all configured MCP servers with connection status and tools."""
-    return await _build_status_response(mgmt, settings)
+    status = await _build_status_response(mgmt, settings)
+    return await json_response(request, status.model_dump(mode="json", by_alias=True))
 
 
 @router.post("/servers/connect", response_model=MCPServerStatus)
@@ -6,11 +6,16 @@ from datetime import datetime
 from typing import Any
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, RedirectResponse, Response
 from pydantic import BaseModel, ConfigDict, Field
 
 from ..chat.orchestrator import ChatOrchestrator
+from ..config import get_settings
+from ..services.attachment_storage import storage_for_record
+from ..services.attachment_urls import ensure_fresh_signed_url
 from ..services.attachments import (
     AttachmentError,
+    AttachmentNotFound,
     AttachmentService,
     AttachmentTooLarge,
     UnsupportedAttachmentType,
@@ -109,13 +114,48 @@ async def upload_attachment(
 
 
 @router.get("/{attachment_id}/content")
-async def download_attachment(attachment_id: str) -> None:
-    raise HTTPException(
-        status_code=410,
-        detail=(
-            "Direct downloads are no longer supported. "
-            "Use the signed URL provided when the attachment was created."
-        ),
+async def download_attachment(
+    attachment_id: str,
+    service: AttachmentService = Depends(get_attachment_service),
+) -> Response:
+    """Serve locally stored attachments; redirect GCS ones to a signed URL.
+
+    Local files are sent with ``FileResponse``, which honours ``Range``
+    requests and uses zero-copy sendfile where the server supports it.
+    """
+
+    try:
+        record = await service.resolve(attachment_id)
+    except AttachmentNotFound as exc:
+        raise HTTPException(status_code=404, detail="Attachment not found") from exc
+
+    located = storage_for_record(record)
+    if located is None:
+        raise HTTPException(status_code=404, detail="Attachment content unavailable")
+    storage, key = located
+
+    path = storage.local_path(key)
+    if path is None:
+        refreshed = await ensure_fresh_signed_url(
+            record,
+            service.repository,
+            ttl=get_settings().attachment_signed_url_ttl,
+        )
+        signed_url = refreshed.get("signed_url")
+        if not signed_url:
+            raise HTTPException(status_code=404, detail="Attachment content unavailable")
+        return RedirectResponse(signed_url, status_code=307)
+
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Attachment content unavailable")
+
+    metadata = record.get("metadata") or {}
+    return FileResponse(
+        path,
+        media_type=record.get("mime_type") or "application/octet-stream",
+        filename=metadata.get("filename"),
+        content_disposition_type="inline",
+        headers={"Cache-Control": "private, max-age=86400, immutable"},
     )
 
 
@@ -6,12 +6,19 @@ from typing import Optional
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+from backend.services.audio_encoder import (
+    OPUS_ENCODING,
+    OPUS_FRAME_MS,
+    OpusStreamEncoder,
+    negotiate_delivery_encoding,
+    transcode_audio_queue,
+)
 from backend.services.client_settings_service import get_client_settings_service
 from backend.services.kiosk_chat_service import KioskChatService
 from backend.services.stt_service import STTService
 from backend.services.tts_service import TTSService
 from backend.services.voice_chat_service import VoiceChatService
-from backend.services.voice_session import VoiceConnectionManager
+from backend.services.voice_session import ResponseTurn, VoiceConnectionManager
 
 router = APIRouter(prefix="/api/voice", tags=["Voice Assistant"])
 logger = logging.getLogger(__name__)
@@ -35,6 +42,15 @@ def resolve_settings_client_id(client_id: str) -> str:
     return "voice"
 
 
+def parse_audio_formats(value) -> list[str]:
+    """Normalize a client's accepted audio formats (list or comma-separated string)."""
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, (list, tuple)):
+        return []
+    return [str(item).strip().lower() for item in value if str(item).strip()]
+
+
 async def handle_connection(
     websocket: WebSocket,
     client_id: str,
@@ -53,6 +69,11 @@ async def handle_connection(
     - Frontend plays audio immediately using Web Audio API
     """
     await manager.connect(websocket, client_id)
+    connected_session = manager.get_session(client_id)
+    if connected_session is not None:
+        connected_session.accepted_audio_formats = parse_audio_formats(
+            websocket.query_params.get("audio_formats")
+        )
 
     settings_client_id = resolve_settings_client_id(client_id)
     settings_service = get_client_settings_service(settings_client_id)
@@ -62,9 +83,23 @@ async def handle_connection(
 
     # Pre-warm TTS connection for faster first response (runs in background)
     asyncio.create_task(tts_service.warm_connection(settings_client_id))
+    # Open a paused STT socket now so the first wake word skips the connect
+    stt_service.schedule_prewarm(client_id, settings_client_id)
 
     tts_cancel_event = asyncio.Event()
     tts_task: Optional[asyncio.Task] = None
+    speculative_turn: Optional[ResponseTurn] = None
+
+    async def cancel_speculative_turn():
+        """Cancel an unconfirmed speculative response and drop its stored turn."""
+        nonlocal speculative_turn
+        turn, speculative_turn = speculative_turn, None
+        if turn is None or turn.committed:
+            return
+        await turn.cancel()
+        if turn.turn_id:
+            await chat_service.discard_turn(client_id, turn.turn_id)
+        logger.info(f"Discarded speculative response for {client_id}")
 
     async def cancel_tts():
         nonlocal tts_task, tts_cancel_event
@@ -72,202 +107,271 @@ async def handle_connection(
         if tts_task and not tts_task.done():
             tts_task.cancel()
             logger.info(f"Cancelled active TTS task for {client_id}")
+        await cancel_speculative_turn()
+
+    async def run_response(turn: ResponseTurn):
+        """Stream an LLM response through the TTS pipeline for one turn.
+
+        All client-visible output goes through ``turn.emit`` so a speculative
+        turn stays silent until its transcript is confirmed.
+        """
+        nonlocal tts_cancel_event
+        text = turn.text
+
+        async def send(message: dict):
+            await turn.emit(lambda: manager.send_message(client_id, message))
+
+        async def set_state(state: str):
+            await turn.emit(lambda: manager.update_state(client_id, state))
+
+        # Transition to PROCESSING (this client only)
+        await set_state("PROCESSING")
+
+        # Generate LLM response with streaming + queue-based TTS
+        if turn.committed:
+            tts_cancel_event = turn.cancel_event
+        full_response = ""
+        response_interrupted = False
+
+        tts_settings = tts_service.get_settings(settings_client_id)
+        tts_enabled = tts_settings.enabled
+
+        # Create TTS streaming pipeline
+        (
+            chunk_queue,
+            audio_queue,
+            segmenter_task,
+            tts_processor_task,
+        ) = await tts_service.create_streaming_pipeline(
+            turn.cancel_event,
+            settings_client_id=settings_client_id,
+        )
 
-    async def start_stt_session():
-        """Helper to start the STT session with callbacks."""
-
-        async def on_transcript_received(text: str, is_final: bool):
-            logger.debug(f"Transcript ({client_id}): {text} (Final: {is_final})")
-
-            # Send transcript to THIS client only (session isolation)
-            await manager.send_message(
-                client_id, {"type": "transcript", "text": text, "is_final": is_final}
-            )
-
-            # User spoke, so update activity
-            session = manager.get_session(client_id)
-            if session:
-                session.update_activity()
-
-            if is_final:
-                # Transition to PROCESSING (this client only)
-                await manager.update_state(client_id, "PROCESSING")
-
-                # Generate LLM response with streaming + queue-based TTS
-                nonlocal tts_cancel_event, tts_task
-                tts_cancel_event = asyncio.Event()
-                full_response = ""
-                response_interrupted = False
-
-                tts_settings = tts_service.get_settings(settings_client_id)
-                tts_enabled = tts_settings.enabled
+        # Get sample rate for audio playback
+        sample_rate = tts_settings.sample_rate
 
-                # Create TTS streaming pipeline
-                (
-                    chunk_queue,
+        # Optionally re-encode PCM to Opus for clients that negotiated it
+        voice_session = manager.get_session(client_id)
+        encoding = negotiate_delivery_encoding(
+            tts_settings,
+            voice_session.accepted_audio_formats if voice_session else None,
+        )
+        delivery_queue = audio_queue
+        transcode_task: Optional[asyncio.Task] = None
+        if encoding == OPUS_ENCODING:
+            delivery_queue = asyncio.Queue()
+            transcode_task = asyncio.create_task(
+                transcode_audio_queue(
                     audio_queue,
-                    segmenter_task,
-                    tts_processor_task,
-                ) = await tts_service.create_streaming_pipeline(
-                    tts_cancel_event,
-                    settings_client_id=settings_client_id,
+                    delivery_queue,
+                    OpusStreamEncoder(sample_rate, tts_settings.opus_bitrate),
                 )
+            )
 
-                # Get sample rate for audio playback
-                sample_rate = tts_settings.sample_rate
-
-                # Signal start of TTS audio stream (to THIS client only)
-                await manager.send_message(
-                    client_id,
+        audio_start = {
+            "type": "tts_audio_start",
+            "sample_rate": sample_rate,
+            "encoding": encoding,
+            "streaming": True,
+            "buffering_enabled": tts_settings.buffering_enabled,
+            "startup_delay_enabled": tts_settings.startup_delay_enabled,
+            "low_latency_audio": tts_settings.low_latency_audio,
+            "initial_buffer_sec": tts_settings.initial_buffer_sec,
+            "max_ahead_sec": tts_settings.max_ahead_sec,
+            "min_chunk_sec": tts_settings.min_chunk_sec,
+        }
+        if encoding == OPUS_ENCODING:
+            # Chunk data is a run of [uint16 big-endian length][Opus packet]
+            audio_start["frame_duration_ms"] = OPUS_FRAME_MS
+
+        # Signal start of TTS audio stream (to THIS client only)
+        await send(audio_start)
+
+        # Start audio sender task (streams audio chunks as they arrive)
+        async def send_audio_chunks():
+            chunk_index = 0
+            try:
+                while True:
+                    audio_chunk = await delivery_queue.get()
+                    if audio_chunk is None:
+                        break
+                    await send(
+                        {
+                            "type": "tts_audio_chunk",
+                            "data": base64.b64encode(audio_chunk).decode("utf-8"),
+                            "chunk_index": chunk_index,
+                            "is_last": False,
+                        },
+                    )
+                    chunk_index += 1
+            except Exception as e:
+                logger.error(f"Audio sender error: {e}")
+            finally:
+                await send(
                     {
-                        "type": "tts_audio_start",
-                        "sample_rate": sample_rate,
-                        "streaming": True,
-                        "buffering_enabled": tts_settings.buffering_enabled,
-                        "startup_delay_enabled": tts_settings.startup_delay_enabled,
-                        "low_latency_audio": tts_settings.low_latency_audio,
-                        "initial_buffer_sec": tts_settings.initial_buffer_sec,
-                        "max_ahead_sec": tts_settings.max_ahead_sec,
-                        "min_chunk_sec": tts_settings.min_chunk_sec,
+                        "type": "tts_audio_chunk",
+                        "data": "",
+                        "chunk_index": chunk_index,
+                        "is_last": True,
                     },
                 )
 
-                # Start audio sender task (streams audio chunks as they arrive)
-                async def send_audio_chunks():
-                    chunk_index = 0
-                    try:
-                        while True:
-                            audio_chunk = await audio_queue.get()
-                            if audio_chunk is None:
-                                break
-                            await manager.send_message(
-                                client_id,
-                                {
-                                    "type": "tts_audio_chunk",
-                                    "data": base64.b64encode(audio_chunk).decode(
-                                        "utf-8"
-                                    ),
-                                    "chunk_index": chunk_index,
-                                    "is_last": False,
-                                },
-                            )
-                            chunk_index += 1
-                    except Exception as e:
-                        logger.error(f"Audio sender error: {e}")
-                    finally:
-                        await manager.send_message(
-                            client_id,
-                            {
-                                "type": "tts_audio_chunk",
-                                "data": "",
-                                "chunk_index": chunk_index,
-                                "is_last": True,
-                            },
+        audio_sender_task = asyncio.create_task(send_audio_chunks())
+        await set_state("SPEAKING")
+
+        try:
+            # Signal start of streaming response (to THIS client only)
+            await send({"type": "assistant_response_start"})
+
+            async for event in chat_service.generate_response_streaming(
+                text, client_id, turn_id=turn.turn_id
+            ):
+                if turn.cancel_event.is_set():
+                    response_interrupted = True
+                    logger.info(f"LLM stream interrupted for {client_id}")
+                    break
+
+                if event["type"] == "text_chunk":
+                    chunk = event["content"]
+                    full_response += chunk
+                    await send({"type": "assistant_response_chunk", "text": chunk})
+
+                    # Feed chunk directly to the TTS pipeline (segmentation happens internally)
+                    await chunk_queue.put(chunk)
+
+                elif event["type"] == "tool_status":
+                    # Tools can have side effects: never run one for an
+                    # unconfirmed transcript. The chat stream is suspended
+                    # at this event, so waiting here holds the tool call.
+                    if not turn.committed:
+                        logger.info(
+                            f"Holding tool {event['name']} until transcript is confirmed"
                         )
-
-                audio_sender_task = asyncio.create_task(send_audio_chunks())
-                await manager.update_state(client_id, "SPEAKING")
-
-                try:
-                    # Signal start of streaming response (to THIS client only)
-                    await manager.send_message(
-                        client_id, {"type": "assistant_response_start"}
-                    )
-
-                    async for event in chat_service.generate_response_streaming(
-                        text, client_id
-                    ):
-                        if tts_cancel_event.is_set():
-                            response_interrupted = True
-                            logger.info(f"LLM stream interrupted for {client_id}")
-                            break
-
-                        if event["type"] == "text_chunk":
-                            chunk = event["content"]
-                            full_response += chunk
-                            await manager.send_message(
-                                client_id,
-                                {"type": "assistant_response_chunk", "text": chunk},
-                            )
-
-                            # Feed chunk directly to the TTS pipeline (segmentation happens internally)
-                            await chunk_queue.put(chunk)
-
-                        elif event["type"] == "tool_status":
-                            await manager.send_message(
-                                client_id,
-                                {
-                                    "type": "tool_status",
-                                    "status": event["status"],
-                                    "name": event["name"],
-                                },
-                            )
-                        elif event["type"] == "error":
-                            full_response = event.get(
-                                "message", "Sorry, I encountered an error."
-                            )
-                            await chunk_queue.put(full_response)
-                            break
-
-                    # Signal end to chunk queue
-                    await chunk_queue.put(None)
-
-                    # Signal end of streaming (to THIS client only)
-                    await manager.send_message(
-                        client_id,
+                        await turn.wait_confirmed()
+                    await send(
                         {
-                            "type": "assistant_response_end",
-                            "text": full_response,
-                            "interrupted": response_interrupted,
+                            "type": "tool_status",
+                            "status": event["status"],
+                            "name": event["name"],
                         },
                     )
-
-                except Exception as e:
-                    logger.error(
-                        f"LLM generation failed for {client_id}: {e}", exc_info=True
-                    )
-                    await chunk_queue.put("Sorry, I couldn't process that request.")
-                    await chunk_queue.put(None)
-                    await manager.send_message(
-                        client_id,
-                        {
-                            "type": "assistant_response_end",
-                            "text": "Sorry, I couldn't process that request.",
-                        },
+                elif event["type"] == "error":
+                    full_response = event.get(
+                        "message", "Sorry, I encountered an error."
                     )
+                    await chunk_queue.put(full_response)
+                    break
+
+            # Signal end to chunk queue
+            await chunk_queue.put(None)
+
+            # Signal end of streaming (to THIS client only)
+            await send(
+                {
+                    "type": "assistant_response_end",
+                    "text": full_response,
+                    "interrupted": response_interrupted,
+                },
+            )
 
-                # Wait for TTS processing to complete
-                try:
-                    await segmenter_task
-                    await tts_processor_task
-                    await audio_sender_task
-                except asyncio.CancelledError:
-                    logger.info("TTS tasks were cancelled")
-
-                # Transition back based on conversation mode
-                interrupted = response_interrupted or tts_cancel_event.is_set()
-                if interrupted:
-                    logger.info(
-                        f"Response interrupted for {client_id}, leaving state as-is"
-                    )
-                elif tts_enabled:
+        except asyncio.CancelledError:
+            # Speculative turn superseded: stop the pipeline quietly
+            turn.cancel_event.set()
+            for task in (segmenter_task, tts_processor_task, audio_sender_task):
+                task.cancel()
+            if transcode_task is not None:
+                transcode_task.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"LLM generation failed for {client_id}: {e}", exc_info=True)
+            await chunk_queue.put("Sorry, I couldn't process that request.")
+            await chunk_queue.put(None)
+            await send(
+                {
+                    "type": "assistant_response_end",
+                    "text": "Sorry, I couldn't process that request.",
+                },
+            )
+
+        # Wait for TTS processing to complete
+        try:
+            await segmenter_task
+            await tts_processor_task
+            if transcode_task is not None:
+                await transcode_task
+            await audio_sender_task
+        except asyncio.CancelledError:
+            logger.info("TTS tasks were cancelled")
+
+        # Nothing below may touch the client before the turn is confirmed
+        await turn.wait_confirmed()
+
+        # Transition back based on conversation mode
+        interrupted = response_interrupted or turn.cancel_event.is_set()
+        if interrupted:
+            logger.info(f"Response interrupted for {client_id}, leaving state as-is")
+        elif tts_enabled:
+            logger.info(
+                "TTS stream complete for %s, waiting for playback end",
+                client_id,
+            )
+        else:
+            try:
+                stt_settings = settings_service.get_stt()
+                if stt_settings.mode == "conversation":
                     logger.info(
-                        "TTS stream complete for %s, waiting for playback end",
-                        client_id,
+                        f"Conversation mode active for {client_id}, listening for reply"
                     )
+                    await manager.update_state(client_id, "LISTENING")
                 else:
-                    try:
-                        stt_settings = settings_service.get_stt()
-                        if stt_settings.mode == "conversation":
-                            logger.info(
-                                f"Conversation mode active for {client_id}, listening for reply"
-                            )
-                            await manager.update_state(client_id, "LISTENING")
-                        else:
-                            await manager.update_state(client_id, "IDLE")
-                    except Exception as e:
-                        logger.error(f"Error transitioning state after speaking: {e}")
-                        await manager.update_state(client_id, "IDLE")
+                    await manager.update_state(client_id, "IDLE")
+            except Exception as e:
+                logger.error(f"Error transitioning state after speaking: {e}")
+                await manager.update_state(client_id, "IDLE")
+
+    async def start_stt_session():
+        """Helper to start the STT session with callbacks."""
+
+        async def on_transcript_received(text: str, is_final: bool):
+            nonlocal speculative_turn, tts_cancel_event
+            logger.debug(f"Transcript ({client_id}): {text} (Final: {is_final})")
+
+            # Send transcript to THIS client only (session isolation)
+            await manager.send_message(
+                client_id, {"type": "transcript", "text": text, "is_final": is_final}
+            )
+
+            # User spoke, so update activity
+            session = manager.get_session(client_id)
+            if session:
+                session.update_activity()
+
+            if not is_final:
+                return
+
+            turn = speculative_turn
+            if turn is not None and not turn.cancel_event.is_set() and turn.matches(text):
+                # Eager transcript confirmed: release the held output
+                speculative_turn = None
+                tts_cancel_event = turn.cancel_event
+                logger.info(f"Speculative response confirmed for {client_id}")
+                await turn.commit()
+                return
+
+            # No speculation, or the final transcript differs: restart
+            await cancel_speculative_turn()
+            await run_response(ResponseTurn(text))
+
+        async def on_eager_end_of_turn(text: str):
+            nonlocal speculative_turn
+            await cancel_speculative_turn()
+            logger.info(f"Starting speculative response for {client_id}: '{text}'")
+            turn = ResponseTurn(text, speculative=True)
+            turn.task = asyncio.create_task(run_response(turn))
+            speculative_turn = turn
+
+        async def on_turn_resumed():
+            await cancel_speculative_turn()
 
         async def on_stt_error(error: str):
             logger.error(f"STT Error for {client_id}: {error}")
@@ -278,6 +382,8 @@ async def handle_connection(
             on_transcript_received,
             on_stt_error,
             settings_client_id=settings_client_id,
+            on_eager_end_of_turn=on_eager_end_of_turn,
+            on_turn_resumed=on_turn_resumed,
         )
 
     try:
@@ -293,6 +399,16 @@ async def handle_connection(
 
             elif event_type == "connection_ready":
                 logger.info(f"Client {client_id} ready.")
+                if "audio_formats" in data:
+                    session = manager.get_session(client_id)
+                    if session:
+                        session.accepted_audio_formats = parse_audio_formats(
+                            data.get("audio_formats")
+                        )
+                        logger.info(
+                            f"Client {client_id} accepts audio formats: "
+                            f"{session.accepted_audio_formats}"
+                        )
 
             elif event_type == "wakeword_detected":
                 confidence = data.get("confidence", 0.0)
@@ -466,6 +582,7 @@ async def handle_connection(
             elif event_type == "clear_session":
                 # User clicked "New" - clean up everything for fresh start
                 logger.info(f"User clearing session for {client_id}")
+                await cancel_speculative_turn()
                 await stt_service.close_session(client_id)
                 chat_service.clear_history(client_id)
                 session = manager.get_session(client_id)
@@ -566,11 +683,15 @@ async def handle_connection(
     except WebSocketDisconnect:
         logger.info(f"Client {client_id} disconnected")
         manager.disconnect(client_id)
+        await cancel_speculative_turn()
         await stt_service.close_session(client_id)
+        await stt_service.discard_standby(client_id)
     except Exception as e:
         logger.error(f"Unexpected error for {client_id}: {e}")
         manager.disconnect(client_id)
+        await cancel_speculative_turn()
         await stt_service.close_session(client_id)
+        await stt_service.discard_standby(client_id)
 
 
 @router.websocket("/connect")
@@ -104,6 +104,19 @@ class SttSettings(BaseModel):
         le=30000,
         description="End-of-turn timeout in milliseconds",
     )
+    speculative_response: bool = Field(
+        default=False,
+        description=(
+            "Start the LLM/TTS pipeline on Flux eager end-of-turn and only commit "
+            "audio to the client once the final transcript confirms it"
+        ),
+    )
+    eager_eot_threshold: float = Field(
+        default=0.5,
+        ge=0.3,
+        le=0.9,
+        description="Eager end-of-turn threshold used when speculative_response is on",
+    )
     keyterms: list[str] = Field(
         default_factory=list,
         description="Keywords to boost recognition",
@@ -181,6 +194,8 @@ class SttSettingsUpdate(BaseModel):
     # Conversation mode (Flux) settings
     eot_threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
     eot_timeout_ms: Optional[int] = Field(default=None, ge=100, le=30000)
+    speculative_response: Optional[bool] = None
+    eager_eot_threshold: Optional[float] = Field(default=None, ge=0.3, le=0.9)
     keyterms: Optional[list[str]] = None
     pause_timeout_seconds: Optional[int] = Field(default=None, ge=0, le=600)
     listen_timeout_seconds: Optional[int] = Field(default=None, ge=0, le=600)
@@ -247,6 +262,20 @@ class TtsSettings(BaseModel):
         le=65536,
         description="Streaming TTS chunk size in bytes (larger reduces overhead)",
     )
+    # Delivery transcoding (server-side PCM -> Opus)
+    transcode_to_opus: bool = Field(
+        default=False,
+        description=(
+            "Re-encode PCM TTS audio to Opus before sending to clients that "
+            "accept it (requires opuslib on the server)"
+        ),
+    )
+    opus_bitrate: int = Field(
+        default=24000,
+        ge=6000,
+        le=128000,
+        description="Opus bitrate in bits per second for transcoded TTS audio",
+    )
     # Segmentation pipeline options
     use_segmentation: bool = Field(
         default=True,
@@ -313,6 +342,8 @@ class TtsSettingsUpdate(BaseModel):
     response_format: Optional[str] = None
     sample_rate: Optional[int] = Field(default=None, ge=8000, le=48000)
     stream_chunk_bytes: Optional[int] = Field(default=None, ge=512, le=65536)
+    transcode_to_opus: Optional[bool] = None
+    opus_bitrate: Optional[int] = Field(default=None, ge=6000, le=128000)
     use_segmentation: Optional[bool] = None
     delimiters: Optional[list[str]] = None
     first_phrase_min_chars: Optional[int] = Field(
@@ -0,0 +1,389 @@
+"""Storage backends for attachment binaries.
+
+``AttachmentService`` talks to a backend through :class:`AttachmentStorage`
+instead of calling GCS directly. Two backends exist:
+
+* :class:`GCSAttachmentStorage` keeps blobs in Google Cloud Storage and hands
+  out V4 signed URLs (the historical behaviour).
+* :class:`LocalAttachmentStorage` keeps blobs on local disk, content-addressed
+  and sharded by digest, and serves them from ``/api/uploads/{id}/content``.
+
+Records remember where their bytes live (``gcs_blob`` is only set for GCS), so
+switching the configured backend keeps older attachments readable.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import suppress
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, BinaryIO, Mapping, Sequence
+
+from ..config import get_settings
+from . import gcs
+
+STORAGE_BACKEND_GCS = "gcs"
+STORAGE_BACKEND_LOCAL = "local"
+
+# Resumable GCS uploads send (and buffer) one chunk at a time; must be a
+# multiple of 256 KiB.
+GCS_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Keys written by LocalAttachmentStorage.key_for: aa/bb/<blake2b-256 hex>.
+_LOCAL_KEY_PATTERN = re.compile(r"[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}")
+
+
+def new_content_hasher() -> Any:
+    """Return an incremental hasher matching :func:`content_digest`."""
+
+    return hashlib.blake2b(digest_size=32)
+
+
+def content_digest(data: bytes) -> str:
+    """Return the hex BLAKE2b-256 digest used to address attachment content."""
+
+    hasher = new_content_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+class AttachmentStorage(ABC):
+    """Interface implemented by attachment storage backends."""
+
+    kind: str
+
+    @property
+    def is_public(self) -> bool:
+        """True when URLs from :meth:`url_for` are reachable by the model provider."""
+
+        return True
+
+    @abstractmethod
+    async def put(self, data: bytes, *, blob_name: str, content_type: str) -> str:
+        """Store ``data`` and return the key it can be retrieved with."""
+
+    @abstractmethod
+    async def put_file(
+        self,
+        file_obj: BinaryIO,
+        *,
+        blob_name: str,
+        content_type: str,
+        size: int,
+        content_hash: str,
+    ) -> str:
+        """Store the contents of ``file_obj`` (read from its start)."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove the stored object for ``key`` if it exists."""
+
+    async def delete_many(self, keys: Sequence[str]) -> int:
+        """Remove several objects concurrently; return how many succeeded."""
+
+        results = await asyncio.gather(
+            *(self.delete(key) for key in keys), return_exceptions=True
+        )
+        return sum(1 for result in results if not isinstance(result, Exception))
+
+    @abstractmethod
+    async def url_for(
+        self, key: str, *, attachment_id: str, expires_delta: timedelta
+    ) -> str:
+        """Return a URL clients can fetch the object from."""
+
+    @abstractmethod
+    async def read(self, key: str) -> bytes:
+        """Return the stored bytes for ``key``."""
+
+    def local_path(self, key: str) -> Path | None:
+        """Return a filesystem path for ``key`` when the backend is local."""
+
+        return None
+
+
+class GCSAttachmentStorage(AttachmentStorage):
+    """Store attachments in the configured GCS bucket."""
+
+    kind = STORAGE_BACKEND_GCS
+
+    async def put(self, data: bytes, *, blob_name: str, content_type: str) -> str:
+        await gcs.run_blocking(
+            gcs.upload_bytes, blob_name, data, content_type=content_type
+        )
+        return blob_name
+
+    async def put_file(
+        self,
+        file_obj: BinaryIO,
+        *,
+        blob_name: str,
+        content_type: str,
+        size: int,
+        content_hash: str,
+    ) -> str:
+        file_obj.seek(0)
+        await gcs.run_blocking(
+            gcs.upload_filelike,
+            blob_name,
+            file_obj,
+            content_type=content_type,
+            size=size,
+            chunk_size=GCS_UPLOAD_CHUNK_SIZE if size > GCS_UPLOAD_CHUNK_SIZE else None,
+        )
+        return blob_name
+
+    async def delete(self, key: str) -> None:
+        await gcs.run_blocking(gcs.delete_blob, key)
+
+    async def delete_many(self, keys: Sequence[str]) -> int:
+        # One batch request per chunk; chunks are sent concurrently.
+        chunks = [
+            list(keys[start : start + gcs.GCS_BATCH_MAX_CALLS])
+            for start in range(0, len(keys), gcs.GCS_BATCH_MAX_CALLS)
+        ]
+        results = await asyncio.gather(
+            *(gcs.run_blocking(gcs.delete_blobs, chunk) for chunk in chunks),
+            return_exceptions=True,
+        )
+        return sum(
+            len(chunk)
+            for chunk, result in zip(chunks, results)
+            if not isinstance(result, Exception)
+        )
+
+    async def read(self, key: str) -> bytes:
+        return await gcs.run_blocking(gcs.download_bytes, key)
+
+    async def url_for(
+        self, key: str, *, attachment_id: str, expires_delta: timedelta
+    ) -> str:
+        return await gcs.run_blocking(
+            gcs.sign_get_url, key, expires_delta=expires_delta
+        )
+
+
+class LocalAttachmentStorage(AttachmentStorage):
+    """Content-addressed attachment store on the local filesystem.
+
+    Objects are written to ``<root>/<aa>/<bb>/<digest>`` where ``aa``/``bb``
+    are the first two byte pairs of the digest, so directories stay small.
+    Writes go through a temporary file and an atomic rename; identical
+    content maps to the same file and is only written once.
+    """
+
+    kind = STORAGE_BACKEND_LOCAL
+
+    def __init__(self, root: Path, *, public_base_url: str = "") -> None:
+        self._root = Path(root)
+        self._public_base_url = public_base_url.rstrip("/")
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    @property
+    def is_public(self) -> bool:
+        return self._public_base_url.startswith(("http://", "https://"))
+
+    @staticmethod
+    def key_for(digest: str) -> str:
+        return f"{digest[:2]}/{digest[2:4]}/{digest}"
+
+    @staticmethod
+    def is_local_key(key: str) -> bool:
+        return _LOCAL_KEY_PATTERN.fullmatch(key) is not None
+
+    def local_path(self, key: str) -> Path | None:
+        path = (self._root / key).resolve()
+        root = self._root.resolve()
+        if root not in path.parents:
+            return None
+        return path
+
+    async def put(self, data: bytes, *, blob_name: str, content_type: str) -> str:
+        def write() -> str:
+            return self._write(content_digest(data), lambda handle: handle.write(data))
+
+        return await gcs.run_blocking(write)
+
+    async def put_file(
+        self,
+        file_obj: BinaryIO,
+        *,
+        blob_name: str,
+        content_type: str,
+        size: int,
+        content_hash: str,
+    ) -> str:
+        def copy(handle: BinaryIO) -> None:
+            file_obj.seek(0)
+            shutil.copyfileobj(file_obj, handle)
+
+        return await gcs.run_blocking(self._write, content_hash, copy)
+
+    def _write(self, digest: str, writer: Any) -> str:
+        key = self.key_for(digest)
+        path = self._root / key
+        if path.exists():
+            return key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                writer(handle)
+            os.replace(tmp_name, path)
+        except BaseException:
+            with suppress(OSError):
+                os.unlink(tmp_name)
+            raise
+        return key
+
+    async def delete(self, key: str) -> None:
+        path = self.local_path(key)
+        if path is None:
+            return
+        await gcs.run_blocking(_unlink_missing_ok, path)
+
+    async def url_for(
+        self, key: str, *, attachment_id: str, expires_delta: timedelta
+    ) -> str:
+        return f"{self._public_base_url}/api/uploads/{attachment_id}/content"
+
+    async def read(self, key: str) -> bytes:
+        path = self.local_path(key)
+        if path is None:
+            raise FileNotFoundError(key)
+        return await gcs.run_blocking(path.read_bytes)
+
+
+def _unlink_missing_ok(path: Path) -> None:
+    path.unlink(missing_ok=True)
+
+
+_storage: AttachmentStorage | None = None
+_gcs_storage: GCSAttachmentStorage | None = None
+_local_storage: LocalAttachmentStorage | None = None
+
+
+def _build_storage(settings: Any) -> AttachmentStorage:
+    backend = str(getattr(settings, "attachments_storage_backend", "gcs")).lower()
+    if backend == STORAGE_BACKEND_LOCAL:
+        return LocalAttachmentStorage(
+            Path(settings.attachments_local_dir),
+            public_base_url=settings.attachments_public_base_url,
+        )
+    return get_gcs_storage()
+
+
+def get_gcs_storage() -> GCSAttachmentStorage:
+    """Return the shared GCS backend (used for records stored in GCS)."""
+
+    global _gcs_storage
+    if _gcs_storage is None:
+        _gcs_storage = GCSAttachmentStorage()
+    return _gcs_storage
+
+
+def get_local_storage() -> LocalAttachmentStorage:
+    """Return the local backend (used for records stored on disk).
+
+    Available whatever backend is configured for new attachments, so files
+    written while ``ATTACHMENTS_STORAGE_BACKEND`` was ``local`` stay readable
+    after switching back to GCS.
+    """
+
+    global _local_storage
+    if isinstance(_storage, LocalAttachmentStorage):
+        return _storage
+    if _local_storage is None:
+        settings = get_settings()
+        _local_storage = LocalAttachmentStorage(
+            Path(settings.attachments_local_dir),
+            public_base_url=settings.attachments_public_base_url,
+        )
+    return _local_storage
+
+
+def set_local_storage(storage: LocalAttachmentStorage | None) -> None:
+    """Override the local backend used for on-disk records."""
+
+    global _local_storage
+    _local_storage = storage
+
+
+def get_attachment_storage() -> AttachmentStorage:
+    """Return the configured backend for new attachments."""
+
+    global _storage
+    if _storage is None:
+        _storage = _build_storage(get_settings())
+    return _storage
+
+
+def set_attachment_storage(storage: AttachmentStorage | None) -> None:
+    """Override the configured backend (``None`` resets to settings)."""
+
+    global _storage
+    _storage = storage
+
+
+def storage_for_record(
+    record: Mapping[str, Any],
+) -> tuple[AttachmentStorage, str] | None:
+    """Return the backend and key holding a record's bytes."""
+
+    gcs_blob = record.get("gcs_blob")
+    if isinstance(gcs_blob, str) and gcs_blob:
+        return get_gcs_storage(), gcs_blob
+    # Resolved from the record, not the configured backend, so files stay
+    # reachable after ATTACHMENTS_STORAGE_BACKEND changes.
+    storage_path = record.get("storage_path")
+    if isinstance(storage_path, str) and storage_path:
+        if LocalAttachmentStorage.is_local_key(storage_path):
+            return get_local_storage(), storage_path
+        # Legacy GCS rows predate gcs_blob and keep the blob name here.
+        return get_gcs_storage(), storage_path
+    return None
+
+
+async def release_record_blob(repository: Any, record: Mapping[str, Any]) -> None:
+    """Delete a deleted record's stored object unless other records share it.
+
+    Identical content is stored once and referenced by every attachment row
+    that carries it; the object is only removed with its last reference.
+    """
+
+    located = storage_for_record(record)
+    if located is None:
+        return
+    storage, key = located
+    storage_path = record.get("storage_path") or key
+    if await repository.count_attachments_by_storage_path(storage_path):
+        return
+    await storage.delete(key)
+
+
+__all__ = [
+    "AttachmentStorage",
+    "GCSAttachmentStorage",
+    "LocalAttachmentStorage",
+    "STORAGE_BACKEND_GCS",
+    "STORAGE_BACKEND_LOCAL",
+    "content_digest",
+    "get_attachment_storage",
+    "get_gcs_storage",
+    "get_local_storage",
+    "new_content_hasher",
+    "release_record_blob",
+    "set_attachment_storage",
+    "set_local_storage",
+    "storage_for_record",
+]
@@ -1,12 +1,30 @@
-"""Helpers for refreshing attachment signed URLs on read paths."""
+"""Helpers for refreshing attachment signed URLs on read paths.
+
+Fresh attachment records are kept in an in-memory :class:`SignedUrlCache`, so
+the per-hop refresh in the streaming loop is a dictionary lookup. A
+background task (:func:`run_signed_url_refresher`) re-signs cached URLs in
+batches shortly before they expire; the database is only read for
+attachments that are not cached yet.
+"""
 
 from __future__ import annotations
 
+import asyncio
+import base64
+import logging
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 from typing import Any
 
 from ..repository import AttachmentRecord, ChatRepository
-from .gcs import sign_get_url
+from .attachment_storage import storage_for_record
+
+logger = logging.getLogger(__name__)
+
+SIGNED_URL_CACHE_MAX_ENTRIES = 4096
+SIGNED_URL_REFRESH_MARGIN = timedelta(hours=1)
+SIGNED_URL_REFRESH_INTERVAL_SECONDS = 300
+SIGNED_URL_REFRESH_BATCH_SIZE = 100
 
 
 def _parse_timestamp(value: Any) -> datetime | None:
@@ -27,6 +45,64 @@ def _parse_timestamp(value: Any) -> datetime | None:
     return None
 
 
+class SignedUrlCache:
+    """LRU cache of attachment records whose signed URLs are still valid."""
+
+    def __init__(self, max_entries: int = SIGNED_URL_CACHE_MAX_ENTRIES) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[AttachmentRecord, datetime]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, attachment_id: str, *, now: datetime) -> AttachmentRecord | None:
+        """Return the cached record if its URL has not expired."""
+
+        entry = self._entries.get(attachment_id)
+        if entry is None:
+            return None
+        record, expires_at = entry
+        if expires_at <= now:
+            del self._entries[attachment_id]
+            return None
+        self._entries.move_to_end(attachment_id)
+        return record
+
+    def put(self, record: AttachmentRecord) -> None:
+        """Cache ``record`` until its ``signed_url_expires_at``."""
+
+        attachment_id = record.get("attachment_id")
+        expires_at = _parse_timestamp(record.get("signed_url_expires_at"))
+        if not isinstance(attachment_id, str) or not record.get("signed_url"):
+            return
+        if expires_at is None or expires_at <= datetime.now(timezone.utc):
+            return
+        self._entries[attachment_id] = (record, expires_at)
+        self._entries.move_to_end(attachment_id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, attachment_id: str) -> None:
+        self._entries.pop(attachment_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def expiring(self, before: datetime) -> list[AttachmentRecord]:
+        """Return cached records whose URLs expire before ``before``."""
+
+        return [
+            record
+            for record, expires_at in self._entries.values()
+            if expires_at <= before
+        ]
+
+
+signed_url_cache = SignedUrlCache()
+
+
 async def ensure_fresh_signed_url(
     record: AttachmentRecord,
     repo: ChatRepository,
@@ -48,10 +124,13 @@ async def ensure_fresh_signed_url(
         needs_refresh = True
 
     if needs_refresh:
-        blob_name = record.get("gcs_blob")
-        if not blob_name:
+        located = storage_for_record(record)
+        if located is None:
             return record
-        refreshed_url = sign_get_url(blob_name, expires_delta=ttl)
+        storage, key = located
+        refreshed_url = await storage.url_for(
+            key, attachment_id=attachment_id, expires_delta=ttl
+        )
         if ttl.total_seconds() > 0:
             refreshed_expiry = now + ttl
         else:
@@ -82,8 +161,18 @@ async def refresh_message_attachments(
     repo: ChatRepository,
     *,
     ttl: timedelta,
+    variant: str | None = None,
+    cache: SignedUrlCache | None = None,
 ) -> list[dict[str, Any]]:
-    """Ensure message attachment fragments use valid signed URLs."""
+    """Ensure message attachment fragments use valid signed URLs.
+
+    ``variant`` names the image size the consumer wants (``"model"`` for
+    model payloads, ``"display"`` for UIs). Fragments point at that variant
+    when the attachment has one, and at the original otherwise. Metadata
+    always carries the display and thumbnail variant URLs when present.
+    """
+
+    cache = signed_url_cache if cache is None else cache
 
     if not messages:
         return messages
@@ -110,18 +199,19 @@ async def refresh_message_attachments(
     if not attachment_ids:
         return messages
 
-    records = await repo.get_attachments_by_ids(attachment_ids)
-    if not records:
-        return messages
-
-    refreshed: dict[str, AttachmentRecord] = {}
-    for attachment_id, record in records.items():
-        refreshed_record = await ensure_fresh_signed_url(
-            record,
-            repo,
-            ttl=ttl,
+    refreshed = await _resolve_fresh_records(attachment_ids, repo, ttl=ttl, cache=cache)
+    variant_ids = [
+        variant_id
+        for record in refreshed.values()
+        for variant_id in _variant_map(record).values()
+    ]
+    if variant_ids:
+        refreshed.update(
+            await _resolve_fresh_records(variant_ids, repo, ttl=ttl, cache=cache)
         )
-        refreshed[attachment_id] = refreshed_record
+
+    if not refreshed:
+        return messages
 
     for fragment, metadata, attachment_id in attachment_refs:
         record = refreshed.get(attachment_id)
@@ -130,14 +220,31 @@ async def refresh_message_attachments(
         signed_url = record.get("signed_url")
         if not isinstance(signed_url, str) or not signed_url:
             continue
+        variants = _variant_map(record)
+
+        def variant_url(name: str | None) -> str | None:
+            variant_record = refreshed.get(variants.get(name or "", ""))
+            url = variant_record.get("signed_url") if variant_record else None
+            return url if isinstance(url, str) and url else None
+
+        fragment_url = variant_url(variant) or signed_url
         image_block = fragment.get("image_url")
         if isinstance(image_block, dict):
-            image_block["url"] = signed_url
+            image_block["url"] = fragment_url
         else:
-            fragment["image_url"] = {"url": signed_url}
+            fragment["image_url"] = {"url": fragment_url}
         metadata["attachment_id"] = attachment_id
-        metadata["display_url"] = signed_url
+        metadata["display_url"] = variant_url("display") or signed_url
         metadata["delivery_url"] = signed_url
+        thumbnail_url = variant_url("thumbnail")
+        if thumbnail_url:
+            metadata["thumbnail_url"] = thumbnail_url
+        if fragment_url != signed_url:
+            metadata["variant"] = variant
+            metadata["variant_attachment_id"] = variants[variant]
+        else:
+            metadata.pop("variant", None)
+            metadata.pop("variant_attachment_id", None)
         metadata.setdefault("mime_type", record.get("mime_type"))
         metadata.setdefault("size_bytes", record.get("size_bytes"))
         metadata.setdefault("session_id", record.get("session_id"))
@@ -148,4 +255,204 @@ async def refresh_message_attachments(
     return messages
 
 
-__all__ = ["ensure_fresh_signed_url", "refresh_message_attachments"]
+def _variant_map(record: AttachmentRecord) -> dict[str, str]:
+    metadata = record.get("metadata")
+    variants = metadata.get("variants") if isinstance(metadata, dict) else None
+    if not isinstance(variants, dict):
+        return {}
+    return {
+        name: value
+        for name, value in variants.items()
+        if isinstance(name, str) and isinstance(value, str)
+    }
+
+
+async def _resolve_fresh_records(
+    attachment_ids: list[str],
+    repo: ChatRepository,
+    *,
+    ttl: timedelta,
+    cache: SignedUrlCache,
+) -> dict[str, AttachmentRecord]:
+    """Return fresh records for ``attachment_ids``, reading only cache misses."""
+
+    now = datetime.now(timezone.utc)
+    resolved: dict[str, AttachmentRecord] = {}
+    missing: list[str] = []
+    for attachment_id in dict.fromkeys(attachment_ids):
+        cached = cache.get(attachment_id, now=now)
+        if cached is not None:
+            resolved[attachment_id] = cached
+        else:
+            missing.append(attachment_id)
+
+    if missing:
+        records = await repo.get_attachments_by_ids(missing)
+        # Expired URLs are re-signed concurrently on the storage worker pool.
+        refreshed_records = await asyncio.gather(
+            *(
+                ensure_fresh_signed_url(record, repo, ttl=ttl)
+                for record in records.values()
+            )
+        )
+        for attachment_id, record in zip(records.keys(), refreshed_records):
+            resolved[attachment_id] = record
+            cache.put(record)
+    return resolved
+
+
+async def refresh_expiring_signed_urls(
+    repo: ChatRepository,
+    *,
+    ttl: timedelta,
+    margin: timedelta = SIGNED_URL_REFRESH_MARGIN,
+    batch_size: int = SIGNED_URL_REFRESH_BATCH_SIZE,
+    cache: SignedUrlCache | None = None,
+) -> int:
+    """Re-sign cached URLs expiring within ``margin``; return how many."""
+
+    cache = signed_url_cache if cache is None else cache
+    if ttl.total_seconds() <= 0:
+        return 0
+    now = datetime.now(timezone.utc)
+    expiring = cache.expiring(now + min(margin, ttl / 2))
+    refreshed = 0
+
+    for start in range(0, len(expiring), batch_size):
+        batch = expiring[start : start + batch_size]
+        located = [(record, storage_for_record(record)) for record in batch]
+        located = [(record, found) for record, found in located if found]
+        urls = await asyncio.gather(
+            *(
+                storage.url_for(
+                    key, attachment_id=record["attachment_id"], expires_delta=ttl
+                )
+                for record, (storage, key) in located
+            ),
+            return_exceptions=True,
+        )
+        expires_at = datetime.now(timezone.utc) + ttl
+        updates: list[tuple[str, str, datetime]] = []
+        for (record, _), url in zip(located, urls):
+            if isinstance(url, BaseException):
+                logger.warning(
+                    "Failed to re-sign attachment %s: %s", record["attachment_id"], url
+                )
+                continue
+            updates.append((record["attachment_id"], url, expires_at))
+            updated = dict(record)
+            updated["signed_url"] = url
+            updated["signed_url_expires_at"] = expires_at.isoformat()
+            updated["display_url"] = url
+            updated["delivery_url"] = url
+            cache.put(updated)
+        await repo.update_attachment_signed_urls(updates)
+        refreshed += len(updates)
+
+    if refreshed:
+        logger.info("Re-signed %d attachment URL(s) ahead of expiry", refreshed)
+    return refreshed
+
+
+async def run_signed_url_refresher(
+    repo: ChatRepository,
+    *,
+    ttl: timedelta,
+    interval_seconds: float = SIGNED_URL_REFRESH_INTERVAL_SECONDS,
+) -> None:
+    """Periodically re-sign cached attachment URLs until cancelled."""
+
+    while True:
+        try:
+            await refresh_expiring_signed_urls(repo, ttl=ttl)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Signed URL refresh run failed: %s", exc)
+        await asyncio.sleep(interval_seconds)
+
+
+async def inline_private_attachments(
+    messages: list[dict[str, Any]],
+    repo: ChatRepository,
+    *,
+    cache: dict[str, str | None] | None = None,
+) -> list[dict[str, Any]]:
+    """Replace URLs the model provider cannot reach with data URIs.
+
+    Locally stored attachments are served from this backend, which is
+    usually not reachable from the internet. Image fragments backed by such
+    records are rewritten in place to carry their bytes inline; the check is
+    made per record, since attachments stored before a switch to a public
+    backend stay where they were written. ``messages`` should be a payload
+    copy.
+
+    ``cache`` maps attachment ids (a variant has its own id) to their data
+    URI, or None when the record needs no inlining. Passing the same dict
+    for every tool hop of a turn reads and encodes each attachment once.
+    """
+
+    if cache is None:
+        cache = {}
+
+    fragments: list[tuple[dict[str, Any], str]] = []
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for fragment in content:
+            if not isinstance(fragment, dict) or fragment.get("type") != "image_url":
+                continue
+            metadata = fragment.get("metadata")
+            if not isinstance(metadata, dict):
+                continue
+            attachment_id = metadata.get("variant_attachment_id") or metadata.get(
+                "attachment_id"
+            )
+            if isinstance(attachment_id, str) and attachment_id:
+                fragments.append((fragment, attachment_id))
+
+    if not fragments:
+        return messages
+
+    wanted = dict.fromkeys(attachment_id for _, attachment_id in fragments)
+    missing = [attachment_id for attachment_id in wanted if attachment_id not in cache]
+    records = await repo.get_attachments_by_ids(missing) if missing else {}
+    # Unknown ids are remembered too, so later hops skip the lookup.
+    cache.update(dict.fromkeys(missing))
+
+    async def _load(record: AttachmentRecord) -> str | None:
+        located = storage_for_record(record)
+        if located is None or located[0].is_public:
+            return None
+        storage, key = located
+        try:
+            data = await storage.read(key)
+        except OSError:
+            return None
+        mime_type = record.get("mime_type") or "application/octet-stream"
+        return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+    cache.update(
+        zip(
+            records.keys(),
+            await asyncio.gather(*(_load(record) for record in records.values())),
+        )
+    )
+    for fragment, attachment_id in fragments:
+        data_uri = cache.get(attachment_id)
+        if data_uri:
+            fragment["image_url"] = {"url": data_uri}
+
+    return messages
+
+
+__all__ = [
+    "SignedUrlCache",
+    "ensure_fresh_signed_url",
+    "inline_private_attachments",
+    "refresh_expiring_signed_urls",
+    "refresh_message_attachments",
+    "run_signed_url_refresher",
+    "signed_url_cache",
+]
@@ -2,19 +2,44 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import tempfile
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import IO, Any, Awaitable, Callable
 from uuid import uuid4
 
 from fastapi import UploadFile
 
 from ..repository import AttachmentRecord, ChatRepository
+from .attachment_storage import (
+    STORAGE_BACKEND_GCS,
+    AttachmentStorage,
+    content_digest,
+    get_attachment_storage,
+    new_content_hasher,
+    release_record_blob,
+    storage_for_record,
+)
+from .attachment_urls import signed_url_cache
 from .attachments_naming import make_blob_name
-from .gcs import delete_blob, sign_get_url, upload_bytes
+from .gcs import run_blocking
+from .image_derivatives import (
+    DERIVATIVE_MIME_TYPE,
+    DERIVATIVE_SOURCE_MIME_TYPES,
+    derivatives_available,
+    generate_variants,
+)
 
 logger = logging.getLogger(__name__)
 
+# A stored object is only shared with records that keep it alive this long.
+_DEDUP_MIN_REMAINING = timedelta(hours=1)
+
+_UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+# Uploads are spooled to a temporary file; only this much stays in memory.
+_UPLOAD_SPOOL_MEMORY_BYTES = 2 * _UPLOAD_CHUNK_SIZE
+
 
 ALLOWED_ATTACHMENT_MIME_TYPES: frozenset[str] = frozenset(
     {
@@ -27,6 +52,50 @@ ALLOWED_ATTACHMENT_MIME_TYPES: frozenset[str] = frozenset(
 )
 
 
+def sniff_mime_from_bytes(data: bytes) -> str | None:
+    """Guess a mime type from the magic bytes of common image/PDF formats."""
+
+    if data.startswith(b"%PDF-"):
+        return "application/pdf"
+    if not data or len(data) < 12:
+        return None
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data.startswith(b"GIF87a") or data.startswith(b"GIF89a"):
+        return "image/gif"
+    if data.startswith(b"RIFF") and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.startswith(b"BM"):
+        return "image/bmp"
+    if b"ftypheic" in data[:64] or b"ftypheif" in data[:64]:
+        return "image/heic"
+    return None
+
+
+def _variant_ids(record: AttachmentRecord | None) -> list[str]:
+    variants = (record or {}).get("metadata") or {}
+    variants = variants.get("variants") if isinstance(variants, dict) else None
+    if not isinstance(variants, dict):
+        return []
+    return [value for value in variants.values() if isinstance(value, str)]
+
+
+def _variant_metadata(
+    original: AttachmentRecord, name: str, source: dict[str, Any]
+) -> dict[str, Any]:
+    metadata: dict[str, Any] = {
+        "derivative_of": original["attachment_id"],
+        "variant": name,
+    }
+    source_metadata = source.get("metadata") or source
+    for key in ("width", "height"):
+        if key in source_metadata:
+            metadata[key] = source_metadata[key]
+    return metadata
+
+
 class AttachmentError(RuntimeError):
     """Base error raised for attachment failures."""
 
@@ -52,10 +121,21 @@ class AttachmentService:
         *,
         max_size_bytes: int,
         retention_days: int,
+        storage: AttachmentStorage | None = None,
     ) -> None:
         self._repo = repository
         self._max_size_bytes = max_size_bytes
         self._retention = timedelta(days=retention_days)
+        self._storage = storage or get_attachment_storage()
+        self._variant_tasks: set[asyncio.Task[None]] = set()
+
+    @property
+    def storage(self) -> AttachmentStorage:
+        return self._storage
+
+    @property
+    def repository(self) -> ChatRepository:
+        return self._repo
 
     async def save_user_upload(
         self,
@@ -63,27 +143,56 @@ class AttachmentService:
         session_id: str,
         upload: UploadFile,
     ) -> AttachmentRecord:
-        """Validate, persist, and register an uploaded attachment."""
+        """Validate, persist, and register an uploaded attachment.
+
+        The upload is streamed in chunks into a spooled temporary file while
+        its size is enforced and its hash computed, then handed to the
+        storage backend as a file, so memory per upload stays bounded. The
+        type is sniffed from the first chunk; the declared content type is
+        only used when the bytes are not recognised.
+        """
 
         if not session_id:
             raise AttachmentError("session_id is required")
 
-        mime_type = (upload.content_type or "application/octet-stream").lower()
-        if mime_type not in ALLOWED_ATTACHMENT_MIME_TYPES:
-            raise UnsupportedAttachmentType(mime_type or "unknown")
-
-        data = await self._read_upload(upload)
-        if not data:
-            raise AttachmentError("Uploaded file was empty")
-
-        attachment_id = uuid4().hex
-        return await self._persist_bytes(
-            session_id=session_id,
-            attachment_id=attachment_id,
-            data=data,
-            mime_type=mime_type,
-            filename_hint=upload.filename or "file.bin",
-        )
+        declared = (upload.content_type or "application/octet-stream").lower()
+        spool = tempfile.SpooledTemporaryFile(max_size=_UPLOAD_SPOOL_MEMORY_BYTES)
+        try:
+            try:
+                first_chunk = await upload.read(_UPLOAD_CHUNK_SIZE)
+                mime_type = sniff_mime_from_bytes(first_chunk) or declared
+                if mime_type not in ALLOWED_ATTACHMENT_MIME_TYPES:
+                    raise UnsupportedAttachmentType(mime_type or "unknown")
+                if not first_chunk:
+                    raise AttachmentError("Uploaded file was empty")
+                size, content_hash = await self._spool_upload(
+                    upload, spool, first_chunk
+                )
+            finally:
+                await upload.close()
+
+            async def store(blob_name: str) -> str:
+                return await self._storage.put_file(
+                    spool,
+                    blob_name=blob_name,
+                    content_type=mime_type,
+                    size=size,
+                    content_hash=content_hash,
+                )
+
+            record = await self._persist(
+                session_id=session_id,
+                attachment_id=uuid4().hex,
+                mime_type=mime_type,
+                filename_hint=upload.filename or "file.bin",
+                size_bytes=size,
+                content_hash=content_hash,
+                store=store,
+            )
+        finally:
+            spool.close()
+        self._schedule_variants(record, None)
+        return record
 
     async def save_model_image_bytes(
         self,
@@ -151,22 +260,35 @@ class AttachmentService:
         """Remove attachment metadata and delete the blob if it exists."""
 
         record = await self._repo.get_attachment(attachment_id)
+        for variant_id in _variant_ids(record):
+            await self.delete(variant_id)
         deleted = await self._repo.delete_attachment(attachment_id)
+        signed_url_cache.discard(attachment_id)
         if deleted and record:
-            blob_name = record.get("gcs_blob") or record.get("storage_path")
-            if blob_name:
-                try:
-                    delete_blob(str(blob_name))
-                except Exception:  # pragma: no cover - best-effort cleanup
-                    logger.warning(
-                        "Failed to remove attachment blob %s", attachment_id, exc_info=True
-                    )
+            try:
+                await release_record_blob(self._repo, record)
+            except Exception:  # pragma: no cover - best-effort cleanup
+                logger.warning(
+                    "Failed to remove attachment blob %s", attachment_id, exc_info=True
+                )
         return deleted
 
     async def resolve(self, attachment_id: str) -> AttachmentRecord:
-        """Direct downloads are no longer supported."""
+        """Return the record for ``attachment_id`` or raise ``AttachmentNotFound``."""
 
-        raise AttachmentError("Attachments must be accessed via signed URLs")
+        record = await self._repo.get_attachment(attachment_id)
+        if record is None:
+            raise AttachmentNotFound(attachment_id)
+        return record
+
+    async def read_bytes(self, record: AttachmentRecord) -> bytes:
+        """Return the stored bytes for an attachment record."""
+
+        located = storage_for_record(record)
+        if located is None:
+            raise AttachmentNotFound(str(record.get("attachment_id")))
+        storage, key = located
+        return await storage.read(key)
 
     async def _persist_bytes(
         self,
@@ -176,14 +298,62 @@ class AttachmentService:
         data: bytes,
         mime_type: str,
         filename_hint: str,
+    ) -> AttachmentRecord:
+        async def store(blob_name: str) -> str:
+            return await self._storage.put(
+                data, blob_name=blob_name, content_type=mime_type
+            )
+
+        record = await self._persist(
+            session_id=session_id,
+            attachment_id=attachment_id,
+            mime_type=mime_type,
+            filename_hint=filename_hint,
+            size_bytes=len(data),
+            content_hash=await run_blocking(content_digest, data),
+            store=store,
+        )
+        self._schedule_variants(record, data)
+        return record
+
+    async def _persist(
+        self,
+        *,
+        session_id: str,
+        attachment_id: str,
+        mime_type: str,
+        filename_hint: str,
+        size_bytes: int,
+        content_hash: str,
+        store: Callable[[str], Awaitable[str]],
+        extra_metadata: dict[str, Any] | None = None,
     ) -> AttachmentRecord:
         await self._repo.ensure_session(session_id)
 
-        blob_name = make_blob_name(session_id, attachment_id, filename_hint)
-        upload_bytes(blob_name, data, content_type=mime_type)
+        stored_in_gcs = self._storage.kind == STORAGE_BACKEND_GCS
+        donor = await self._repo.find_attachment_by_content_hash(
+            content_hash,
+            in_gcs=stored_in_gcs,
+            valid_after=datetime.now(timezone.utc) + _DEDUP_MIN_REMAINING,
+        )
+        if donor is not None:
+            # Identical bytes are already stored; add a reference instead of
+            # uploading again. The object is released with its last record.
+            storage_key = str(donor.get("gcs_blob") or donor["storage_path"])
+            logger.info(
+                "Attachment %s reuses stored object of %s",
+                attachment_id,
+                donor["attachment_id"],
+            )
+        else:
+            storage_key = await store(
+                make_blob_name(session_id, attachment_id, filename_hint)
+            )
 
         expires_delta = self._retention
-        signed_url = sign_get_url(blob_name, expires_delta=expires_delta)
+        signed_url = await self._storage.url_for(
+            storage_key, attachment_id=attachment_id, expires_delta=expires_delta
+        )
 
         now = datetime.now(timezone.utc).replace(microsecond=0)
         expires_at: datetime | None
@@ -196,53 +366,201 @@ class AttachmentService:
 
         metadata: dict[str, Any] = {
             "mime_type": mime_type,
-            "size_bytes": len(data),
+            "size_bytes": size_bytes,
+            "storage_backend": self._storage.kind,
         }
         if filename_hint:
             metadata["filename"] = filename_hint
+        if extra_metadata:
+            metadata.update(extra_metadata)
 
         record = await self._repo.add_attachment(
             attachment_id=attachment_id,
             session_id=session_id,
-            storage_path=blob_name,
-            gcs_blob=blob_name,
+            storage_path=storage_key,
+            gcs_blob=storage_key if stored_in_gcs else None,
             mime_type=mime_type,
-            size_bytes=len(data),
+            size_bytes=size_bytes,
             display_url=signed_url,
             delivery_url=signed_url,
             metadata=metadata or None,
             expires_at=expires_at,
             signed_url=signed_url,
             signed_url_expires_at=signed_url_expires_at,
+            content_hash=content_hash,
         )
 
+        signed_url_cache.put(record)
+
         logger.info(
             "Stored attachment %s (%s, %d bytes) for session %s",
             attachment_id,
             mime_type,
-            len(data),
+            size_bytes,
             session_id,
         )
         return record
 
-    async def _read_upload(self, upload: UploadFile) -> bytes:
-        chunk_size = 1024 * 1024  # 1 MiB
-        size = 0
-        chunks: list[bytes] = []
+    def _schedule_variants(self, record: AttachmentRecord, data: bytes | None) -> None:
+        """Render size-capped variants of an image in the background."""
+
+        if not derivatives_available():
+            return
+        if record.get("mime_type") not in DERIVATIVE_SOURCE_MIME_TYPES:
+            return
+        task = asyncio.create_task(self._build_variants(record, data))
+        self._variant_tasks.add(task)
+        task.add_done_callback(self._variant_tasks.discard)
+
+    async def wait_for_variants(self) -> None:
+        """Wait until all scheduled variant renders have finished."""
+
+        while self._variant_tasks:
+            await asyncio.gather(*list(self._variant_tasks), return_exceptions=True)
+
+    async def _build_variants(
+        self, record: AttachmentRecord, data: bytes | None
+    ) -> None:
+        attachment_id = str(record["attachment_id"])
         try:
-            while True:
-                chunk = await upload.read(chunk_size)
-                if not chunk:
-                    break
-                size += len(chunk)
-                if size > self._max_size_bytes:
-                    raise AttachmentTooLarge(
-                        f"Attachment exceeded {self._max_size_bytes} bytes limit"
-                    )
-                chunks.append(chunk)
-        finally:
-            await upload.close()
-        return b"".join(chunks)
+            variants = await self._copy_variants_from_duplicate(record)
+            if variants is None:
+                variants = await self._render_variants(record, data)
+            if not variants:
+                return
+            metadata = dict(record.get("metadata") or {})
+            metadata["variants"] = variants
+            await self._repo.update_attachment_metadata(attachment_id, metadata)
+            signed_url_cache.discard(attachment_id)
+        except Exception:
+            logger.warning(
+                "Failed to build variants for attachment %s",
+                attachment_id,
+                exc_info=True,
+            )
+
+    async def _copy_variants_from_duplicate(
+        self, record: AttachmentRecord
+    ) -> dict[str, str] | None:
+        """Reuse the variants of an identical image instead of re-rendering."""
+
+        content_hash = record.get("content_hash")
+        if not content_hash:
+            return None
+        donor = await self._repo.find_attachment_by_content_hash(
+            content_hash,
+            in_gcs=bool(record.get("gcs_blob")),
+            valid_after=datetime.now(timezone.utc) + _DEDUP_MIN_REMAINING,
+            exclude_attachment_id=str(record["attachment_id"]),
+        )
+        donor_variant_ids = (
+            (donor.get("metadata") or {}).get("variants") if donor else None
+        )
+        if not donor_variant_ids:
+            return None
+        donor_variants = await self._repo.get_attachments_by_ids(
+            donor_variant_ids.values()
+        )
+        if len(donor_variants) != len(donor_variant_ids):
+            return None
+
+        # Every variant must be shareable before any row is written, so a
+        # missing donor falls back to rendering instead of leaving orphans.
+        stored_in_gcs = self._storage.kind == STORAGE_BACKEND_GCS
+        valid_after = datetime.now(timezone.utc) + _DEDUP_MIN_REMAINING
+        for source in donor_variants.values():
+            shared = await self._repo.find_attachment_by_content_hash(
+                str(source["content_hash"]),
+                in_gcs=stored_in_gcs,
+                valid_after=valid_after,
+            )
+            if shared is None:
+                return None
+
+        async def unavailable(blob_name: str) -> str:
+            raise AttachmentError("Cached variant is no longer stored")
+
+        variants: dict[str, str] = {}
+        try:
+            for name, donor_variant_id in donor_variant_ids.items():
+                source = donor_variants[donor_variant_id]
+                variant = await self._persist(
+                    session_id=str(record["session_id"]),
+                    attachment_id=f"{record['attachment_id']}-{name}",
+                    mime_type=source["mime_type"],
+                    filename_hint=(source.get("metadata") or {}).get("filename", ""),
+                    size_bytes=int(source["size_bytes"]),
+                    content_hash=str(source["content_hash"]),
+                    store=unavailable,
+                    extra_metadata=_variant_metadata(record, name, source),
+                )
+                variants[name] = str(variant["attachment_id"])
+        except AttachmentError:
+            # A donor expired meanwhile: drop the rows written so far.
+            await self._repo.delete_attachments(list(variants.values()))
+            for variant_id in variants.values():
+                signed_url_cache.discard(variant_id)
+            return None
+        return variants
+
+    async def _render_variants(
+        self, record: AttachmentRecord, data: bytes | None
+    ) -> dict[str, str]:
+        if data is None:
+            located = storage_for_record(record)
+            if located is None:
+                return {}
+            storage, key = located
+            data = await storage.read(key)
+        rendered = await generate_variants(data, str(record.get("mime_type")))
+
+        filename = (record.get("metadata") or {}).get("filename") or "image"
+        stem = filename.rsplit(".", 1)[0]
+        variants: dict[str, str] = {}
+        for name, (encoded, width, height) in rendered.items():
+
+            async def store(blob_name: str, encoded: bytes = encoded) -> str:
+                return await self._storage.put(
+                    encoded, blob_name=blob_name, content_type=DERIVATIVE_MIME_TYPE
+                )
+
+            variant = await self._persist(
+                session_id=str(record["session_id"]),
+                attachment_id=f"{record['attachment_id']}-{name}",
+                mime_type=DERIVATIVE_MIME_TYPE,
+                filename_hint=f"{stem}.{name}.webp",
+                size_bytes=len(encoded),
+                content_hash=await run_blocking(content_digest, encoded),
+                store=store,
+                extra_metadata=_variant_metadata(
+                    record, name, {"width": width, "height": height}
+                ),
+            )
+            variants[name] = str(variant["attachment_id"])
+        return variants
+
+    async def _spool_upload(
+        self, upload: UploadFile, spool: IO[bytes], first_chunk: bytes
+    ) -> tuple[int, str]:
+        """Copy ``upload`` into ``spool``; return its size and content hash."""
+
+        hasher = new_content_hasher()
+
+        def append(chunk: bytes) -> None:
+            hasher.update(chunk)
+            spool.write(chunk)
+
+        size = 0
+        chunk = first_chunk
+        while chunk:
+            size += len(chunk)
+            if size > self._max_size_bytes:
+                raise AttachmentTooLarge(
+                    f"Attachment exceeded {self._max_size_bytes} bytes limit"
+                )
+            await run_blocking(append, chunk)
+            chunk = await upload.read(_UPLOAD_CHUNK_SIZE)
+        return size, hasher.hexdigest()
 
 
 __all__ = [
@@ -251,4 +569,5 @@ __all__ = [
     "UnsupportedAttachmentType",
     "AttachmentTooLarge",
     "AttachmentNotFound",
+    "sniff_mime_from_bytes",
 ]
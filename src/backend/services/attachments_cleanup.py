@@ -2,60 +2,180 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from typing import Any, Callable
 
 from ..repository import ChatRepository
-from .gcs import delete_blob, is_gcs_available
+from .attachment_storage import AttachmentStorage, storage_for_record
+from .attachment_urls import signed_url_cache
+from .gcs import is_gcs_available
 
 logger = logging.getLogger(__name__)
 
+# Records removed per transaction; also bounds the SQL parameter count.
+ATTACHMENT_CLEANUP_PAGE_SIZE = 200
+
+
+@dataclass(slots=True)
+class AttachmentCleanupStats:
+    """Progress counters for a cleanup run."""
+
+    pages: int = 0
+    records_deleted: int = 0
+    blobs_deleted: int = 0
+    blob_failures: int = 0
+    elapsed_seconds: float = 0.0
+
 
 async def cleanup_expired_attachments(
     repository: ChatRepository,
     *,
     now: datetime | None = None,
+    page_size: int = ATTACHMENT_CLEANUP_PAGE_SIZE,
+    on_progress: Callable[[AttachmentCleanupStats], None] | None = None,
 ) -> int:
     """Delete expired attachment records and associated blobs."""
 
+    stats = await run_attachment_cleanup(
+        repository, now=now, page_size=page_size, on_progress=on_progress
+    )
+    return stats.records_deleted
+
+
+async def run_attachment_cleanup(
+    repository: ChatRepository,
+    *,
+    now: datetime | None = None,
+    page_size: int = ATTACHMENT_CLEANUP_PAGE_SIZE,
+    on_progress: Callable[[AttachmentCleanupStats], None] | None = None,
+) -> AttachmentCleanupStats:
+    """Delete expired attachments page by page and return run metrics.
+
+    Each page is removed from the database in a single transaction; the
+    objects no longer referenced by any record are then deleted through
+    their storage backend concurrently (GCS in batch requests, off the
+    event loop). ``on_progress`` is called after every page.
+    """
+
     reference = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
-    expired = await repository.find_expired_attachments(now=reference)
-    removed = 0
+    stats = AttachmentCleanupStats()
+    started = time.perf_counter()
+    gcs_checked = False
+    after_id: str | None = None
+
+    while True:
+        page = await repository.find_expired_attachments(
+            now=reference, limit=page_size, after_id=after_id
+        )
+        if not page:
+            break
+        after_id = page[-1]["attachment_id"]
+
+        if not gcs_checked and any(record.get("gcs_blob") for record in page):
+            _warn_if_gcs_unavailable()
+            gcs_checked = True
+
+        attachment_ids = [record["attachment_id"] for record in page]
+        for attachment_id in attachment_ids:
+            signed_url_cache.discard(attachment_id)
+        stats.records_deleted += await repository.delete_attachments(attachment_ids)
+        await _release_page_blobs(repository, page, stats)
 
-    # Check if GCS is available before attempting deletions
+        stats.pages += 1
+        stats.elapsed_seconds = time.perf_counter() - started
+        logger.debug(
+            "Attachment cleanup page %d: %d record(s), %d blob(s) deleted so far",
+            stats.pages,
+            stats.records_deleted,
+            stats.blobs_deleted,
+        )
+        if on_progress is not None:
+            on_progress(stats)
+        if len(page) < page_size:
+            break
+
+    stats.elapsed_seconds = time.perf_counter() - started
+    if stats.records_deleted:
+        logger.info(
+            "Cleaned up %d expired attachment(s) in %.2fs "
+            "(%d page(s), %d blob(s) deleted, %d failed)",
+            stats.records_deleted,
+            stats.elapsed_seconds,
+            stats.pages,
+            stats.blobs_deleted,
+            stats.blob_failures,
+        )
+    return stats
+
+
+def _warn_if_gcs_unavailable() -> None:
     try:
-        gcs_available = is_gcs_available()
+        available = is_gcs_available()
     except Exception:  # pragma: no cover - defensive fallback
         logger.debug("Failed to determine GCS availability", exc_info=True)
-        gcs_available = False
-    if not gcs_available and expired:
+        available = False
+    if not available:
         logger.warning(
-            "GCS credentials not available. Skipping blob deletion for %d expired attachment(s). "
-            "Database records will still be cleaned up.",
-            len(expired),
+            "GCS credentials not available; blob deletion for expired attachments "
+            "may fail. Database records will still be cleaned up."
         )
 
-    for record in expired:
-        attachment_id = record.get("attachment_id")
-        if not isinstance(attachment_id, str) or not attachment_id:
+
+async def _release_page_blobs(
+    repository: ChatRepository,
+    page: list[dict[str, Any]],
+    stats: AttachmentCleanupStats,
+) -> None:
+    """Delete the stored objects of a removed page that nothing else uses."""
+
+    located: dict[str, tuple[AttachmentStorage, str]] = {}
+    for record in page:
+        found = storage_for_record(record)
+        if found is None:
+            continue
+        storage_path = record.get("storage_path") or found[1]
+        located.setdefault(storage_path, found)
+    if not located:
+        return
+
+    # Deduplicated content is shared; keep objects other records still use.
+    counts = await repository.count_attachments_by_storage_paths(list(located))
+    by_storage: dict[int, tuple[AttachmentStorage, list[str]]] = {}
+    for storage_path, (storage, key) in located.items():
+        if counts.get(storage_path):
             continue
-        blob_name = record.get("gcs_blob") or record.get("storage_path")
-        if blob_name:
-            try:
-                delete_blob(str(blob_name))
-            except Exception:  # pragma: no cover - best effort cleanup
-                logger.warning(
-                    "Failed to delete blob %s for attachment %s",
-                    blob_name,
-                    attachment_id,
-                    exc_info=True,
-                )
-        if await repository.delete_attachment(attachment_id):
-            removed += 1
-
-    if removed:
-        logger.info("Cleaned up %d expired attachment(s)", removed)
-    return removed
-
-
-__all__ = ["cleanup_expired_attachments"]
+        by_storage.setdefault(id(storage), (storage, []))[1].append(key)
+
+    groups = list(by_storage.values())
+    results = await asyncio.gather(
+        *(storage.delete_many(keys) for storage, keys in groups),
+        return_exceptions=True,
+    )
+    for (storage, keys), result in zip(groups, results):
+        if isinstance(result, Exception):
+            logger.warning(
+                "Failed to delete %d %s blob(s): %s", len(keys), storage.kind, result
+            )
+            stats.blob_failures += len(keys)
+            continue
+        stats.blobs_deleted += result
+        if result < len(keys):
+            logger.warning(
+                "Failed to delete %d of %d %s blob(s)",
+                len(keys) - result,
+                len(keys),
+                storage.kind,
+            )
+            stats.blob_failures += len(keys) - result
+
+
+__all__ = [
+    "ATTACHMENT_CLEANUP_PAGE_SIZE",
+    "AttachmentCleanupStats",
+    "cleanup_expired_attachments",
+    "run_attachment_cleanup",
+]
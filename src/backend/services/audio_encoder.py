@@ -0,0 +1,155 @@
+"""Streaming PCM to Opus encoder for compressed TTS delivery.
+
+OpenAI TTS is requested as raw PCM for the lowest synthesis latency; this
+stage re-encodes it to Opus before it goes over the voice WebSocket so
+kiosks on Wi-Fi receive roughly a tenth of the bytes. Encoding runs in a
+worker thread so the event loop never blocks on the codec.
+
+Requires the optional ``opuslib`` package (and the system libopus library).
+When it is missing, delivery falls back to the configured TTS format.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Iterable, Optional, Sequence
+
+from backend.schemas.client_settings import TtsSettings
+
+try:
+    import opuslib
+except Exception:  # pragma: no cover - optional dependency
+    opuslib = None
+
+logger = logging.getLogger(__name__)
+
+OPUS_ENCODING = "opus"
+OPUS_FRAME_MS = 20
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+_PCM_SAMPLE_WIDTH = 2  # 16-bit little-endian mono
+
+
+def opus_available() -> bool:
+    """Return True when the Opus codec can be loaded."""
+    return opuslib is not None
+
+
+def negotiate_delivery_encoding(
+    settings: TtsSettings, accepted_formats: Optional[Sequence[str]]
+) -> str:
+    """Pick the audio encoding sent to a client.
+
+    Opus is used only when enabled in settings, accepted by the client,
+    available on the server, and the upstream TTS format is raw PCM at a
+    sample rate Opus supports. Otherwise the TTS format is sent unchanged.
+    """
+    if (
+        settings.transcode_to_opus
+        and accepted_formats
+        and OPUS_ENCODING in accepted_formats
+        and settings.response_format == "pcm"
+        and settings.sample_rate in OPUS_SAMPLE_RATES
+        and opus_available()
+    ):
+        return OPUS_ENCODING
+    return settings.response_format
+
+
+def frame_packets(packets: Iterable[bytes]) -> bytes:
+    """Concatenate Opus packets, each prefixed by its 2-byte big-endian length."""
+    return b"".join(len(packet).to_bytes(2, "big") + packet for packet in packets)
+
+
+class OpusStreamEncoder:
+    """Incrementally encode 16-bit mono PCM into length-prefixed Opus packets."""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        bitrate: int,
+        frame_ms: int = OPUS_FRAME_MS,
+    ):
+        if opuslib is None:
+            raise RuntimeError("opuslib is not installed")
+        if sample_rate not in OPUS_SAMPLE_RATES:
+            raise ValueError(f"Opus does not support {sample_rate} Hz audio")
+
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self._frame_bytes = self.frame_samples * _PCM_SAMPLE_WIDTH
+        self._encoder = opuslib.Encoder(sample_rate, 1, opuslib.APPLICATION_VOIP)
+        self._encoder.bitrate = bitrate
+        self._pending = bytearray()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def encode(self, pcm: bytes) -> bytes:
+        """Encode all complete frames in ``pcm``; keep the remainder buffered."""
+        self.bytes_in += len(pcm)
+        self._pending.extend(pcm)
+        packets = []
+        while len(self._pending) >= self._frame_bytes:
+            frame = bytes(self._pending[: self._frame_bytes])
+            del self._pending[: self._frame_bytes]
+            packets.append(self._encoder.encode(frame, self.frame_samples))
+        encoded = frame_packets(packets)
+        self.bytes_out += len(encoded)
+        return encoded
+
+    def flush(self) -> bytes:
+        """Encode any buffered samples, padding the last frame with silence."""
+        if not self._pending:
+            return b""
+        padding = self._frame_bytes - len(self._pending)
+        self._pending.extend(b"\x00" * padding)
+        return self.encode(b"")
+
+
+async def transcode_audio_queue(
+    source_queue: asyncio.Queue,
+    sink_queue: asyncio.Queue,
+    encoder: OpusStreamEncoder,
+) -> None:
+    """Move PCM chunks from ``source_queue`` to ``sink_queue`` as Opus.
+
+    Mirrors the TTS queue protocol: ``None`` ends the stream and is always
+    forwarded, including when encoding fails.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            chunk = await source_queue.get()
+            if chunk is None:
+                tail = await loop.run_in_executor(None, encoder.flush)
+                if tail:
+                    await sink_queue.put(tail)
+                break
+            encoded = await loop.run_in_executor(None, encoder.encode, chunk)
+            if encoded:
+                await sink_queue.put(encoded)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Opus transcoding failed: {e}")
+    finally:
+        if encoder.bytes_in:
+            logger.debug(
+                "Opus transcode: %d PCM bytes -> %d bytes (%.1fx smaller)",
+                encoder.bytes_in,
+                encoder.bytes_out,
+                encoder.bytes_in / max(encoder.bytes_out, 1),
+            )
+        await sink_queue.put(None)
+
+
+__all__ = [
+    "OPUS_ENCODING",
+    "OPUS_FRAME_MS",
+    "OpusStreamEncoder",
+    "frame_packets",
+    "negotiate_delivery_encoding",
+    "opus_available",
+    "transcode_audio_queue",
+]
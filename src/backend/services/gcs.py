@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from pathlib import Path
-from typing import BinaryIO
+from typing import Any, BinaryIO, Callable, Iterable, Sequence, TypeVar
 
 from google.cloud import storage
 from google.oauth2 import service_account
@@ -14,6 +17,11 @@ from ..config import get_settings
 _client: storage.Client | None = None
 _bucket: storage.Bucket | None = None
 _credentials_available: bool | None = None
+_executor: ThreadPoolExecutor | None = None
+_DEFAULT_MAX_CONCURRENCY = 8
+GCS_BATCH_MAX_CALLS = 100  # Upper bound on calls per JSON API batch request
+
+T = TypeVar("T")
 
 
 def _get_settings():
@@ -93,17 +101,35 @@ def upload_bytes(blob_name: str, data: bytes, *, content_type: str) -> None:
     )
 
 
-def upload_filelike(blob_name: str, file_like: BinaryIO, *, content_type: str) -> None:
-    """Upload a file-like object to the configured bucket."""
+def upload_filelike(
+    blob_name: str,
+    file_like: BinaryIO,
+    *,
+    content_type: str,
+    size: int | None = None,
+    chunk_size: int | None = None,
+) -> None:
+    """Upload a file-like object to the configured bucket.
 
-    blob = get_bucket().blob(blob_name)
+    With ``chunk_size`` set the upload is resumable and only one chunk is
+    held in memory at a time; it must be a multiple of 256 KiB.
+    """
+
+    blob = get_bucket().blob(blob_name, chunk_size=chunk_size)
     blob.upload_from_file(
         file_like,
         content_type=content_type,
+        size=size,
         if_generation_match=0,
     )
 
 
+def download_bytes(blob_name: str) -> bytes:
+    """Download a blob's contents."""
+
+    return get_bucket().blob(blob_name).download_as_bytes()
+
+
 def delete_blob(blob_name: str) -> None:
     """Delete a blob if it exists."""
 
@@ -111,6 +137,21 @@ def delete_blob(blob_name: str) -> None:
     blob.delete(if_generation_match=None)
 
 
+def delete_blobs(blob_names: Sequence[str]) -> None:
+    """Delete several blobs with one batch request.
+
+    GCS accepts at most ``GCS_BATCH_MAX_CALLS`` calls per batch. Individual
+    failures (typically blobs that are already gone) are not raised.
+    """
+
+    if len(blob_names) > GCS_BATCH_MAX_CALLS:
+        raise ValueError(f"At most {GCS_BATCH_MAX_CALLS} blobs per batch")
+    bucket = get_bucket()
+    with get_client().batch(raise_exception=False):
+        for blob_name in blob_names:
+            bucket.blob(blob_name).delete()
+
+
 def sign_get_url(blob_name: str, *, expires_delta: timedelta) -> str:
     """Generate a signed GET URL for the given blob."""
 
@@ -122,12 +163,70 @@ def sign_get_url(blob_name: str, *, expires_delta: timedelta) -> str:
     )
 
 
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        try:
+            max_workers = _get_settings().gcs_max_concurrency
+        except Exception:  # pragma: no cover - settings unavailable (tests/tools)
+            max_workers = _DEFAULT_MAX_CONCURRENCY
+        _executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="gcs-io"
+        )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking storage call on the bounded GCS worker pool.
+
+    The google-cloud-storage client is synchronous: uploads block on the
+    network and URL signing does RSA work on the CPU. Running them here keeps
+    the event loop (and every concurrent SSE stream) responsive, while the
+    pool size caps how many storage calls are in flight at once.
+    """
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def sign_get_urls(
+    blob_names: Iterable[str], *, expires_delta: timedelta
+) -> dict[str, str]:
+    """Sign GET URLs for many blobs concurrently, keyed by blob name."""
+
+    unique = list(dict.fromkeys(blob_names))
+    urls = await asyncio.gather(
+        *(
+            run_blocking(sign_get_url, name, expires_delta=expires_delta)
+            for name in unique
+        )
+    )
+    return dict(zip(unique, urls))
+
+
+def shutdown_executor() -> None:
+    """Release the worker pool; a new one is created on next use."""
+
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
 __all__ = [
+    "GCS_BATCH_MAX_CALLS",
     "delete_blob",
+    "delete_blobs",
+    "download_bytes",
     "get_bucket",
     "get_client",
     "is_gcs_available",
+    "run_blocking",
+    "shutdown_executor",
     "sign_get_url",
+    "sign_get_urls",
     "upload_bytes",
     "upload_filelike",
 ]
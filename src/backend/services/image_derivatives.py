@@ -0,0 +1,143 @@
+"""Size-capped image variants for attachments.
+
+Stored images are kept at full resolution, but few consumers need that:
+the model is billed per image tile, and the kiosk only renders a screen's
+worth of pixels. This module renders downscaled WebP variants in a process
+pool so decoding and resampling never run on the event loop:
+
+* ``model`` - long edge capped for model input
+* ``display`` - long edge capped for kiosk/web display
+* ``thumbnail`` - small preview
+
+A variant is only produced when it is actually smaller than the original.
+Requires the optional ``Pillow`` package; without it no variants are made
+and every consumer receives the original.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    from PIL import Image
+except Exception:  # pragma: no cover - optional dependency
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+VARIANT_MODEL = "model"
+VARIANT_DISPLAY = "display"
+VARIANT_THUMBNAIL = "thumbnail"
+
+# Longest edge in pixels for each variant.
+VARIANT_MAX_EDGES: dict[str, int] = {
+    VARIANT_MODEL: 1568,
+    VARIANT_DISPLAY: 1280,
+    VARIANT_THUMBNAIL: 256,
+}
+
+DERIVATIVE_MIME_TYPE = "image/webp"
+DERIVATIVE_SOURCE_MIME_TYPES = frozenset({"image/png", "image/jpeg", "image/webp"})
+_WEBP_QUALITY = 80
+_PROCESS_POOL_WORKERS = 2
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def derivatives_available() -> bool:
+    """Return True when Pillow is installed."""
+
+    return Image is not None
+
+
+def render_variants(
+    data: bytes, max_edges: dict[str, int]
+) -> dict[str, tuple[bytes, int, int]]:
+    """Decode ``data`` once and render each variant that shrinks the image.
+
+    Returns ``{variant: (webp_bytes, width, height)}``. Runs in a worker
+    process, so it must stay a picklable top-level function.
+    """
+
+    with Image.open(io.BytesIO(data)) as source:
+        source.load()
+        image = source.convert("RGBA" if _has_alpha(source) else "RGB")
+
+    rendered: dict[str, tuple[bytes, int, int]] = {}
+    for name, max_edge in sorted(max_edges.items(), key=lambda item: -item[1]):
+        if max(image.size) <= max_edge:
+            continue
+        variant = image.copy()
+        variant.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        variant.save(buffer, format="WEBP", quality=_WEBP_QUALITY, method=4)
+        encoded = buffer.getvalue()
+        if len(encoded) >= len(data):
+            continue
+        rendered[name] = (encoded, variant.width, variant.height)
+    return rendered
+
+
+def _has_alpha(image) -> bool:
+    return image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned workers do not inherit the event loop or client threads.
+        _pool = ProcessPoolExecutor(
+            max_workers=_PROCESS_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+async def generate_variants(
+    data: bytes, mime_type: str
+) -> dict[str, tuple[bytes, int, int]]:
+    """Render the size-capped variants for an image in the process pool."""
+
+    if not derivatives_available() or mime_type not in DERIVATIVE_SOURCE_MIME_TYPES:
+        return {}
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _get_pool(), render_variants, data, VARIANT_MAX_EDGES
+        )
+    except BrokenProcessPool:
+        logger.warning("Image variant worker crashed; restarting the pool")
+        shutdown_pool()
+        return {}
+    except Exception as exc:
+        logger.warning("Failed to render image variants: %s", exc)
+        return {}
+
+
+def shutdown_pool() -> None:
+    """Stop the worker processes; a new pool is created on next use."""
+
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+__all__ = [
+    "DERIVATIVE_MIME_TYPE",
+    "VARIANT_DISPLAY",
+    "VARIANT_MAX_EDGES",
+    "VARIANT_MODEL",
+    "VARIANT_THUMBNAIL",
+    "derivatives_available",
+    "generate_variants",
+    "render_variants",
+    "shutdown_pool",
+]
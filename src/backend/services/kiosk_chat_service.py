@@ -7,6 +7,7 @@ from typing import Any, AsyncGenerator, Callable, Optional, Awaitable
 from backend.chat.orchestrator import ChatOrchestrator
 from backend.schemas.chat import ChatCompletionRequest, ChatMessage
 from backend.services.client_settings_service import get_client_settings_service
+from backend.utils import fast_json
 
 logger = logging.getLogger(__name__)
 
@@ -87,7 +88,7 @@ class KioskChatService:
 
                 if event_type == "message" and data and data != "[DONE]":
                     try:
-                        chunk = json.loads(data)
+                        chunk = fast_json.loads(data)
                         for choice in chunk.get("choices", []):
                             delta = choice.get("delta", {})
                             content = delta.get("content")
@@ -99,7 +100,7 @@ class KioskChatService:
                 elif event_type == "tool":
                     # Parse and broadcast tool events
                     try:
-                        tool_data = json.loads(data) if data else {}
+                        tool_data = fast_json.loads(data) if data else {}
                         status = tool_data.get("status")
                         name = tool_data.get("name")
 
@@ -132,13 +133,25 @@ class KioskChatService:
 
         return result if result else "Action completed."
 
+    async def discard_turn(self, client_id: str, turn_id: str) -> None:
+        """Remove a stored turn (user message plus replies) created with ``turn_id``."""
+        try:
+            await self._orchestrator.delete_message(f"kiosk_{client_id}", turn_id)
+        except Exception as e:
+            logger.warning(f"Failed to discard turn {turn_id} for kiosk_{client_id}: {e}")
+
     async def generate_response_streaming(
         self,
         user_message: str,
         client_id: str = "default",
+        turn_id: Optional[str] = None,
     ) -> AsyncGenerator[dict, None]:
         """Generate LLM response with streaming, yielding events as they occur.
 
+        When ``turn_id`` is given, the user message and every reply stored for
+        it are linked to that id so the whole turn can later be removed with
+        ``discard_turn`` (used for speculative responses that get cancelled).
+
         Yields:
             {"type": "text_chunk", "content": "..."} for text content
             {"type": "tool_status", "name": "...", "status": "started|finished|error"} for tools
@@ -152,7 +165,7 @@ class KioskChatService:
 
         # Build messages list
         messages = [
-            ChatMessage(role="user", content=user_message)
+            ChatMessage(role="user", content=user_message, client_message_id=turn_id)
         ]
 
         if settings.system_prompt:
@@ -164,6 +177,14 @@ class KioskChatService:
             model=settings.model,
             temperature=settings.temperature,
             max_tokens=settings.max_tokens,
+            metadata=(
+                {
+                    "client_parent_message_id": turn_id,
+                    "client_assistant_message_id": f"{turn_id}-assistant",
+                }
+                if turn_id
+                else None
+            ),
         )
 
         try:
@@ -173,7 +194,7 @@ class KioskChatService:
 
                 if event_type == "message" and data and data != "[DONE]":
                     try:
-                        chunk = json.loads(data)
+                        chunk = fast_json.loads(data)
                         for choice in chunk.get("choices", []):
                             delta = choice.get("delta", {})
                             content = delta.get("content")
@@ -184,7 +205,7 @@ class KioskChatService:
 
                 elif event_type == "tool":
                     try:
-                        tool_data = json.loads(data) if data else {}
+                        tool_data = fast_json.loads(data) if data else {}
                         status = tool_data.get("status")
                         name = tool_data.get("name")
 
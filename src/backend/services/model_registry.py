@@ -0,0 +1,421 @@
+"""Process-wide registry of the OpenRouter model catalog.
+
+The models routes, the streaming handler and every client's
+``ModelSettingsService`` read the catalog through one :class:`ModelRegistry`.
+It indexes model capabilities by id for O(1) lookups and serves the catalog
+stale-while-revalidate: once a catalog is cached, callers get it immediately
+and an expired catalog is refreshed in the background (concurrent callers
+share one in-flight request, revalidated with the last ETag). The last good
+catalog is persisted to disk so a cold start does not wait on OpenRouter.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict
+
+from ..openrouter import OpenRouterClient, OpenRouterError
+
+logger = logging.getLogger(__name__)
+
+MODEL_CATALOG_TTL_SECONDS = 300
+# Delay before retrying a failed refresh while a stale catalog is served.
+_RETRY_SECONDS = 30
+
+
+@dataclass(frozen=True)
+class ModelCapabilities:
+    """Capability information for one model in the OpenRouter catalog."""
+
+    supports_tools: bool | None
+    supported_parameters: frozenset[str]
+    context_length: int | None = None
+
+
+TOOL_PARAMETERS: tuple[str, ...] = (
+    "tools",
+    "tool_choice",
+    "parallel_tool_calls",
+)
+
+
+def _is_truthy(value: Any) -> bool:
+    """Best-effort truthiness check for heterogeneous API payloads."""
+
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return False
+    if isinstance(value, (int, float)):
+        return value != 0
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        return lowered not in {"", "false", "0", "none", "null", "no", "disabled"}
+    if isinstance(value, (list, tuple, set, dict)):
+        return bool(value)
+    return True
+
+
+def _normalize_supported_parameter(value: Any) -> str | None:
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    return text.lower()
+
+
+def _extract_model_capabilities(model_entry: Dict[str, Any]) -> ModelCapabilities:
+    capabilities = model_entry.get("capabilities")
+    supports_tools: bool | None = None
+    negative_flag = False
+
+    if isinstance(capabilities, dict):
+        for key in (
+            "tools",
+            "functions",
+            "function_calling",
+            "tool_choice",
+            "tool_calls",
+        ):
+            value = capabilities.get(key)
+            if value is None:
+                continue
+            if _is_truthy(value):
+                supports_tools = True
+                break
+            if value is False:
+                negative_flag = True
+
+    if supports_tools is None:
+        for key in ("tools", "functions", "supports_tools", "supports_functions"):
+            value = model_entry.get(key)
+            if value is None:
+                continue
+            if _is_truthy(value):
+                supports_tools = True
+                break
+            if value is False:
+                negative_flag = True
+
+    supported_parameters: set[str] = set()
+    raw_params = model_entry.get("supported_parameters")
+    if isinstance(raw_params, (list, tuple, set)):
+        for item in raw_params:
+            normalized = _normalize_supported_parameter(item)
+            if normalized:
+                supported_parameters.add(normalized)
+        if supports_tools is None:
+            indicator_keys = {
+                "tools",
+                "tool_choice",
+                "parallel_tool_calls",
+                "functions",
+                "function_calling",
+            }
+            if indicator_keys.intersection(supported_parameters):
+                supports_tools = True
+            else:
+                negative_flag = True
+
+    if supports_tools is None and negative_flag:
+        supports_tools = False
+
+    if supports_tools:
+        supported_parameters.update(
+            key for key in TOOL_PARAMETERS if key not in supported_parameters
+        )
+    return ModelCapabilities(
+        supports_tools=supports_tools,
+        supported_parameters=frozenset(supported_parameters),
+        context_length=_extract_context_length(model_entry),
+    )
+
+
+def _extract_context_length(model_entry: Dict[str, Any]) -> int | None:
+    candidates = [model_entry.get("context_length")]
+    top_provider = model_entry.get("top_provider")
+    if isinstance(top_provider, dict):
+        candidates.append(top_provider.get("context_length"))
+    for value in candidates:
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)) and value > 0:
+            return int(value)
+    return None
+
+
+class ModelRegistry:
+    """Shared OpenRouter model catalog with a capability index."""
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = MODEL_CATALOG_TTL_SECONDS,
+        cache_path: Path | None = None,
+    ) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._cache_path = cache_path
+        self._payload: dict[str, Any] | None = None
+        self._etag: str | None = None
+        self._expires_at = 0.0
+        self._capabilities: dict[str, ModelCapabilities] = {}
+        self._inflight: asyncio.Task[dict[str, Any]] | None = None
+        self._refresh_task: asyncio.Task[None] | None = None
+        self._snapshot_loaded = cache_path is None
+
+    @property
+    def payload(self) -> dict[str, Any] | None:
+        """The most recently fetched catalog, if any."""
+
+        return self._payload
+
+    def is_fresh(self) -> bool:
+        return self._payload is not None and time.monotonic() < self._expires_at
+
+    async def get_catalog(self, client: OpenRouterClient) -> dict[str, Any]:
+        """Return the catalog without waiting on OpenRouter when one is cached.
+
+        An expired catalog is returned as-is while a background refresh
+        runs; only a cold registry with no snapshot blocks on the fetch.
+        """
+
+        await self._load_snapshot()
+        if self._payload is None:
+            return await self.refresh(client)
+        if not self.is_fresh():
+            self._revalidate(client)
+        return self._payload
+
+    async def refresh(self, client: OpenRouterClient) -> dict[str, Any]:
+        """Fetch the catalog now; concurrent callers share one request."""
+
+        await self._load_snapshot()
+        # Shielded so a cancelled caller does not abort the shared fetch.
+        return await asyncio.shield(self._start_fetch(client))
+
+    def _revalidate(self, client: OpenRouterClient) -> None:
+        if self._inflight is not None and not self._inflight.done():
+            return
+        self._start_fetch(client).add_done_callback(_log_refresh_failure)
+
+    def _start_fetch(self, client: OpenRouterClient) -> asyncio.Task[dict[str, Any]]:
+        task = self._inflight
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch(client))
+            self._inflight = task
+        return task
+
+    async def _fetch(self, client: OpenRouterClient) -> dict[str, Any]:
+        try:
+            fetch_conditional = getattr(client, "fetch_model_catalog", None)
+            if fetch_conditional is None:
+                payload, etag = await client.list_models(), None
+            else:
+                etag = self._etag if self._payload is not None else None
+                response = await fetch_conditional(etag=etag)
+                if response.payload is None and self._payload is None:
+                    # 304 after invalidate() dropped the catalog meanwhile:
+                    # there is nothing left to revalidate, fetch it in full.
+                    response = await fetch_conditional(etag=None)
+                    if response.payload is None:
+                        raise OpenRouterError(
+                            502, "Model catalog request returned no payload"
+                        )
+                payload, etag = response.payload, response.etag
+            if payload is None:
+                # 304 Not Modified: keep the cached catalog (and its index).
+                payload = self._payload
+            else:
+                self._store(payload)
+                await self._save_snapshot(payload, etag)
+            self._etag = etag
+            self._expires_at = time.monotonic() + self._ttl_seconds
+            return payload
+        except BaseException:
+            if self._payload is not None:
+                self._expires_at = time.monotonic() + min(
+                    self._ttl_seconds, _RETRY_SECONDS
+                )
+            raise
+        finally:
+            self._inflight = None
+
+    def _store(self, payload: dict[str, Any]) -> None:
+        capabilities: dict[str, ModelCapabilities] = {}
+        data = payload.get("data") if isinstance(payload, dict) else None
+        if isinstance(data, list):
+            for item in data:
+                if isinstance(item, dict) and isinstance(item.get("id"), str):
+                    capabilities[item["id"]] = _extract_model_capabilities(item)
+        self._capabilities = capabilities
+        self._payload = payload
+
+    async def _load_snapshot(self) -> None:
+        if self._snapshot_loaded:
+            return
+        self._snapshot_loaded = True
+        assert self._cache_path is not None
+        try:
+            snapshot = await asyncio.to_thread(_read_snapshot, self._cache_path)
+        except Exception as exc:
+            logger.warning("Ignoring unreadable model catalog snapshot: %s", exc)
+            return
+        if snapshot is None or self._payload is not None:
+            return
+        # Served immediately but treated as expired, so it is revalidated.
+        self._store(snapshot["payload"])
+        self._etag = snapshot.get("etag")
+        self._expires_at = 0.0
+        logger.info("Loaded model catalog snapshot from %s", snapshot.get("fetched_at"))
+
+    async def _save_snapshot(self, payload: dict[str, Any], etag: str | None) -> None:
+        if self._cache_path is None:
+            return
+        snapshot = {
+            "etag": etag,
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+            "payload": payload,
+        }
+        try:
+            await asyncio.to_thread(_write_snapshot, self._cache_path, snapshot)
+        except Exception as exc:
+            logger.warning("Failed to persist model catalog snapshot: %s", exc)
+
+    async def get_capabilities(
+        self,
+        model_id: str,
+        *,
+        client: OpenRouterClient | None = None,
+    ) -> ModelCapabilities | None:
+        """Return capabilities for ``model_id``.
+
+        Without a ``client`` only an already loaded catalog is consulted. A
+        model missing from the catalog yields capabilities with unknown tool
+        support; ``None`` means no catalog is available.
+        """
+
+        if not self.is_fresh() and client is not None:
+            try:
+                await self.get_catalog(client)
+            except OpenRouterError as exc:
+                logger.info(
+                    "Unable to refresh model capabilities for %s: %s",
+                    model_id,
+                    exc.detail,
+                )
+            except Exception as exc:
+                logger.warning(
+                    "Unexpected error refreshing model capabilities for %s: %s",
+                    model_id,
+                    exc,
+                )
+        if self._payload is None:
+            return None
+        return self._capabilities.get(model_id) or _UNKNOWN_CAPABILITIES
+
+    def invalidate(self) -> None:
+        """Drop the cached catalog so the next lookup fetches it again."""
+
+        self._payload = None
+        self._etag = None
+        self._expires_at = 0.0
+        self._capabilities = {}
+
+    def start_background_refresh(
+        self, client: OpenRouterClient, *, interval_seconds: float | None = None
+    ) -> None:
+        """Keep the catalog warm by refreshing it before it expires."""
+
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        interval = interval_seconds or max(self._ttl_seconds / 2, 1.0)
+        self._refresh_task = asyncio.create_task(self._refresh_loop(client, interval))
+
+    async def stop_background_refresh(self) -> None:
+        task, self._refresh_task = self._refresh_task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _refresh_loop(self, client: OpenRouterClient, interval: float) -> None:
+        while True:
+            try:
+                await self.refresh(client)
+            except asyncio.CancelledError:
+                raise
+            except OpenRouterError as exc:
+                logger.info("Model catalog refresh failed: %s", exc.detail)
+            except Exception as exc:
+                logger.warning("Model catalog refresh failed: %s", exc)
+            await asyncio.sleep(interval)
+
+
+def _log_refresh_failure(task: asyncio.Task[Any]) -> None:
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if isinstance(exc, OpenRouterError):
+        logger.info("Background model catalog refresh failed: %s", exc.detail)
+    elif exc is not None:
+        logger.warning("Background model catalog refresh failed: %s", exc)
+
+
+def _read_snapshot(path: Path) -> dict[str, Any] | None:
+    if not path.exists():
+        return None
+    with path.open("r", encoding="utf-8") as handle:
+        snapshot = json.load(handle)
+    if not isinstance(snapshot, dict) or not isinstance(snapshot.get("payload"), dict):
+        return None
+    return snapshot
+
+
+def _write_snapshot(path: Path, snapshot: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.tmp")
+    with temp_path.open("w", encoding="utf-8") as handle:
+        json.dump(snapshot, handle, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+_UNKNOWN_CAPABILITIES = ModelCapabilities(None, frozenset())
+
+_registry: ModelRegistry | None = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the process-wide model registry."""
+
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
+
+
+def set_model_registry(registry: ModelRegistry | None) -> None:
+    """Replace the process-wide registry (``None`` resets it)."""
+
+    global _registry
+    _registry = registry
+
+
+__all__ = [
+    "MODEL_CATALOG_TTL_SECONDS",
+    "ModelCapabilities",
+    "ModelRegistry",
+    "TOOL_PARAMETERS",
+    "get_model_registry",
+    "set_model_registry",
+]
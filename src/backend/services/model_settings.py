@@ -8,121 +8,16 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from dataclasses import dataclass
 from typing import Any, Dict
 
-from ..openrouter import OpenRouterClient, OpenRouterError
+from ..openrouter import OpenRouterClient
 from ..schemas.client_settings import LlmSettings
 from ..services.client_settings_service import get_client_settings_service
+from .model_registry import ModelCapabilities, TOOL_PARAMETERS, get_model_registry
 
 logger = logging.getLogger(__name__)
 
-
-@dataclass(frozen=True)
-class ModelCapabilities:
-    """Cached capability information fetched from OpenRouter."""
-
-    supports_tools: bool | None
-    supported_parameters: frozenset[str]
-
-
-_PARAMETER_GUARD_LIST: tuple[str, ...] = (
-    "tools",
-    "tool_choice",
-    "parallel_tool_calls",
-)
-
-
-def _is_truthy(value: Any) -> bool:
-    """Best-effort truthiness check for heterogeneous API payloads."""
-
-    if isinstance(value, bool):
-        return value
-    if value is None:
-        return False
-    if isinstance(value, (int, float)):
-        return value != 0
-    if isinstance(value, str):
-        lowered = value.strip().lower()
-        return lowered not in {"", "false", "0", "none", "null", "no", "disabled"}
-    if isinstance(value, (list, tuple, set, dict)):
-        return bool(value)
-    return True
-
-
-def _normalize_supported_parameter(value: Any) -> str | None:
-    if value is None:
-        return None
-    text = str(value).strip()
-    if not text:
-        return None
-    return text.lower()
-
-
-def _extract_model_capabilities(model_entry: Dict[str, Any]) -> ModelCapabilities:
-    capabilities = model_entry.get("capabilities")
-    supports_tools: bool | None = None
-    negative_flag = False
-
-    if isinstance(capabilities, dict):
-        for key in (
-            "tools",
-            "functions",
-            "function_calling",
-            "tool_choice",
-            "tool_calls",
-        ):
-            value = capabilities.get(key)
-            if value is None:
-                continue
-            if _is_truthy(value):
-                supports_tools = True
-                break
-            if value is False:
-                negative_flag = True
-
-    if supports_tools is None:
-        for key in ("tools", "functions", "supports_tools", "supports_functions"):
-            value = model_entry.get(key)
-            if value is None:
-                continue
-            if _is_truthy(value):
-                supports_tools = True
-                break
-            if value is False:
-                negative_flag = True
-
-    supported_parameters: set[str] = set()
-    raw_params = model_entry.get("supported_parameters")
-    if isinstance(raw_params, (list, tuple, set)):
-        for item in raw_params:
-            normalized = _normalize_supported_parameter(item)
-            if normalized:
-                supported_parameters.add(normalized)
-        if supports_tools is None:
-            indicator_keys = {
-                "tools",
-                "tool_choice",
-                "parallel_tool_calls",
-                "functions",
-                "function_calling",
-            }
-            if indicator_keys.intersection(supported_parameters):
-                supports_tools = True
-            else:
-                negative_flag = True
-
-    if supports_tools is None and negative_flag:
-        supports_tools = False
-
-    if supports_tools:
-        supported_parameters.update(
-            key for key in _PARAMETER_GUARD_LIST if key not in supported_parameters
-        )
-    return ModelCapabilities(
-        supports_tools=supports_tools,
-        supported_parameters=frozenset(supported_parameters),
-    )
+_PARAMETER_GUARD_LIST = TOOL_PARAMETERS
 
 
 class ModelSettingsService:
@@ -144,8 +39,6 @@ class ModelSettingsService:
         self._default_model = default_model
         self._default_system_prompt = default_system_prompt
         self._lock = asyncio.Lock()
-        self._capabilities_lock = asyncio.Lock()
-        self._capabilities_cache: dict[str, ModelCapabilities] = {}
 
     def _get_service(self):
         """Get the client settings service for our client."""
@@ -213,44 +106,7 @@ class ModelSettingsService:
         *,
         client: OpenRouterClient | None = None,
     ) -> ModelCapabilities | None:
-        async with self._capabilities_lock:
-            cached = self._capabilities_cache.get(model_id)
-        if cached is not None:
-            return cached
-
-        if client is None:
-            return None
-
-        try:
-            payload = await client.list_models()
-        except OpenRouterError as exc:
-            logger.info(
-                "Unable to refresh model capabilities for %s: %s", model_id, exc.detail
-            )
-            return None
-        except Exception as exc:
-            logger.warning(
-                "Unexpected error refreshing model capabilities for %s: %s",
-                model_id,
-                exc,
-            )
-            return None
-
-        capability: ModelCapabilities | None = None
-        data = payload.get("data") if isinstance(payload, dict) else None
-        if isinstance(data, list):
-            for item in data:
-                if isinstance(item, dict) and item.get("id") == model_id:
-                    capability = _extract_model_capabilities(item)
-                    break
-
-        if capability is None:
-            capability = ModelCapabilities(None, frozenset())
-
-        async with self._capabilities_lock:
-            self._capabilities_cache[model_id] = capability
-
-        return capability
+        return await get_model_registry().get_capabilities(model_id, client=client)
 
     async def get_model_capabilities(
         self,
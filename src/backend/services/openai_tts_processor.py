@@ -3,7 +3,7 @@
 import asyncio
 import logging
 import os
-from typing import Optional
+from typing import Callable, Optional
 
 import openai
 from dotenv import load_dotenv
@@ -22,6 +22,7 @@ async def openai_text_to_speech_processor(
     stop_event: asyncio.Event,
     settings: TtsSettings,
     openai_client: Optional[openai.AsyncOpenAI] = None,
+    on_request: Optional[Callable[[], None]] = None,
 ) -> None:
     """
     Process phrases from phrase_queue, convert to speech with OpenAI TTS,
@@ -36,6 +37,8 @@ async def openai_text_to_speech_processor(
         stop_event: Event to signal early stop (barge-in)
         settings: TTS settings with voice, model, speed, etc.
         openai_client: Optional pre-configured OpenAI client
+        on_request: Optional hook called before each synthesis request
+            (lets the owner of a pooled client track connection activity)
     """
     logger.info("openai_text_to_speech_processor: ENTERING function")
 
@@ -83,6 +86,9 @@ async def openai_text_to_speech_processor(
                 f"OpenAI TTS: synthesizing phrase ({len(stripped_phrase)} chars): '{stripped_phrase[:80]}...'"
             )
 
+            if on_request is not None:
+                on_request()
+
             try:
                 # Use streaming response for low latency
                 async with openai_client.audio.speech.with_streaming_response.create(
@@ -126,6 +132,7 @@ async def process_tts_streams(
     stop_event: asyncio.Event,
     settings: TtsSettings,
     openai_client: Optional[openai.AsyncOpenAI] = None,
+    on_request: Optional[Callable[[], None]] = None,
 ) -> None:
     """
     Orchestrate TTS processing. Currently only supports OpenAI.
@@ -136,6 +143,7 @@ async def process_tts_streams(
         stop_event: Event to signal early stop
         settings: TTS settings
         openai_client: Optional pre-warmed OpenAI client for faster first request
+        on_request: Optional hook called before each synthesis request
     """
     if not settings.enabled:
         # TTS disabled - drain phrase queue
@@ -154,7 +162,12 @@ async def process_tts_streams(
 
     if provider == "openai":
         await openai_text_to_speech_processor(
-            phrase_queue, audio_queue, stop_event, settings, openai_client
+            phrase_queue,
+            audio_queue,
+            stop_event,
+            settings,
+            openai_client,
+            on_request=on_request,
         )
     else:
         logger.error(f"Unsupported TTS provider: {provider}")
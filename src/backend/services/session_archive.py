@@ -0,0 +1,209 @@
+"""Retention tiering: move idle unsaved sessions out of the hot chat database.
+
+Kiosk, voice and unsaved web sessions are never listed, but they would
+otherwise stay in ``chat_sessions.db`` forever, growing its indexes and WAL
+checkpoints. :func:`archive_inactive_sessions` copies sessions idle for
+longer than the retention period into a separate archive database (one
+zlib-compressed snapshot per session, tagged with the month of its last
+activity), deletes them from the hot database and compacts it.
+:func:`restore_archived_session` brings a session back when it is opened
+again.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import aiosqlite
+
+from ..repository import ChatRepository
+
+logger = logging.getLogger(__name__)
+
+# Sessions exported, archived and deleted per transaction.
+SESSION_ARCHIVE_BATCH_SIZE = 50
+_COMPRESSION_LEVEL = 6
+
+
+class SessionArchive:
+    """SQLite store of compressed session snapshots."""
+
+    def __init__(self, database_path: Path) -> None:
+        self._path = database_path
+        self._connection: aiosqlite.Connection | None = None
+
+    async def initialize(self) -> None:
+        if self._connection is not None:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = await aiosqlite.connect(self._path)
+        self._connection.row_factory = aiosqlite.Row
+        await self._connection.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+
+            CREATE TABLE IF NOT EXISTS archived_sessions (
+                session_id TEXT PRIMARY KEY,
+                archive_month TEXT NOT NULL,
+                archived_at DATETIME NOT NULL,
+                last_activity_at DATETIME,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                payload BLOB NOT NULL
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_archived_sessions_month
+            ON archived_sessions(archive_month);
+            """
+        )
+        await self._connection.commit()
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def store(
+        self, snapshots: list[dict[str, Any]], *, archived_at: datetime
+    ) -> None:
+        """Persist session snapshots from :meth:`ChatRepository.export_session`."""
+
+        assert self._connection is not None
+        if not snapshots:
+            return
+        await self._connection.executemany(
+            """
+            INSERT OR REPLACE INTO archived_sessions (
+                session_id,
+                archive_month,
+                archived_at,
+                last_activity_at,
+                message_count,
+                payload
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [_archive_row(snapshot, archived_at) for snapshot in snapshots],
+        )
+        await self._connection.commit()
+
+    async def load(self, session_id: str) -> dict[str, Any] | None:
+        """Return the archived snapshot of a session, if any."""
+
+        assert self._connection is not None
+        cursor = await self._connection.execute(
+            "SELECT payload FROM archived_sessions WHERE session_id = ?",
+            (session_id,),
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row["payload"]))
+
+    async def remove(self, session_id: str) -> None:
+        assert self._connection is not None
+        await self._connection.execute(
+            "DELETE FROM archived_sessions WHERE session_id = ?", (session_id,)
+        )
+        await self._connection.commit()
+
+
+def _archive_row(snapshot: dict[str, Any], archived_at: datetime) -> tuple[Any, ...]:
+    [conversation] = snapshot["tables"]["conversations"]
+    last_activity = (
+        conversation.get("last_activity_at")
+        or conversation.get("updated_at")
+        or conversation.get("created_at")
+    )
+    month = str(last_activity)[:7] if last_activity else archived_at.strftime("%Y-%m")
+    payload = json.dumps(snapshot, separators=(",", ":")).encode("utf-8")
+    return (
+        snapshot["session_id"],
+        month,
+        archived_at.astimezone(timezone.utc).isoformat(),
+        last_activity,
+        len(snapshot["tables"].get("messages") or []),
+        zlib.compress(payload, _COMPRESSION_LEVEL),
+    )
+
+
+async def archive_inactive_sessions(
+    repository: ChatRepository,
+    archive: SessionArchive,
+    *,
+    older_than: timedelta,
+    now: datetime | None = None,
+    batch_size: int = SESSION_ARCHIVE_BATCH_SIZE,
+) -> int:
+    """Archive unsaved sessions idle for ``older_than``; return how many moved.
+
+    Each batch is written to the archive before it is deleted from the hot
+    database. When anything moved, the hot database is vacuumed
+    incrementally and its WAL checkpointed.
+    """
+
+    reference = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    cutoff = reference - older_than
+    started = time.perf_counter()
+    archived = 0
+
+    while True:
+        session_ids = await repository.find_archivable_sessions(
+            inactive_before=cutoff, limit=batch_size
+        )
+        if not session_ids:
+            break
+        snapshots = []
+        for session_id in session_ids:
+            snapshot = await repository.export_session(session_id)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        await archive.store(snapshots, archived_at=reference)
+        exported = [snapshot["session_id"] for snapshot in snapshots]
+        deleted = await repository.delete_inactive_sessions(
+            exported, inactive_before=cutoff
+        )
+        # Sessions that became active meanwhile stay hot; drop their copies.
+        for session_id in set(exported).difference(deleted):
+            await archive.remove(session_id)
+        archived += len(deleted)
+        if not deleted or len(session_ids) < batch_size:
+            break
+
+    if archived:
+        await repository.compact_storage()
+        logger.info(
+            "Archived %d inactive session(s) in %.2fs",
+            archived,
+            time.perf_counter() - started,
+        )
+    return archived
+
+
+async def restore_archived_session(
+    repository: ChatRepository, archive: SessionArchive, session_id: str
+) -> bool:
+    """Move an archived session back into the hot database."""
+
+    snapshot = await archive.load(session_id)
+    if snapshot is None:
+        return False
+    restored = await repository.import_session(snapshot)
+    if restored:
+        await archive.remove(session_id)
+        logger.info("Restored archived session %s", session_id)
+    return restored
+
+
+__all__ = [
+    "SESSION_ARCHIVE_BATCH_SIZE",
+    "SessionArchive",
+    "archive_inactive_sessions",
+    "restore_archived_session",
+]
@@ -6,7 +6,7 @@ Uses synchronous SDK patterns with threading for reliable connection management.
 import asyncio
 import logging
 import threading
-from typing import Callable, Optional, Protocol
+from typing import Any, Callable, Optional, Protocol
 
 from deepgram import DeepgramClient
 from deepgram.core.events import EventType
@@ -25,6 +25,13 @@ logger = logging.getLogger(__name__)
 # Audio settings (must match frontend sender)
 SAMPLE_RATE = 16000
 
+# Pre-connected Deepgram sessions kept per voice client
+STANDBY_POOL_SIZE = 1
+
+
+def _ignore_transcript(_text: str, _is_final: bool) -> None:
+    """Placeholder transcript callback for standby sessions."""
+
 
 class SttSessionProtocol(Protocol):
     """Common interface for STT session implementations."""
@@ -53,6 +60,9 @@ class DeepgramSession:
         on_speech_start: Optional[
             Callable[[], None]
         ] = None,  # Called when Deepgram detects speech start
+        # Flux eager end-of-turn hooks (only fire when eager_eot_threshold is set)
+        on_eager_end_of_turn: Optional[Callable[[str], None]] = None,
+        on_turn_resumed: Optional[Callable[[], None]] = None,
         # Mode selection
         mode: str = "conversation",
         # Conversation mode (Flux v2) settings
@@ -74,6 +84,8 @@ class DeepgramSession:
         self.on_transcript = on_transcript
         self.on_error = on_error
         self.on_speech_start = on_speech_start  # VAD callback
+        self.on_eager_end_of_turn = on_eager_end_of_turn
+        self.on_turn_resumed = on_turn_resumed
 
         # Mode selection
         self.mode = mode
@@ -103,12 +115,56 @@ class DeepgramSession:
         self._listening_thread = None
         self._paused = False  # Track pause state
 
+    def bind_callbacks(
+        self,
+        on_transcript: Callable[[str, bool], None],
+        on_error: Optional[Callable[[str], None]] = None,
+        on_speech_start: Optional[Callable[[], None]] = None,
+        on_eager_end_of_turn: Optional[Callable[[str], None]] = None,
+        on_turn_resumed: Optional[Callable[[], None]] = None,
+        session_id: Optional[str] = None,
+    ) -> None:
+        """Attach a new owner's callbacks (used when activating a pooled session)."""
+        self.on_transcript = on_transcript
+        self.on_error = on_error
+        self.on_speech_start = on_speech_start
+        self.on_eager_end_of_turn = on_eager_end_of_turn
+        self.on_turn_resumed = on_turn_resumed
+        if session_id is not None:
+            self.session_id = session_id
+
+    def _schedule_callback(self, callback, *args) -> None:
+        """Run a callback, scheduling coroutines on the main event loop."""
+        if asyncio.iscoroutinefunction(callback):
+            if self._event_loop is not None:
+                asyncio.run_coroutine_threadsafe(callback(*args), self._event_loop)
+            else:
+                logger.error("No event loop available for STT callback")
+        else:
+            callback(*args)
+
     def _handle_message(self, result):
         """Handle transcript messages from Deepgram."""
         try:
             # For v2 (Flux): transcript is at top level with event type
             event = getattr(result, "event", None)
 
+            # Flux speculative turn-taking: EagerEndOfTurn may be followed by
+            # TurnResumed (user kept talking) or EndOfTurn (turn confirmed).
+            if event == "TurnResumed":
+                logger.info(f"--- TurnResumed for {self.session_id} ---")
+                if self.on_turn_resumed:
+                    self._schedule_callback(self.on_turn_resumed)
+            elif event == "EagerEndOfTurn":
+                eager_transcript = getattr(result, "transcript", None)
+                logger.info(
+                    f"--- EagerEndOfTurn for {self.session_id}: '{eager_transcript}' ---"
+                )
+                if self.on_eager_end_of_turn and eager_transcript:
+                    self._schedule_callback(
+                        self.on_eager_end_of_turn, eager_transcript
+                    )
+
             # Speech start detection: v2=StartOfTurn, v1=SpeechStarted
             if event in ("StartOfTurn", "SpeechStarted"):
                 logger.info(f"--- {event} for {self.session_id} ---")
@@ -595,11 +651,123 @@ class STTService:
 
         self.api_key = api_key
         self.sessions: dict[str, DeepgramSession | AzureSttSession] = {}
+        # Pre-connected, paused Deepgram sessions per client, each stored with
+        # the settings it was opened with so stale sockets are never reused.
+        self._standby: dict[str, list[tuple[dict[str, Any], DeepgramSession]]] = {}
+        self._prewarm_tasks: dict[str, asyncio.Task] = {}
 
     def get_settings(self, settings_client_id: str = "voice") -> SttSettings:
         """Get STT settings for the specified client."""
         return get_client_settings_service(settings_client_id).get_stt()
 
+    @staticmethod
+    def _deepgram_config(stt_settings: SttSettings) -> dict[str, Any]:
+        """Build DeepgramSession connection kwargs from client settings."""
+        # Flux rejects eager thresholds above the final EOT threshold
+        eager_eot_threshold: Optional[float] = None
+        if stt_settings.mode == "conversation" and stt_settings.speculative_response:
+            eager_eot_threshold = min(
+                stt_settings.eager_eot_threshold, stt_settings.eot_threshold
+            )
+        return {
+            # Mode selection
+            "mode": stt_settings.mode,
+            # Conversation mode (Flux v2) settings
+            "eot_threshold": stt_settings.eot_threshold,
+            "eot_timeout_ms": stt_settings.eot_timeout_ms,
+            "eager_eot_threshold": eager_eot_threshold,
+            "keyterms": list(stt_settings.keyterms),
+            # Command mode (Nova-3 v1) settings
+            "command_model": stt_settings.command_model,
+            "command_utterance_end_ms": stt_settings.command_utterance_end_ms,
+            "command_endpointing": stt_settings.command_endpointing,
+            "command_interim_results": stt_settings.command_interim_results,
+            "command_smart_format": stt_settings.command_smart_format,
+            "command_numerals": stt_settings.command_numerals,
+        }
+
+    def _take_standby(
+        self, session_id: str, config: dict[str, Any]
+    ) -> Optional[DeepgramSession]:
+        """Pop a live standby session opened with ``config``; close stale ones."""
+        pool = self._standby.get(session_id)
+        while pool:
+            standby_config, standby = pool.pop(0)
+            if standby_config == config and standby.is_connected:
+                return standby
+            logger.info(f"Discarding stale standby STT session for {session_id}")
+            asyncio.get_running_loop().run_in_executor(None, standby.close)
+        return None
+
+    def schedule_prewarm(self, session_id: str, settings_client_id: str = "voice") -> None:
+        """Replenish the standby pool for a client in the background."""
+        task = self._prewarm_tasks.get(session_id)
+        if task is not None and not task.done():
+            return
+        self._prewarm_tasks[session_id] = asyncio.create_task(
+            self.prewarm(session_id, settings_client_id)
+        )
+
+    async def prewarm(self, session_id: str, settings_client_id: str = "voice") -> None:
+        """Open paused Deepgram sessions so the next wake word skips connecting.
+
+        Standby sockets are held open with the existing pause/KeepAlive
+        machinery. Azure sessions are not pooled.
+        """
+        stt_settings = self.get_settings(settings_client_id)
+        if stt_settings.mode == "command" and stt_settings.command_engine == "azure":
+            return
+
+        config = self._deepgram_config(stt_settings)
+        loop = asyncio.get_running_loop()
+        pool = self._standby.setdefault(session_id, [])
+        # Drop entries that died or no longer match the settings
+        for entry in list(pool):
+            if entry[0] != config or not entry[1].is_connected:
+                pool.remove(entry)
+                loop.run_in_executor(None, entry[1].close)
+
+        while len(pool) < STANDBY_POOL_SIZE:
+            session = DeepgramSession(
+                api_key=self.api_key,
+                session_id=f"{session_id}:standby",
+                on_transcript=_ignore_transcript,
+                event_loop=loop,
+                **config,
+            )
+            connect_future = loop.run_in_executor(None, session.connect)
+            try:
+                success = await asyncio.shield(connect_future)
+            except asyncio.CancelledError:
+                # The connect keeps running in its thread; close once it ends
+                connect_future.add_done_callback(
+                    lambda _f, s=session: loop.run_in_executor(None, s.close)
+                )
+                raise
+            except Exception as e:
+                logger.warning(f"STT standby connect failed for {session_id}: {e}")
+                success = False
+            if not success:
+                await loop.run_in_executor(None, session.close)
+                return
+            session.pause()
+            # The client may have disconnected while we were connecting
+            if self._standby.get(session_id) is not pool:
+                await loop.run_in_executor(None, session.close)
+                return
+            pool.append((config, session))
+            logger.info(f"STT standby session ready for {session_id}")
+
+    async def discard_standby(self, session_id: str) -> None:
+        """Cancel replenishment and close all standby sessions for a client."""
+        task = self._prewarm_tasks.pop(session_id, None)
+        if task is not None and not task.done():
+            task.cancel()
+        pool = self._standby.pop(session_id, [])
+        loop = asyncio.get_running_loop()
+        for _config, session in pool:
+            await loop.run_in_executor(None, session.close)
+
     async def create_session(
         self,
         session_id: str,
@@ -607,10 +775,15 @@ class STTService:
         on_error: Optional[Callable[[str], None]] = None,
         on_speech_start: Optional[Callable[[], None]] = None,
         settings_client_id: str = "voice",
+        on_eager_end_of_turn: Optional[Callable[[str], None]] = None,
+        on_turn_resumed: Optional[Callable[[], None]] = None,
     ):
         """
         Start a new live transcription session.
         Routes to Azure or Deepgram based on client settings.
+
+        Eager end-of-turn callbacks are only wired for Flux (conversation mode)
+        when ``speculative_response`` is enabled in the client's STT settings.
         """
         try:
             # Close existing session if any
@@ -640,6 +813,32 @@ class STTService:
                     enable_dictation=stt_settings.azure_enable_dictation,
                 )
             else:
+                config = self._deepgram_config(stt_settings)
+                eager_enabled = config["eager_eot_threshold"] is not None
+                callbacks = dict(
+                    on_transcript=on_transcript,
+                    on_error=on_error,
+                    on_speech_start=on_speech_start,
+                    on_eager_end_of_turn=(
+                        on_eager_end_of_turn if eager_enabled else None
+                    ),
+                    on_turn_resumed=on_turn_resumed if eager_enabled else None,
+                )
+
+                # Activate a pre-connected standby socket when one matches the
+                # current settings, skipping the connect round-trip entirely.
+                standby = self._take_standby(session_id, config)
+                if standby is not None:
+                    standby.bind_callbacks(session_id=session_id, **callbacks)
+                    standby.resume()
+                    self.sessions[session_id] = standby
+                    logger.info(
+                        f"STT session activated from standby pool for {session_id} "
+                        f"(mode={stt_settings.mode}, engine=deepgram)"
+                    )
+                    self.schedule_prewarm(session_id, settings_client_id)
+                    return True
+
                 # IMPORTANT: The Deepgram listener runs in a background thread,
                 # which has no asyncio event loop. We must capture the main loop
                 # here (in async context) and pass it to DeepgramSession for
@@ -647,23 +846,9 @@ class STTService:
                 session = DeepgramSession(
                     api_key=self.api_key,
                     session_id=session_id,
-                    on_transcript=on_transcript,
-                    on_error=on_error,
-                    on_speech_start=on_speech_start,
-                    # Mode selection
-                    mode=stt_settings.mode,
-                    # Conversation mode (Flux v2) settings
-                    eot_threshold=stt_settings.eot_threshold,
-                    eot_timeout_ms=stt_settings.eot_timeout_ms,
-                    keyterms=stt_settings.keyterms,
-                    # Command mode (Nova-3 v1) settings
-                    command_model=stt_settings.command_model,
-                    command_utterance_end_ms=stt_settings.command_utterance_end_ms,
-                    command_endpointing=stt_settings.command_endpointing,
-                    command_interim_results=stt_settings.command_interim_results,
-                    command_smart_format=stt_settings.command_smart_format,
-                    command_numerals=stt_settings.command_numerals,
                     event_loop=loop,
+                    **callbacks,
+                    **config,
                 )
 
             # Connect in thread pool to not block asyncio
@@ -676,6 +861,8 @@ class STTService:
                     f"STT session created for {session_id} "
                     f"(mode={stt_settings.mode}, engine={engine})"
                 )
+                if not use_azure:
+                    self.schedule_prewarm(session_id, settings_client_id)
                 return True
             else:
                 logger.error(f"Failed to create STT session for {session_id}")
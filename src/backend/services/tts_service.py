@@ -3,8 +3,11 @@
 import asyncio
 import logging
 import os
+import time
+from contextlib import suppress
 from typing import AsyncGenerator, Optional
 
+import httpx
 import openai
 
 from backend.schemas.client_settings import TtsSettings
@@ -14,6 +17,20 @@ from backend.services.text_segmenter import process_text_chunks
 
 logger = logging.getLogger(__name__)
 
+# Connection pool tuning for the shared OpenAI TTS client
+_POOL_MAX_CONNECTIONS = 10
+_POOL_MAX_KEEPALIVE = 5
+_POOL_KEEPALIVE_EXPIRY_SECONDS = 120.0
+_CONNECT_TIMEOUT_SECONDS = 10.0
+_REQUEST_TIMEOUT_SECONDS = 60.0
+
+# Ping the API when the pool has been idle this long so the TLS session survives
+_KEEPALIVE_INTERVAL_SECONDS = 25.0
+# Stop pinging once no voice session has touched TTS for this long
+_KEEPALIVE_MAX_IDLE_SECONDS = 600.0
+# Connections idle longer than this are assumed dropped and are re-warmed
+_REWARM_AFTER_IDLE_SECONDS = 60.0
+
 
 class TTSService:
     """
@@ -25,43 +42,121 @@ class TTSService:
 
     def __init__(self):
         self._openai_client: Optional[openai.AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
         self._connection_warmed: bool = False
+        self._warm_lock = asyncio.Lock()
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._warm_model: str = "tts-1"
+        # Monotonic timestamps of the last request on the pool and the last
+        # time a voice session showed interest in TTS.
+        self._last_request_at: float = 0.0
+        self._last_interest_at: float = 0.0
         logger.info("TTSService initialized")
 
     @property
     def openai_client(self) -> openai.AsyncOpenAI:
-        """Lazy-initialize OpenAI client."""
-        if self._openai_client is None:
+        """Lazy-initialize the shared OpenAI client backed by a pooled HTTP/2 transport."""
+        if (
+            self._openai_client is None
+            or self._http_client is None
+            or self._http_client.is_closed
+        ):
+            self._http_client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(
+                    _REQUEST_TIMEOUT_SECONDS, connect=_CONNECT_TIMEOUT_SECONDS
+                ),
+                limits=httpx.Limits(
+                    max_connections=_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=_POOL_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+            )
             self._openai_client = openai.AsyncOpenAI(
-                api_key=os.getenv("OPENAI_API_KEY")
+                api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=self._http_client,
             )
+            self._connection_warmed = False
         return self._openai_client
 
+    def _mark_used(self) -> None:
+        """Record pool activity so keepalive pings are skipped while busy."""
+        now = time.monotonic()
+        self._last_request_at = now
+        self._last_interest_at = now
+
+    async def _ping(self) -> None:
+        """Issue a tiny authenticated request to open or refresh the pooled connection."""
+        await self.openai_client.models.retrieve(self._warm_model)
+        self._last_request_at = time.monotonic()
+
     async def warm_connection(self, settings_client_id: str = "voice") -> None:
         """
         Pre-warm the OpenAI TTS connection by establishing TLS handshake.
 
         Call this when a voice session connects (if TTS is enabled) to save
-        ~100-300ms on the first TTS request. Safe to call multiple times.
+        ~100-300ms on the first TTS request. Safe to call multiple times: the
+        connection is re-warmed if it has been idle long enough to have been
+        dropped, and a keepalive task keeps it open while sessions are active.
         """
-        if self._connection_warmed:
-            return
-
         settings = self.get_settings(settings_client_id)
         if not settings.enabled:
             return
 
-        try:
-            # Access the client to ensure it's created
-            client = self.openai_client
-            # Make a minimal request to establish the connection
-            # We use models.list() as it's fast and doesn't cost tokens
-            # The httpx client will keep the connection alive for reuse
-            await client.models.list()
-            self._connection_warmed = True
-            logger.info("TTS connection pre-warmed successfully")
-        except Exception as e:
-            logger.warning(f"TTS connection pre-warm failed (non-fatal): {e}")
+        self._last_interest_at = time.monotonic()
+        self._warm_model = settings.model
+
+        async with self._warm_lock:
+            idle_for = time.monotonic() - self._last_request_at
+            if self._connection_warmed and idle_for < _REWARM_AFTER_IDLE_SECONDS:
+                self._ensure_keepalive()
+                return
+
+            try:
+                await self._ping()
+                self._connection_warmed = True
+                logger.info("TTS connection pre-warmed successfully")
+            except Exception as e:
+                logger.warning(f"TTS connection pre-warm failed (non-fatal): {e}")
+                return
+
+        self._ensure_keepalive()
+
+    def _ensure_keepalive(self) -> None:
+        """Start the keepalive loop if it is not already running."""
+        if self._keepalive_task is None or self._keepalive_task.done():
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+
+    async def _keepalive_loop(self) -> None:
+        """Ping the pooled connection while idle so the next turn skips the TLS handshake."""
+        while True:
+            await asyncio.sleep(_KEEPALIVE_INTERVAL_SECONDS)
+            now = time.monotonic()
+            if now - self._last_interest_at > _KEEPALIVE_MAX_IDLE_SECONDS:
+                logger.debug("TTS keepalive stopping: no recent voice activity")
+                self._connection_warmed = False
+                return
+            if now - self._last_request_at < _KEEPALIVE_INTERVAL_SECONDS:
+                continue
+            try:
+                await self._ping()
+                logger.debug("TTS keepalive ping sent")
+            except Exception as e:
+                self._connection_warmed = False
+                logger.warning(f"TTS keepalive ping failed: {e}")
+
+    async def aclose(self) -> None:
+        """Stop the keepalive loop and close the pooled HTTP client."""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._keepalive_task
+            self._keepalive_task = None
+        if self._http_client is not None and not self._http_client.is_closed:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._openai_client = None
+        self._connection_warmed = False
 
     def get_settings(self, settings_client_id: str = "voice") -> TtsSettings:
         """Get current TTS settings for the specified client."""
@@ -83,6 +178,7 @@ class TTSService:
         if not text.strip():
             return b""
 
+        self._mark_used()
         try:
             response = await self.openai_client.audio.speech.create(
                 model=settings.model,
@@ -123,6 +219,7 @@ class TTSService:
             stop_event = asyncio.Event()
 
         chunk_size = settings.stream_chunk_bytes
+        self._mark_used()
 
         try:
             async with self.openai_client.audio.speech.with_streaming_response.create(
@@ -189,14 +286,19 @@ class TTSService:
             )
         )
 
-        # Create TTS processor task with pre-warmed client
+        # Create TTS processor task with the shared pooled client. Always go
+        # through the property so every pipeline reuses the same connection
+        # pool instead of opening a fresh TLS session.
+        if settings.enabled:
+            self._mark_used()
         tts_task = asyncio.create_task(
             process_tts_streams(
                 phrase_queue=phrase_queue,
                 audio_queue=audio_queue,
                 stop_event=stop_event,
                 settings=settings,
-                openai_client=self._openai_client,
+                openai_client=self.openai_client,
+                on_request=self._mark_used,
             )
         )
 
@@ -1,10 +1,218 @@
+import asyncio
 import logging
+import re
+import uuid
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from fastapi import WebSocket
 
+from ..utils import fast_json
+
+_TRANSCRIPT_NOISE = re.compile(r"[^\w\s']+")
+
+
+def normalize_transcript(text: str) -> str:
+    """Normalize a transcript for comparison (case, punctuation, whitespace)."""
+    return " ".join(_TRANSCRIPT_NOISE.sub(" ", text.lower()).split())
+
+
+class ResponseTurn:
+    """A single assistant response whose client-visible output can be held back.
+
+    Speculative turns are started on an eager end-of-turn transcript. Until
+    ``commit`` is called every outbound action (messages, state changes, audio)
+    is queued instead of sent; ``commit`` flushes the queue in order and lets
+    later actions go straight through. Non-speculative turns start committed.
+    """
+
+    def __init__(self, text: str, speculative: bool = False):
+        self.text = text
+        self.speculative = speculative
+        self.turn_id: Optional[str] = uuid.uuid4().hex if speculative else None
+        self.cancel_event = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self._confirmed = asyncio.Event()
+        self._pending: List[Callable[[], Awaitable[None]]] = []
+        self._lock = asyncio.Lock()
+        if not speculative:
+            self._confirmed.set()
+
+    @property
+    def committed(self) -> bool:
+        return self._confirmed.is_set()
+
+    def matches(self, text: str) -> bool:
+        """Return True if a final transcript confirms this turn's input."""
+        return normalize_transcript(text) == normalize_transcript(self.text)
+
+    async def emit(self, action: Callable[[], Awaitable[None]]) -> None:
+        """Run an outbound action now if committed, otherwise hold it."""
+        async with self._lock:
+            if self._confirmed.is_set():
+                await action()
+            else:
+                self._pending.append(action)
+
+    async def commit(self) -> None:
+        """Confirm the turn and flush held output in order."""
+        async with self._lock:
+            pending, self._pending = self._pending, []
+            for action in pending:
+                await action()
+            self._confirmed.set()
+
+    async def wait_confirmed(self) -> None:
+        """Block until the turn is committed (used to gate side effects)."""
+        await self._confirmed.wait()
+
+    async def cancel(self) -> None:
+        """Drop held output and stop the turn's task."""
+        self.cancel_event.set()
+        self._pending.clear()
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+# Outbound priority classes (lower is sent first)
+PRIORITY_CONTROL = 0
+PRIORITY_AUDIO = 1
+PRIORITY_TEXT = 2
+
+# The stream start marker shares the audio lane so it cannot overtake the
+# previous response's queued chunks (including its ``is_last`` chunk).
+_AUDIO_MESSAGE_TYPES = frozenset({"tts_audio_start", "tts_audio_chunk"})
+_TEXT_MESSAGE_TYPES = frozenset(
+    {
+        "transcript",
+        "assistant_response_start",
+        "assistant_response_chunk",
+        "assistant_response_end",
+    }
+)
+
+# Per-class queue bounds; control messages are never dropped or throttled
+OUTBOX_MAX_AUDIO = 256
+OUTBOX_MAX_TEXT = 256
+
+
+def message_priority(message: dict) -> int:
+    """Classify an outbound voice message: control > audio > text."""
+    message_type = message.get("type")
+    if message_type in _AUDIO_MESSAGE_TYPES:
+        return PRIORITY_AUDIO
+    if message_type in _TEXT_MESSAGE_TYPES:
+        return PRIORITY_TEXT
+    return PRIORITY_CONTROL
+
+
+class OutboundQueue:
+    """Bounded priority queue feeding a single WebSocket writer.
+
+    Control messages always go first, then audio, then transcripts/text.
+    Within a class messages keep their order; TTS stream markers are audio.
+    Queued ``state`` updates are merged so only the latest is delivered,
+    ``interrupt_tts`` purges queued audio, and when the text class is full
+    stale interim transcripts are dropped before producers are made to wait.
+    Audio producers block while the audio class is full (backpressure).
+    """
+
+    def __init__(
+        self, max_audio: int = OUTBOX_MAX_AUDIO, max_text: int = OUTBOX_MAX_TEXT
+    ):
+        self._queues: dict[int, deque[dict]] = {
+            PRIORITY_CONTROL: deque(),
+            PRIORITY_AUDIO: deque(),
+            PRIORITY_TEXT: deque(),
+        }
+        self._limits = {PRIORITY_AUDIO: max_audio, PRIORITY_TEXT: max_text}
+        self._cond = asyncio.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _has_space(self, priority: int) -> bool:
+        limit = self._limits.get(priority)
+        return limit is None or len(self._queues[priority]) < limit
+
+    def _drop_interim_transcript(self) -> bool:
+        queue = self._queues[PRIORITY_TEXT]
+        for queued in queue:
+            if queued.get("type") == "transcript" and not queued.get("is_final"):
+                queue.remove(queued)
+                self.dropped += 1
+                return True
+        return False
+
+    async def put(self, message: dict) -> None:
+        """Enqueue a message, merging or dropping stale entries as needed."""
+        priority = message_priority(message)
+        message_type = message.get("type")
+        async with self._cond:
+            if self._closed:
+                return
+            queue = self._queues[priority]
+            if priority == PRIORITY_CONTROL:
+                if message_type == "state":
+                    stale = [m for m in queue if m.get("type") == "state"]
+                    for queued in stale:
+                        queue.remove(queued)
+                    self.dropped += len(stale)
+                elif message_type == "interrupt_tts":
+                    self.dropped += len(self._queues[PRIORITY_AUDIO])
+                    self._queues[PRIORITY_AUDIO].clear()
+            elif not self._has_space(priority):
+                if priority == PRIORITY_TEXT:
+                    self._drop_interim_transcript()
+                await self._cond.wait_for(
+                    lambda: self._closed or self._has_space(priority)
+                )
+                if self._closed:
+                    return
+            queue.append(message)
+            self._cond.notify_all()
+
+    async def get(self) -> Optional[dict]:
+        """Return the highest-priority message, or None once closed."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._closed or len(self) > 0)
+            if self._closed:
+                return None
+            for priority in (PRIORITY_CONTROL, PRIORITY_AUDIO, PRIORITY_TEXT):
+                queue = self._queues[priority]
+                if queue:
+                    message = queue.popleft()
+                    self._cond.notify_all()
+                    return message
+            return None
+
+    def close(self) -> None:
+        """Stop accepting messages and wake any waiting producers/consumer."""
+        self._closed = True
+        for queue in self._queues.values():
+            queue.clear()
+
+        async def _wake() -> None:
+            async with self._cond:
+                self._cond.notify_all()
+
+        try:
+            asyncio.get_running_loop().create_task(_wake())
+        except RuntimeError:
+            pass
+
 
 @dataclass
 class VoiceSession:
@@ -19,6 +227,10 @@ class VoiceSession:
     stt_session_id: Optional[str] = None
     last_wakeword_time: Optional[datetime] = None
     stt_session_pending: bool = False
+    # Audio encodings the client can play, in preference order (e.g. ["opus", "pcm"])
+    accepted_audio_formats: List[str] = field(default_factory=list)
+    outbox: OutboundQueue = field(default_factory=OutboundQueue)
+    writer_task: Optional[asyncio.Task] = None
 
     def update_activity(self):
         """Update the last activity timestamp."""
@@ -35,28 +247,48 @@ class VoiceConnectionManager:
         """Accept a new WebSocket connection and create a session."""
         await websocket.accept()
         session = VoiceSession(client_id=client_id, websocket=websocket)
+        session.writer_task = asyncio.create_task(self._run_writer(session))
         self.active_connections[client_id] = session
         print(f"Client connected: {client_id}")
 
     def disconnect(self, client_id: str):
         """Remove a client session."""
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
+        session = self.active_connections.pop(client_id, None)
+        if session is not None:
+            session.outbox.close()
+            writer = session.writer_task
+            if writer is not None and writer is not asyncio.current_task():
+                writer.cancel()
             print(f"Client disconnected: {client_id}")
 
     def get_session(self, client_id: str) -> Optional[VoiceSession]:
         """Retrieve a session by client ID."""
         return self.active_connections.get(client_id)
 
+    async def _run_writer(self, session: VoiceSession):
+        """Drain a session's outbox onto its WebSocket, one message at a time."""
+        while True:
+            message = await session.outbox.get()
+            if message is None:
+                return
+            try:
+                await session.websocket.send_text(fast_json.dumps(message))
+            except Exception as e:
+                print(f"Error sending to {session.client_id}: {e}")
+                if self.active_connections.get(session.client_id) is session:
+                    self.disconnect(session.client_id)
+                return
+
     async def send_message(self, client_id: str, message: dict):
-        """Send a JSON message to a specific client."""
+        """Queue a JSON message for a specific client.
+
+        Returns once the message is queued; the per-session writer task does
+        the actual send so a slow link never stalls the caller (audio and
+        text producers may wait briefly when their queue class is full).
+        """
         session = self.active_connections.get(client_id)
         if session:
-            try:
-                await session.websocket.send_json(message)
-            except Exception as e:
-                print(f"Error sending to {client_id}: {e}")
-                self.disconnect(client_id)
+            await session.outbox.put(message)
 
     async def update_state(
         self, client_id: str, new_state: str, broadcast: bool = False
@@ -86,8 +318,9 @@ class VoiceConnectionManager:
         print(
             f"Broadcasting {message.get('type')} to {len(clients)} clients: {clients}"
         )
-        for client_id in clients:
-            await self.send_message(client_id, message)
+        await asyncio.gather(
+            *(self.send_message(client_id, message) for client_id in clients)
+        )
 
     async def set_all_states(
         self, new_state: str, extra_data: Optional[Dict[str, Any]] = None
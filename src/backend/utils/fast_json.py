@@ -0,0 +1,155 @@
+"""Central JSON encoding for hot paths (SSE chunks, stored metadata, APIs).
+
+Uses the optional ``orjson`` package when it is installed and the standard
+library otherwise. Both backends emit the same compact UTF-8 text
+(``separators=(",", ":")``, ``ensure_ascii=False``), so output does not
+depend on which one is active:
+
+* values orjson cannot encode (integers beyond 64 bits) and text it rejects
+  on decode (``NaN``/``Infinity`` literals) are retried with the standard
+  library, which then behaves (or raises) exactly as before;
+* dataclasses and datetimes are not serialized natively by orjson but go
+  through ``default`` like they do with ``json.dumps``;
+* non-string dict keys are coerced to strings as ``json.dumps`` does;
+* strings holding lone surrogates (which UTF-8 cannot represent) make the
+  whole value fall back to ``ensure_ascii`` output, where they are escaped
+  (``\\ud83d``) as the ``json.dumps`` defaults always did.
+
+The one difference is that orjson writes non-finite floats as ``null``.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    _ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
+
+_SURROGATE = re.compile("[\ud800-\udfff]")
+
+# json.dumps builds a new encoder whenever options differ from the defaults;
+# reusing configured encoders keeps the fallback as fast as plain json.dumps.
+# Keyed by (sort_keys, allow_nan, ensure_ascii).
+_STDLIB_ENCODERS = {
+    (sort_keys, allow_nan, ensure_ascii): json.JSONEncoder(
+        ensure_ascii=ensure_ascii,
+        allow_nan=allow_nan,
+        separators=(",", ":"),
+        sort_keys=sort_keys,
+    )
+    for sort_keys in (False, True)
+    for allow_nan in (False, True)
+    for ensure_ascii in (False, True)
+}
+
+
+def _stdlib_dumps(
+    value: Any,
+    sort_keys: bool,
+    default: Callable[[Any], Any] | None,
+    allow_nan: bool,
+    ensure_ascii: bool = False,
+) -> str:
+    if default is None:
+        return _STDLIB_ENCODERS[sort_keys, allow_nan, ensure_ascii].encode(value)
+    return json.dumps(
+        value,
+        ensure_ascii=ensure_ascii,
+        allow_nan=allow_nan,
+        separators=(",", ":"),
+        sort_keys=sort_keys,
+        default=default,
+    )
+
+
+def dumps_bytes(
+    value: Any,
+    *,
+    sort_keys: bool = False,
+    default: Callable[[Any], Any] | None = None,
+    allow_nan: bool = True,
+) -> bytes:
+    """Serialize ``value`` to compact UTF-8 JSON bytes.
+
+    With ``allow_nan=False`` the standard library raises :class:`ValueError`
+    for non-finite floats instead of writing ``NaN``/``Infinity``.
+    """
+
+    if orjson is not None:
+        options = _ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(value, default=default, option=options)
+        except orjson.JSONEncodeError:
+            pass
+    text = _stdlib_dumps(value, sort_keys, default, allow_nan)
+    try:
+        return text.encode("utf-8")
+    except UnicodeEncodeError:
+        # Lone surrogates: escape them (ASCII output is valid UTF-8).
+        return _stdlib_dumps(value, sort_keys, default, allow_nan, True).encode()
+
+
+def dumps(
+    value: Any,
+    *,
+    sort_keys: bool = False,
+    default: Callable[[Any], Any] | None = None,
+) -> str:
+    """Serialize ``value`` to a compact JSON string."""
+
+    if orjson is not None:
+        return dumps_bytes(value, sort_keys=sort_keys, default=default).decode("utf-8")
+    text = _stdlib_dumps(value, sort_keys, default, True)
+    if not text.isascii() and _SURROGATE.search(text):
+        # SQLite and the SSE stream encode to UTF-8, which rejects these.
+        return _stdlib_dumps(value, sort_keys, default, True, True)
+    return text
+
+
+def loads(data: str | bytes | bytearray | memoryview) -> Any:
+    """Parse JSON text; raises :class:`json.JSONDecodeError` on invalid input."""
+
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """``JSONResponse`` rendered through :func:`dumps_bytes`.
+
+    Like ``JSONResponse``, non-finite floats raise rather than producing
+    invalid JSON (orjson writes them as ``null``).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content, allow_nan=False)
+
+
+__all__ = [
+    "FastJSONResponse",
+    "JSON_BACKEND",
+    "dumps",
+    "dumps_bytes",
+    "loads",
+]
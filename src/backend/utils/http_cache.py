@@ -0,0 +1,252 @@
+"""Compressed JSON responses with strong ETags and ``304 Not Modified``.
+
+Large read endpoints (the model catalog, session messages, MCP status) are
+fetched on every frontend load. :func:`json_response` answers a matching
+``If-None-Match`` with an empty 304 and otherwise compresses the body with
+the best encoding the client accepts: ``br`` (requires the optional
+``brotli`` package), then ``gzip``. :class:`EncodedJSON` keeps the
+serialized body and its compressed variants, so cached payloads such as the
+model catalog are serialized and compressed once per version.
+
+Serialization and hashing run in a worker thread, and so does compression
+of bodies of ``_OFFLOAD_BYTES`` or more, so large responses do not stall the
+event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+from . import fast_json
+
+try:
+    import brotli
+except Exception:  # pragma: no cover - optional dependency
+    brotli = None
+
+ENCODING_BROTLI = "br"
+ENCODING_GZIP = "gzip"
+ENCODING_IDENTITY = "identity"
+
+# Bodies smaller than this are not worth compressing.
+_MIN_COMPRESS_BYTES = 1024
+# Bodies at least this large are compressed in a worker thread.
+_OFFLOAD_BYTES = 64 * 1024
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5
+_ETAG_DIGEST_SIZE = 16
+
+
+def make_etag(*parts: Any) -> str:
+    """Return a strong ETag derived from ``parts`` (versions, query keys)."""
+
+    digest = hashlib.blake2b(digest_size=_ETAG_DIGEST_SIZE)
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def content_etag(content: Any) -> str:
+    """Return a strong ETag for the serialized form of ``content``."""
+
+    return _body_etag(dumps_json(content))
+
+
+def dumps_json(content: Any) -> bytes:
+    """Serialize ``content`` as compact UTF-8 JSON (see :mod:`.fast_json`)."""
+
+    return fast_json.dumps_bytes(content)
+
+
+class EncodedJSON:
+    """A serialized JSON body with its ETag and lazily compressed variants."""
+
+    def __init__(self, content: Any, *, etag: str | None = None) -> None:
+        body = dumps_json(content)
+        self.etag = etag or _body_etag(body)
+        self._variants: dict[str, bytes] = {ENCODING_IDENTITY: body}
+
+    @classmethod
+    async def encode(cls, content: Any, *, etag: str | None = None) -> EncodedJSON:
+        """Serialize ``content`` in a worker thread.
+
+        The size of a body is only known once it is serialized, so this always
+        leaves the event loop.
+        """
+
+        return await asyncio.to_thread(cls, content, etag=etag)
+
+    def body(self, encoding: str) -> bytes:
+        variant = self._variants.get(encoding)
+        if variant is None:
+            variant = _compress(self._variants[ENCODING_IDENTITY], encoding)
+            self._variants[encoding] = variant
+        return variant
+
+    async def body_async(self, encoding: str) -> bytes:
+        """Like :meth:`body`, compressing large bodies in a worker thread."""
+
+        variant = self._variants.get(encoding)
+        if variant is None:
+            identity = self._variants[ENCODING_IDENTITY]
+            if len(identity) >= _OFFLOAD_BYTES:
+                variant = await asyncio.to_thread(_compress, identity, encoding)
+            else:
+                variant = _compress(identity, encoding)
+            self._variants[encoding] = variant
+        return variant
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the body and the compressed variants built so far."""
+
+        return sum(len(variant) for variant in self._variants.values())
+
+    def __len__(self) -> int:
+        return len(self._variants[ENCODING_IDENTITY])
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str:
+    """Pick ``br``, ``gzip`` or ``identity`` from an ``Accept-Encoding`` header."""
+
+    accepted: dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+
+    def allowed(encoding: str) -> bool:
+        return accepted.get(encoding, accepted.get("*", 0.0)) > 0
+
+    if brotli is not None and allowed(ENCODING_BROTLI):
+        return ENCODING_BROTLI
+    if allowed(ENCODING_GZIP):
+        return ENCODING_GZIP
+    return ENCODING_IDENTITY
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Return True when ``If-None-Match`` names ``etag`` (weak comparison)."""
+
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = _base_etag(etag)
+    return any(
+        _base_etag(candidate.strip()) == target
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """Return a 304 response if the client already has ``etag``."""
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    return None
+
+
+async def json_response(
+    request: Request, content: Any | EncodedJSON, *, etag: str | None = None
+) -> Response:
+    """Return ``content`` as compressed JSON, or 304 when it is unchanged.
+
+    Without ``etag`` the ETag is a hash of the serialized body, so unchanged
+    data still revalidates to a 304 (saving the transfer, not the work).
+    """
+
+    if etag is not None:
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+    encoded = (
+        content
+        if isinstance(content, EncodedJSON)
+        else await EncodedJSON.encode(content, etag=etag)
+    )
+    if etag is None:
+        cached = not_modified(request, encoded.etag)
+        if cached is not None:
+            return cached
+
+    encoding = ENCODING_IDENTITY
+    if len(encoded) >= _MIN_COMPRESS_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = _cache_headers(encoded.etag, encoding)
+    if encoding != ENCODING_IDENTITY:
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=await encoded.body_async(encoding),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def _cache_headers(etag: str, encoding: str = ENCODING_IDENTITY) -> dict[str, str]:
+    return {
+        "ETag": _representation_etag(etag, encoding),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+
+def _representation_etag(etag: str, encoding: str) -> str:
+    # Each content coding is a different representation, so it gets its own
+    # strong validator; _base_etag strips the suffix when comparing.
+    if encoding == ENCODING_IDENTITY:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _base_etag(etag: str) -> str:
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for encoding in (ENCODING_BROTLI, ENCODING_GZIP):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return f'{etag[: -len(suffix)]}"'
+    return etag
+
+
+def _body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=_ETAG_DIGEST_SIZE).hexdigest()}"'
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == ENCODING_GZIP:
+        return gzip.compress(body, compresslevel=_GZIP_LEVEL, mtime=0)
+    if encoding == ENCODING_BROTLI and brotli is not None:
+        return brotli.compress(body, quality=_BROTLI_QUALITY)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+__all__ = [
+    "ENCODING_BROTLI",
+    "ENCODING_GZIP",
+    "ENCODING_IDENTITY",
+    "EncodedJSON",
+    "content_etag",
+    "dumps_json",
+    "etag_matches",
+    "json_response",
+    "make_etag",
+    "negotiate_encoding",
+    "not_modified",
+]
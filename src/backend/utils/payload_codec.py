@@ -0,0 +1,114 @@
+"""Compact binary encodings for JSON-compatible values stored in SQLite.
+
+Every encoded value starts with a one-byte header naming how it was written,
+so rows stay readable when the configured format changes later:
+
+* ``json`` - UTF-8 JSON (no extra dependency)
+* ``msgpack`` - MessagePack; requires the optional ``msgpack`` package
+* ``zstd`` - zstd-compressed MessagePack (or JSON without ``msgpack``);
+  requires the optional ``zstandard`` package
+
+Requesting a format whose package is missing falls back to ``json``.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from . import fast_json
+
+try:
+    import msgpack
+except Exception:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except Exception:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_JSON = "json"
+FORMAT_MSGPACK = "msgpack"
+FORMAT_ZSTD = "zstd"
+STORAGE_FORMATS = (FORMAT_JSON, FORMAT_MSGPACK, FORMAT_ZSTD)
+
+_HEADER_JSON = 0x01
+_HEADER_MSGPACK = 0x02
+_HEADER_ZSTD = 0x80  # flag combined with the serialization header
+_ZSTD_LEVEL = 3
+
+
+def format_available(storage_format: str) -> bool:
+    """Return True when the packages needed for ``storage_format`` are installed."""
+
+    if storage_format == FORMAT_MSGPACK:
+        return msgpack is not None
+    if storage_format == FORMAT_ZSTD:
+        return zstandard is not None
+    return storage_format == FORMAT_JSON
+
+
+class PayloadCodec:
+    """Encode values in the configured format; decode any supported format."""
+
+    def __init__(self, storage_format: str = FORMAT_JSON) -> None:
+        if storage_format not in STORAGE_FORMATS:
+            raise ValueError(f"Unknown storage format: {storage_format}")
+        if not format_available(storage_format):
+            logger.warning(
+                "Storage format %s is unavailable (missing package); using json",
+                storage_format,
+            )
+            storage_format = FORMAT_JSON
+        self.storage_format = storage_format
+        self._compressor = (
+            zstandard.ZstdCompressor(level=_ZSTD_LEVEL)
+            if storage_format == FORMAT_ZSTD
+            else None
+        )
+
+    def encode(self, value: Any) -> bytes:
+        if msgpack is not None and self.storage_format != FORMAT_JSON:
+            header, body = _HEADER_MSGPACK, msgpack.packb(value, use_bin_type=True)
+        else:
+            header = _HEADER_JSON
+            body = fast_json.dumps_bytes(value)
+        if self._compressor is not None:
+            return bytes([header | _HEADER_ZSTD]) + self._compressor.compress(body)
+        return bytes([header]) + body
+
+
+def decode_payload(data: bytes | str | None) -> Any:
+    """Decode a value written by :class:`PayloadCodec` (or plain JSON text)."""
+
+    if data is None:
+        return None
+    if isinstance(data, str):
+        return fast_json.loads(data)
+    header, body = data[0], data[1:]
+    if header & _HEADER_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this value")
+        body = zstandard.ZstdDecompressor().decompress(body)
+        header &= ~_HEADER_ZSTD
+    if header == _HEADER_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("msgpack is required to read this value")
+        return msgpack.unpackb(body, raw=False)
+    if header == _HEADER_JSON:
+        return fast_json.loads(body)
+    raise ValueError(f"Unknown payload header: {header:#x}")
+
+
+__all__ = [
+    "FORMAT_JSON",
+    "FORMAT_MSGPACK",
+    "FORMAT_ZSTD",
+    "PayloadCodec",
+    "STORAGE_FORMATS",
+    "decode_payload",
+    "format_available",
+]
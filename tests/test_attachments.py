@@ -12,10 +12,24 @@ from fastapi import UploadFile
 from starlette.datastructures import Headers
 
 import backend.services.attachments as attachments
-from backend.services import attachment_urls
-from backend.services.attachment_urls import refresh_message_attachments
+from backend.services import gcs
+from backend.services.attachment_storage import (
+    GCSAttachmentStorage,
+    LocalAttachmentStorage,
+    set_attachment_storage,
+    set_local_storage,
+    storage_for_record,
+)
+from backend.services.attachment_urls import (
+    refresh_expiring_signed_urls,
+    refresh_message_attachments,
+    signed_url_cache,
+)
 from backend.services.attachments import AttachmentService
-from backend.services.attachments_cleanup import cleanup_expired_attachments
+from backend.services.attachments_cleanup import (
+    cleanup_expired_attachments,
+    run_attachment_cleanup,
+)
 from src.backend.repository import ChatRepository
 
 
@@ -24,6 +38,13 @@ def anyio_backend() -> str:
     return "asyncio"
 
 
+@pytest.fixture(autouse=True)
+def clear_signed_url_cache():
+    signed_url_cache.clear()
+    yield
+    signed_url_cache.clear()
+
+
 @pytest.fixture
 async def repository(tmp_path):
     repo = ChatRepository(tmp_path / "chat.db")
@@ -39,6 +60,7 @@ async def repository(tmp_path):
 async def test_attachment_service_uploads_to_gcs(monkeypatch) -> None:
     repository = MagicMock()
     repository.ensure_session = AsyncMock()
+    repository.find_attachment_by_content_hash = AsyncMock(return_value=None)
     repository.add_attachment = AsyncMock(
         return_value={
             "attachment_id": "abc123",
@@ -58,14 +80,17 @@ async def test_attachment_service_uploads_to_gcs(monkeypatch) -> None:
 
     uploaded: dict[str, object] = {}
 
-    def fake_upload_bytes(blob_name: str, data: bytes, *, content_type: str) -> None:
+    def fake_upload_filelike(
+        blob_name: str, file_like, *, content_type: str, size=None, chunk_size=None
+    ) -> None:
         uploaded["blob_name"] = blob_name
-        uploaded["data"] = data
+        uploaded["data"] = file_like.read()
         uploaded["content_type"] = content_type
+        uploaded["size"] = size
 
-    monkeypatch.setattr(attachments, "upload_bytes", fake_upload_bytes)
+    monkeypatch.setattr(gcs, "upload_filelike", fake_upload_filelike)
     monkeypatch.setattr(
-        attachments,
+        gcs,
         "sign_get_url",
         lambda name, expires_delta: "https://signed",
     )
@@ -79,6 +104,7 @@ async def test_attachment_service_uploads_to_gcs(monkeypatch) -> None:
         repository=repository,
         max_size_bytes=10 * 1024 * 1024,
         retention_days=7,
+        storage=GCSAttachmentStorage(),
     )
 
     upload = UploadFile(
@@ -107,12 +133,14 @@ async def test_attachment_service_uploads_to_gcs(monkeypatch) -> None:
     assert uploaded["blob_name"] == call_kwargs["storage_path"]
     assert uploaded["data"] == b"%PDF-1.4 sample content"
     assert uploaded["content_type"] == "application/pdf"
+    assert uploaded["size"] == len(b"%PDF-1.4 sample content")
 
 
 @pytest.mark.asyncio
 async def test_save_bytes_persists_attachment(monkeypatch) -> None:
     repository = MagicMock()
     repository.ensure_session = AsyncMock()
+    repository.find_attachment_by_content_hash = AsyncMock(return_value=None)
     repository.add_attachment = AsyncMock(
         return_value={
             "attachment_id": "xyz",
@@ -128,12 +156,12 @@ async def test_save_bytes_persists_attachment(monkeypatch) -> None:
     )
 
     monkeypatch.setattr(
-        attachments,
+        gcs,
         "upload_bytes",
         lambda blob_name, data, content_type: None,
     )
     monkeypatch.setattr(
-        attachments,
+        gcs,
         "sign_get_url",
         lambda name, expires_delta: "https://signed",
     )
@@ -143,6 +171,7 @@ async def test_save_bytes_persists_attachment(monkeypatch) -> None:
         repository=repository,
         max_size_bytes=1024,
         retention_days=7,
+        storage=GCSAttachmentStorage(),
     )
 
     result = await service.save_bytes(
@@ -160,6 +189,103 @@ async def test_save_bytes_persists_attachment(monkeypatch) -> None:
     assert call_kwargs["metadata"]["filename"] == "note.txt"
 
 
+@pytest.mark.anyio
+async def test_identical_content_reuses_blob_until_last_reference_expires(
+    repository: ChatRepository, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    uploads: list[str] = []
+    deleted: list[str] = []
+    monkeypatch.setattr(
+        gcs,
+        "upload_bytes",
+        lambda blob_name, data, content_type: uploads.append(blob_name),
+    )
+    monkeypatch.setattr(gcs, "delete_blob", deleted.append)
+    monkeypatch.setattr(gcs, "delete_blobs", deleted.extend)
+    monkeypatch.setattr(
+        gcs, "sign_get_url", lambda name, expires_delta: f"https://signed/{name}"
+    )
+    ids = iter(["img-1", "img-2"])
+    monkeypatch.setattr(attachments, "uuid4", lambda: SimpleNamespace(hex=next(ids)))
+    service = AttachmentService(
+        repository,
+        max_size_bytes=1024,
+        retention_days=7,
+        storage=GCSAttachmentStorage(),
+    )
+
+    first = await service.save_model_image_bytes(
+        session_id="session-123", data=b"same image", mime_type="image/png"
+    )
+    second = await service.save_bytes(
+        session_id="session-123",
+        data=b"same image",
+        mime_type="image/png",
+        filename_hint="copy.png",
+    )
+
+    assert len(uploads) == 1
+    assert second["attachment_id"] == "img-2"
+    assert second["gcs_blob"] == first["gcs_blob"]
+    assert second["content_hash"] == first["content_hash"]
+
+    later = datetime.now(timezone.utc) + timedelta(days=30)
+    async with repository._connection.execute(
+        "UPDATE attachments SET expires_at = ? WHERE attachment_id = 'img-1'",
+        ((later - timedelta(days=60)).isoformat(),),
+    ):
+        pass
+    await repository._connection.commit()
+
+    assert await cleanup_expired_attachments(repository) == 1
+    assert deleted == []
+    assert await cleanup_expired_attachments(repository, now=later) == 1
+    assert deleted == [first["gcs_blob"]]
+
+
+@pytest.mark.anyio
+async def test_user_upload_streams_in_chunks_and_sniffs_type(
+    repository: ChatRepository, local_storage: LocalAttachmentStorage, monkeypatch
+) -> None:
+    monkeypatch.setattr(attachments, "_UPLOAD_CHUNK_SIZE", 16)
+    service = AttachmentService(
+        repository, max_size_bytes=64, retention_days=7, storage=local_storage
+    )
+    png = b"\x89PNG\r\n\x1a\n" + b"pixels" * 4
+
+    record = await service.save_user_upload(
+        session_id="session-123",
+        upload=UploadFile(
+            filename="photo.bin",
+            file=io.BytesIO(png),
+            headers=Headers({"content-type": "application/octet-stream"}),
+        ),
+    )
+
+    assert record["mime_type"] == "image/png"
+    assert record["size_bytes"] == len(png)
+    assert local_storage.local_path(record["storage_path"]).read_bytes() == png
+
+    with pytest.raises(attachments.AttachmentTooLarge):
+        await service.save_user_upload(
+            session_id="session-123",
+            upload=UploadFile(
+                filename="big.png",
+                file=io.BytesIO(png * 4),
+                headers=Headers({"content-type": "image/png"}),
+            ),
+        )
+    with pytest.raises(attachments.UnsupportedAttachmentType):
+        await service.save_user_upload(
+            session_id="session-123",
+            upload=UploadFile(
+                filename="notes.txt",
+                file=io.BytesIO(b"plain text body"),
+                headers=Headers({"content-type": "text/plain"}),
+            ),
+        )
+
+
 # URL refresh tests
 
 
@@ -196,7 +322,7 @@ async def test_refresh_message_attachments_resigns_expired_url(
     assert conversation and isinstance(conversation[0].get("content"), list)
 
     monkeypatch.setattr(
-        attachment_urls,
+        gcs,
         "sign_get_url",
         lambda blob_name, expires_delta: "https://new.example/att-1",
     )
@@ -264,6 +390,83 @@ async def test_refresh_message_attachments_skips_when_valid(
     assert fragment["metadata"]["delivery_url"] == "https://valid.example/att-2"
 
 
+@pytest.mark.anyio
+async def test_refresh_message_attachments_serves_cached_records(
+    repository: ChatRepository, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = datetime.now(timezone.utc)
+    await repository.add_attachment(
+        attachment_id="att-cached",
+        session_id="session-123",
+        storage_path="session-123/att-cached__image.png",
+        mime_type="image/png",
+        size_bytes=64,
+        display_url="https://valid.example/att-cached",
+        delivery_url="https://valid.example/att-cached",
+        gcs_blob="session-123/att-cached__image.png",
+        signed_url="https://valid.example/att-cached",
+        signed_url_expires_at=now + timedelta(days=1),
+    )
+    message = {
+        "role": "user",
+        "content": [
+            {
+                "type": "image_url",
+                "image_url": {"url": "https://stale.example"},
+                "metadata": {"attachment_id": "att-cached"},
+            }
+        ],
+    }
+
+    await refresh_message_attachments([message], repository, ttl=timedelta(days=7))
+    assert len(signed_url_cache) == 1
+
+    lookups = AsyncMock(side_effect=AssertionError("database should not be read"))
+    monkeypatch.setattr(repository, "get_attachments_by_ids", lookups)
+    message["content"][0]["image_url"]["url"] = "https://stale.example"
+    await refresh_message_attachments([message], repository, ttl=timedelta(days=7))
+
+    assert message["content"][0]["image_url"]["url"] == "https://valid.example/att-cached"
+
+
+@pytest.mark.anyio
+async def test_background_refresh_resigns_urls_near_expiry(
+    repository: ChatRepository, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = datetime.now(timezone.utc)
+    expiries = {"soon": timedelta(minutes=10), "later": timedelta(days=3)}
+    for attachment_id, expires_in in expiries.items():
+        record = await repository.add_attachment(
+            attachment_id=attachment_id,
+            session_id="session-123",
+            storage_path=f"session-123/{attachment_id}__image.png",
+            mime_type="image/png",
+            size_bytes=64,
+            display_url=f"https://old.example/{attachment_id}",
+            delivery_url=f"https://old.example/{attachment_id}",
+            gcs_blob=f"session-123/{attachment_id}__image.png",
+            signed_url=f"https://old.example/{attachment_id}",
+            signed_url_expires_at=now + expires_in,
+        )
+        signed_url_cache.put(record)
+
+    monkeypatch.setattr(
+        gcs,
+        "sign_get_url",
+        lambda blob_name, expires_delta: f"https://new.example/{blob_name}",
+    )
+
+    refreshed = await refresh_expiring_signed_urls(repository, ttl=timedelta(days=7))
+
+    assert refreshed == 1
+    soon = await repository.get_attachment("soon")
+    later = await repository.get_attachment("later")
+    assert soon["signed_url"] == "https://new.example/session-123/soon__image.png"
+    assert later["signed_url"] == "https://old.example/later"
+    cached = signed_url_cache.get("soon", now=now)
+    assert cached["signed_url"] == soon["signed_url"]
+
+
 # Cleanup tests
 
 
@@ -302,14 +505,7 @@ async def test_cleanup_expired_attachments(
     )
 
     deleted_blobs: list[str] = []
-
-    def fake_delete(blob_name: str) -> None:
-        deleted_blobs.append(blob_name)
-
-    monkeypatch.setattr(
-        "backend.services.attachments_cleanup.delete_blob",
-        fake_delete,
-    )
+    monkeypatch.setattr(gcs, "delete_blobs", lambda names: deleted_blobs.extend(names))
 
     removed = await cleanup_expired_attachments(
         repository,
@@ -320,3 +516,465 @@ async def test_cleanup_expired_attachments(
     assert stale["gcs_blob"] in deleted_blobs
     assert await repository.get_attachment("expired-1") is None
     assert await repository.get_attachment("active-1") is not None
+
+
+@pytest.mark.anyio
+async def test_cleanup_pages_through_expired_attachments(
+    repository: ChatRepository, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = datetime.now(timezone.utc)
+    for index in range(5):
+        blob = f"session-123/bulk-{index}__file.png"
+        await repository.add_attachment(
+            attachment_id=f"bulk-{index}",
+            session_id="session-123",
+            storage_path=blob,
+            mime_type="image/png",
+            size_bytes=10,
+            display_url="https://example.com/bulk",
+            delivery_url="https://example.com/bulk",
+            gcs_blob=blob,
+            expires_at=now - timedelta(days=1),
+        )
+
+    batches: list[list[str]] = []
+    monkeypatch.setattr(gcs, "delete_blobs", lambda names: batches.append(names))
+    progress: list[int] = []
+
+    stats = await run_attachment_cleanup(
+        repository,
+        now=now,
+        page_size=2,
+        on_progress=lambda current: progress.append(current.records_deleted),
+    )
+
+    assert stats.pages == 3
+    assert stats.records_deleted == 5
+    assert stats.blobs_deleted == 5
+    assert stats.blob_failures == 0
+    assert progress == [2, 4, 5]
+    assert sorted(name for batch in batches for name in batch) == [
+        f"session-123/bulk-{index}__file.png" for index in range(5)
+    ]
+    assert await repository.find_expired_attachments(now=now) == []
+
+
+@pytest.mark.anyio
+async def test_refresh_message_attachments_signs_off_the_event_loop(
+    repository: ChatRepository, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import threading
+
+    now = datetime.now(timezone.utc)
+    content = []
+    for index in range(3):
+        attachment_id = f"att-bulk-{index}"
+        await repository.add_attachment(
+            attachment_id=attachment_id,
+            session_id="session-123",
+            storage_path=f"session-123/{attachment_id}__image.png",
+            mime_type="image/png",
+            size_bytes=64,
+            display_url="https://old.example",
+            delivery_url="https://old.example",
+            gcs_blob=f"session-123/{attachment_id}__image.png",
+            signed_url="https://old.example",
+            signed_url_expires_at=now - timedelta(minutes=5),
+        )
+        content.append(
+            {
+                "type": "image_url",
+                "image_url": {"url": "https://old.example"},
+                "metadata": {"attachment_id": attachment_id},
+            }
+        )
+    await repository.add_message("session-123", role="user", content=content)
+
+    signing_threads: list[str] = []
+
+    def fake_sign(blob_name: str, expires_delta: timedelta) -> str:
+        signing_threads.append(threading.current_thread().name)
+        return f"https://new.example/{blob_name}"
+
+    monkeypatch.setattr(gcs, "sign_get_url", fake_sign)
+
+    conversation = await repository.get_messages("session-123")
+    await refresh_message_attachments(conversation, repository, ttl=timedelta(days=7))
+
+    assert len(signing_threads) == 3
+    assert all(name.startswith("gcs-io") for name in signing_threads)
+    urls = [fragment["image_url"]["url"] for fragment in conversation[0]["content"]]
+    assert urls == [
+        f"https://new.example/session-123/att-bulk-{index}__image.png"
+        for index in range(3)
+    ]
+
+
+# Local storage backend tests
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    storage = LocalAttachmentStorage(tmp_path / "blobs")
+    set_attachment_storage(storage)
+    try:
+        yield storage
+    finally:
+        set_attachment_storage(None)
+
+
+@pytest.mark.anyio
+async def test_local_storage_shares_identical_content(
+    repository: ChatRepository, local_storage: LocalAttachmentStorage, monkeypatch
+) -> None:
+    ids = iter(["first", "second"])
+    monkeypatch.setattr(attachments, "uuid4", lambda: SimpleNamespace(hex=next(ids)))
+    service = AttachmentService(
+        repository, max_size_bytes=1024, retention_days=7, storage=local_storage
+    )
+
+    first = await service.save_bytes(
+        session_id="session-123",
+        data=b"\x89PNG same",
+        mime_type="image/png",
+        filename_hint="a.png",
+    )
+    second = await service.save_bytes(
+        session_id="session-123",
+        data=b"\x89PNG same",
+        mime_type="image/png",
+        filename_hint="b.png",
+    )
+
+    assert first["gcs_blob"] is None
+    assert first["storage_path"] == second["storage_path"]
+    digest = first["storage_path"].rsplit("/", 1)[-1]
+    assert first["storage_path"] == f"{digest[:2]}/{digest[2:4]}/{digest}"
+    assert first["signed_url"] == "/api/uploads/first/content"
+    path = local_storage.local_path(first["storage_path"])
+    assert path is not None and path.read_bytes() == b"\x89PNG same"
+
+    assert await service.delete("first")
+    assert path.exists()
+    assert await service.delete("second")
+    assert not path.exists()
+
+
+@pytest.mark.anyio
+async def test_inline_private_attachments_embeds_local_bytes(
+    repository: ChatRepository, local_storage: LocalAttachmentStorage
+) -> None:
+    from backend.services.attachment_urls import inline_private_attachments
+
+    service = AttachmentService(
+        repository, max_size_bytes=1024, retention_days=7, storage=local_storage
+    )
+    record = await service.save_bytes(
+        session_id="session-123",
+        data=b"img",
+        mime_type="image/png",
+        filename_hint="a.png",
+    )
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "image_url",
+                    "image_url": {"url": record["signed_url"]},
+                    "metadata": {"attachment_id": record["attachment_id"]},
+                }
+            ],
+        }
+    ]
+
+    await inline_private_attachments(messages, repository)
+
+    assert messages[0]["content"][0]["image_url"]["url"] == "data:image/png;base64,aW1n"
+
+
+@pytest.mark.anyio
+async def test_inline_private_attachments_reuses_cache_across_hops(
+    repository: ChatRepository, local_storage: LocalAttachmentStorage, monkeypatch
+) -> None:
+    from backend.services.attachment_urls import inline_private_attachments
+
+    service = AttachmentService(
+        repository, max_size_bytes=1024, retention_days=7, storage=local_storage
+    )
+    record = await service.save_bytes(
+        session_id="session-123",
+        data=b"img",
+        mime_type="image/png",
+        filename_hint="a.png",
+    )
+    reads: list[str] = []
+    original_read = local_storage.read
+
+    async def counting_read(key: str) -> bytes:
+        reads.append(key)
+        return await original_read(key)
+
+    monkeypatch.setattr(local_storage, "read", counting_read)
+    cache: dict[str, str | None] = {}
+    for _ in range(3):
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": record["signed_url"]},
+                        "metadata": {"attachment_id": record["attachment_id"]},
+                    }
+                ],
+            }
+        ]
+        await inline_private_attachments(messages, repository, cache=cache)
+        assert (
+            messages[0]["content"][0]["image_url"]["url"]
+            == "data:image/png;base64,aW1n"
+        )
+
+    assert reads == [record["storage_path"]]
+
+
+@pytest.mark.anyio
+async def test_inline_private_attachments_after_switching_to_gcs(
+    repository: ChatRepository, local_storage: LocalAttachmentStorage
+) -> None:
+    from backend.services.attachment_urls import inline_private_attachments
+
+    service = AttachmentService(
+        repository, max_size_bytes=1024, retention_days=7, storage=local_storage
+    )
+    record = await service.save_bytes(
+        session_id="session-123",
+        data=b"img",
+        mime_type="image/png",
+        filename_hint="a.png",
+    )
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "image_url",
+                    "image_url": {"url": record["signed_url"]},
+                    "metadata": {"attachment_id": record["attachment_id"]},
+                }
+            ],
+        }
+    ]
+
+    set_attachment_storage(GCSAttachmentStorage())
+    set_local_storage(local_storage)
+    try:
+        await inline_private_attachments(messages, repository)
+    finally:
+        set_local_storage(None)
+
+    assert messages[0]["content"][0]["image_url"]["url"] == "data:image/png;base64,aW1n"
+
+
+@pytest.mark.anyio
+async def test_download_endpoint_serves_local_content_with_ranges(
+    repository: ChatRepository, local_storage: LocalAttachmentStorage
+) -> None:
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.routers.uploads import router
+
+    service = AttachmentService(
+        repository, max_size_bytes=1024, retention_days=7, storage=local_storage
+    )
+    record = await service.save_bytes(
+        session_id="session-123",
+        data=b"0123456789",
+        mime_type="image/png",
+        filename_hint="digits.png",
+    )
+
+    app = FastAPI()
+    app.include_router(router)
+    app.state.attachment_service = service
+    client = TestClient(app)
+
+    url = f"/api/uploads/{record['attachment_id']}/content"
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == b"0123456789"
+    assert response.headers["content-type"] == "image/png"
+
+    partial = client.get(url, headers={"Range": "bytes=2-4"})
+    assert partial.status_code == 206
+    assert partial.content == b"234"
+
+    assert client.get("/api/uploads/missing/content").status_code == 404
+
+
+@pytest.mark.anyio
+async def test_local_records_resolve_after_switching_back_to_gcs(
+    repository: ChatRepository, local_storage: LocalAttachmentStorage
+) -> None:
+    service = AttachmentService(
+        repository, max_size_bytes=1024, retention_days=7, storage=local_storage
+    )
+    record = await service.save_bytes(
+        session_id="session-123",
+        data=b"local bytes",
+        mime_type="image/png",
+        filename_hint="a.png",
+    )
+
+    set_attachment_storage(GCSAttachmentStorage())
+    set_local_storage(local_storage)
+    try:
+        located = storage_for_record(record)
+        assert located == (local_storage, record["storage_path"])
+        legacy = storage_for_record({"storage_path": "session-123/att__a.png"})
+        assert legacy is not None and legacy[0].kind == "gcs"
+
+        path = local_storage.local_path(record["storage_path"])
+        assert await service.delete(record["attachment_id"])
+        assert path is not None and not path.exists()
+    finally:
+        set_local_storage(None)
+
+
+@pytest.mark.anyio
+async def test_image_variants_are_rendered_and_selected_per_consumer(
+    repository: ChatRepository, local_storage: LocalAttachmentStorage, monkeypatch
+) -> None:
+    image_module = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    image_module.effect_noise((2000, 1000), 64).convert("RGB").save(
+        buffer, format="PNG"
+    )
+    png = buffer.getvalue()
+
+    service = AttachmentService(
+        repository,
+        max_size_bytes=len(png) + 1,
+        retention_days=7,
+        storage=local_storage,
+    )
+    record = await service.save_bytes(
+        session_id="session-123",
+        data=png,
+        mime_type="image/png",
+        filename_hint="photo.png",
+    )
+    await service.wait_for_variants()
+
+    stored = await repository.get_attachment(record["attachment_id"])
+    variants = stored["metadata"]["variants"]
+    assert set(variants) == {"model", "display", "thumbnail"}
+    thumbnail = await repository.get_attachment(variants["thumbnail"])
+    assert thumbnail["mime_type"] == "image/webp"
+    assert thumbnail["metadata"]["width"] == 256
+    assert thumbnail["metadata"]["derivative_of"] == record["attachment_id"]
+
+    def message() -> dict:
+        return {
+            "role": "user",
+            "content": [
+                {
+                    "type": "image_url",
+                    "image_url": {"url": record["signed_url"]},
+                    "metadata": {"attachment_id": record["attachment_id"]},
+                }
+            ],
+        }
+
+    for_model = message()
+    await refresh_message_attachments(
+        [for_model], repository, ttl=timedelta(days=7), variant="model"
+    )
+    fragment = for_model["content"][0]
+    assert fragment["image_url"]["url"].endswith(f"/{variants['model']}/content")
+    assert fragment["metadata"]["variant_attachment_id"] == variants["model"]
+    assert fragment["metadata"]["display_url"].endswith(
+        f"/{variants['display']}/content"
+    )
+    assert fragment["metadata"]["delivery_url"] == record["signed_url"]
+
+    # An identical image reuses the cached variants instead of re-rendering.
+    async def no_render(data, mime_type):
+        raise AssertionError("variants should be copied, not rendered")
+
+    monkeypatch.setattr(attachments, "generate_variants", no_render)
+    duplicate = await service.save_bytes(
+        session_id="session-123",
+        data=png,
+        mime_type="image/png",
+        filename_hint="again.png",
+    )
+    await service.wait_for_variants()
+    copied = (await repository.get_attachment(duplicate["attachment_id"]))["metadata"]
+    assert set(copied["variants"]) == {"model", "display", "thumbnail"}
+
+    assert await service.delete(record["attachment_id"])
+    assert await repository.get_attachment(variants["model"]) is None
+
+
+@pytest.mark.anyio
+async def test_variant_copy_falls_back_to_rendering_when_a_donor_is_gone(
+    repository: ChatRepository, local_storage: LocalAttachmentStorage, monkeypatch
+) -> None:
+    image_module = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    image_module.effect_noise((2000, 1000), 64).convert("RGB").save(
+        buffer, format="PNG"
+    )
+    png = buffer.getvalue()
+    service = AttachmentService(
+        repository, max_size_bytes=len(png) + 1, retention_days=7, storage=local_storage
+    )
+    record = await service.save_bytes(
+        session_id="session-123",
+        data=png,
+        mime_type="image/png",
+        filename_hint="photo.png",
+    )
+    await service.wait_for_variants()
+    variants = (await repository.get_attachment(record["attachment_id"]))["metadata"][
+        "variants"
+    ]
+    thumbnail = await repository.get_attachment(variants["thumbnail"])
+
+    # The thumbnail's stored object is no longer shareable (e.g. about to expire).
+    find = repository.find_attachment_by_content_hash
+
+    async def find_without_thumbnail(content_hash, **kwargs):
+        if content_hash == thumbnail["content_hash"]:
+            return None
+        return await find(content_hash, **kwargs)
+
+    monkeypatch.setattr(
+        repository, "find_attachment_by_content_hash", find_without_thumbnail
+    )
+    rendered = []
+    generate = attachments.generate_variants
+
+    async def tracking_generate(data, mime_type):
+        rendered.append(mime_type)
+        return await generate(data, mime_type)
+
+    monkeypatch.setattr(attachments, "generate_variants", tracking_generate)
+
+    duplicate = await service.save_bytes(
+        session_id="session-123",
+        data=png,
+        mime_type="image/png",
+        filename_hint="again.png",
+    )
+    await service.wait_for_variants()
+
+    assert rendered == ["image/png"]
+    copied = (await repository.get_attachment(duplicate["attachment_id"]))["metadata"]
+    assert set(copied["variants"]) == {"model", "display", "thumbnail"}
+    for variant_id in copied["variants"].values():
+        assert variant_id.startswith(f"{duplicate['attachment_id']}-")
+        assert await repository.get_attachment(variant_id) is not None
@@ -0,0 +1,84 @@
+"""Tests for the streaming PCM to Opus transcoding stage."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import backend.services.audio_encoder as audio_encoder
+from backend.schemas.client_settings import TtsSettings
+from backend.services.audio_encoder import (
+    OpusStreamEncoder,
+    negotiate_delivery_encoding,
+    transcode_audio_queue,
+)
+
+
+class _FakeOpusEncoder:
+    def __init__(self, sample_rate, channels, application):
+        self.sample_rate = sample_rate
+        self.bitrate = None
+        self.frames: list[bytes] = []
+
+    def encode(self, pcm: bytes, frame_size: int) -> bytes:
+        assert len(pcm) == frame_size * 2
+        self.frames.append(pcm)
+        return b"\x01\x02\x03"
+
+
+@pytest.fixture
+def fake_opus(monkeypatch):
+    module = SimpleNamespace(Encoder=_FakeOpusEncoder, APPLICATION_VOIP="voip")
+    monkeypatch.setattr(audio_encoder, "opuslib", module)
+    return module
+
+
+def test_negotiation_requires_setting_client_and_pcm(fake_opus) -> None:
+    enabled = TtsSettings(transcode_to_opus=True)
+    assert negotiate_delivery_encoding(enabled, ["opus", "pcm"]) == "opus"
+    assert negotiate_delivery_encoding(enabled, ["pcm"]) == "pcm"
+    assert negotiate_delivery_encoding(enabled, None) == "pcm"
+    assert negotiate_delivery_encoding(TtsSettings(), ["opus"]) == "pcm"
+    mp3 = TtsSettings(transcode_to_opus=True, response_format="mp3")
+    assert negotiate_delivery_encoding(mp3, ["opus"]) == "mp3"
+
+
+def test_negotiation_falls_back_without_codec(monkeypatch) -> None:
+    monkeypatch.setattr(audio_encoder, "opuslib", None)
+    settings = TtsSettings(transcode_to_opus=True)
+    assert negotiate_delivery_encoding(settings, ["opus"]) == "pcm"
+
+
+def test_encoder_buffers_partial_frames_and_pads_on_flush(fake_opus) -> None:
+    encoder = OpusStreamEncoder(24000, 24000)
+    frame_bytes = encoder.frame_samples * 2
+    assert encoder.frame_samples == 480
+
+    assert encoder.encode(b"\x00" * (frame_bytes - 10)) == b""
+    encoded = encoder.encode(b"\x00" * 20)
+    assert encoded == b"\x00\x03\x01\x02\x03"
+
+    tail = encoder.flush()
+    assert tail == b"\x00\x03\x01\x02\x03"
+    assert len(encoder._encoder.frames) == 2
+    assert encoder.bytes_in == frame_bytes + 10
+
+
+@pytest.mark.asyncio
+async def test_transcode_audio_queue_forwards_end_of_stream(fake_opus) -> None:
+    source: asyncio.Queue = asyncio.Queue()
+    sink: asyncio.Queue = asyncio.Queue()
+    encoder = OpusStreamEncoder(24000, 24000)
+
+    await source.put(b"\x00" * 960 * 2)
+    await source.put(b"\x00" * 100)
+    await source.put(None)
+    await transcode_audio_queue(source, sink, encoder)
+
+    chunks = []
+    while not sink.empty():
+        chunks.append(sink.get_nowait())
+    assert chunks[-1] is None
+    assert b"".join(chunks[:-1]) == b"\x00\x03\x01\x02\x03" * 3
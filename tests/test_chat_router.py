@@ -7,7 +7,9 @@ import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
+from backend.routers import chat as chat_router
 from backend.routers.chat import (
+    _ModelCatalogIndex,
     _invalidate_models_cache,
     get_openrouter_client,
     router,
@@ -298,3 +300,106 @@ def test_models_endpoint_applies_advanced_filters() -> None:
     body = response.json()
     ids = [item["id"] for item in body["data"]]
     assert ids == ["model-a"]
+
+
+def test_models_index_combines_search_filters_and_is_reused() -> None:
+    payload = {
+        "data": [
+            {
+                "id": "vendor/alpha",
+                "description": "Mathematics specialist",
+                "pricing": {"prompt": 0.001},
+                "capabilities": {"tools": True},
+            },
+            {
+                "id": "vendor/beta",
+                "description": "Math tutor",
+                "pricing": {"prompt": 0.01},
+            },
+            {"id": "vendor/gamma", "description": "Poetry"},
+        ]
+    }
+
+    client = make_client(payload)
+    params = {
+        "search": "math",
+        "filters": json.dumps({"pricing.prompt": {"max": 0.005}}),
+    }
+
+    first = client.get("/api/models", params=params)
+    second = client.get("/api/models", params=params)
+
+    assert [item["id"] for item in first.json()["data"]] == ["vendor/alpha"]
+    assert second.json() == first.json()
+    partial = client.get("/api/models", params={"search": "vendor mat"})
+    assert [item["id"] for item in partial.json()["data"]] == [
+        "vendor/alpha",
+        "vendor/beta",
+    ]
+    tools = client.get("/api/models", params={"tools_only": "true", "search": "math"})
+    assert [item["id"] for item in tools.json()["data"]] == ["vendor/alpha"]
+    assert tools.json()["metadata"]["base_count"] == 1
+
+
+def test_models_index_bounds_filter_path_memo(monkeypatch) -> None:
+    monkeypatch.setattr(chat_router, "_MODELS_FILTER_PATH_MEMO_SIZE", 2)
+    index = _ModelCatalogIndex(
+        {"data": [{"id": "vendor/alpha", "pricing": {"prompt": 0.001}}]}
+    )
+
+    for path in ("pricing.prompt", "id", "unknown.a", "unknown.b", "id"):
+        index.query(tools_only=False, search=None, filters={path: "x"})
+
+    assert list(index._path_values) == ["unknown.b", "id"]
+
+
+@pytest.mark.asyncio
+async def test_models_response_memo_is_bounded_by_bytes(monkeypatch) -> None:
+    index = _ModelCatalogIndex(
+        {"data": [{"id": f"vendor/model-{n}", "name": "x" * 200} for n in range(5)]}
+    )
+    first = await index.response(tools_only=False, search=None, filters={})
+    second = await index.response(tools_only=True, search=None, filters={})
+    assert list(index._responses.values()) == [first, second]
+
+    monkeypatch.setattr(
+        chat_router, "_MODELS_RESPONSE_MEMO_BYTES", first.nbytes + second.nbytes
+    )
+    third = await index.response(tools_only=False, search="model-1", filters={})
+    assert list(index._responses.values()) == [second, third]
+    assert await index.response(tools_only=False, search="model-1", filters={}) is (
+        third
+    )
+
+
+def test_models_endpoint_compresses_and_revalidates_with_etag() -> None:
+    payload = {
+        "data": [
+            {"id": f"vendor/model-{index}", "description": "General purpose " * 8}
+            for index in range(20)
+        ]
+    }
+
+    client = make_client(payload)
+    first = client.get("/api/models", headers={"Accept-Encoding": "gzip"})
+
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert len(first.json()["data"]) == 20
+    etag = first.headers["etag"]
+
+    cached = client.get("/api/models", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    other_query = client.get(
+        "/api/models", params={"search": "model-1"}, headers={"If-None-Match": etag}
+    )
+    assert other_query.status_code == 200
+    assert other_query.headers["etag"] != etag
+
+    metadata = client.get("/api/models/metadata")
+    revalidated = client.get(
+        "/api/models/metadata", headers={"If-None-Match": metadata.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
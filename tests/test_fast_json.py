@@ -0,0 +1,79 @@
+import json
+from dataclasses import dataclass
+
+import pytest
+
+from backend.utils import fast_json
+
+VALUES = [
+    {"choices": [{"delta": {"content": "héllo ✓"}, "index": 0}]},
+    {"usage": {"prompt_tokens": 10, "cost": 0.00012}, "flags": [True, None]},
+    [1, 2.5, "three", {"nested": {"deep": []}}],
+    "plain",
+    2**70,
+]
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_dumps_matches_compact_stdlib_output(value):
+    expected = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    assert fast_json.dumps(value) == expected
+    assert fast_json.dumps_bytes(value) == expected.encode("utf-8")
+    assert fast_json.loads(expected) == value
+    assert fast_json.loads(expected.encode("utf-8")) == value
+
+
+def test_dumps_coerces_keys_and_honours_options():
+    assert fast_json.dumps({1: "a", "b": 2}) == '{"1":"a","b":2}'
+    assert fast_json.dumps({"b": 1, "a": 2}, sort_keys=True) == '{"a":2,"b":1}'
+
+    @dataclass
+    class Point:
+        x: int
+
+    with pytest.raises(TypeError):
+        fast_json.dumps(Point(1))
+    assert fast_json.dumps(Point(1), default=lambda point: point.x) == "1"
+
+
+def test_loads_keeps_stdlib_errors_and_literals():
+    assert fast_json.loads(memoryview(b'{"a":1}')) == {"a": 1}
+    assert fast_json.loads("[NaN]")[0] != fast_json.loads("[NaN]")[0]
+    with pytest.raises(json.JSONDecodeError):
+        fast_json.loads("{broken")
+    with pytest.raises(TypeError):
+        fast_json.loads(None)
+
+
+def test_fast_json_response_renders_compact_json():
+    response = fast_json.FastJSONResponse({"text": "héllo"})
+    assert response.body == '{"text":"héllo"}'.encode("utf-8")
+
+
+def test_lone_surrogates_are_escaped():
+    value = {"content": "broken \ud83d emoji", "text": "héllo"}
+
+    text = fast_json.dumps(value)
+    assert text == json.dumps(value, separators=(",", ":"))
+    assert fast_json.dumps_bytes(value) == text.encode("ascii")
+    assert fast_json.loads(text) == value
+
+
+def test_fast_json_response_never_writes_nan_literals():
+    if fast_json.JSON_BACKEND == "orjson":
+        response = fast_json.FastJSONResponse({"value": float("nan")})
+        assert response.body == b'{"value":null}'
+    else:
+        with pytest.raises(ValueError):
+            fast_json.FastJSONResponse({"value": float("nan")})
+
+
+def test_orjson_backend_matches_stdlib_output():
+    orjson = pytest.importorskip("orjson")
+
+    assert fast_json.JSON_BACKEND == "orjson"
+    for value in VALUES:
+        expected = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        assert fast_json.dumps(value) == expected
+    assert fast_json.dumps_bytes({"a": 1}) == orjson.dumps({"a": 1})
+    assert fast_json.loads(fast_json.dumps("\ud83d")) == "\ud83d"
@@ -0,0 +1,71 @@
+import asyncio
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.utils import http_cache
+from backend.utils.http_cache import (
+    EncodedJSON,
+    etag_matches,
+    json_response,
+    negotiate_encoding,
+)
+
+CONTENT = {"items": ["value"] * 500, "text": "héllo"}
+
+
+def test_negotiate_encoding_respects_quality_values():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, deflate") == "identity"
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding(None) == "identity"
+
+
+def test_etag_matching_ignores_weak_prefix_and_coding_suffix():
+    encoded = EncodedJSON(CONTENT)
+    gzip_tag = f'{encoded.etag[:-1]}-gzip"'
+
+    assert etag_matches(f'"other", W/{gzip_tag}', encoded.etag)
+    assert etag_matches("*", encoded.etag)
+    assert not etag_matches('"other"', encoded.etag)
+    assert gzip.decompress(encoded.body("gzip")) == encoded.body("identity")
+
+
+def test_json_response_compresses_and_answers_not_modified():
+    app = FastAPI()
+
+    @app.get("/data")
+    async def data(request: Request):
+        return await json_response(request, CONTENT)
+
+    client = TestClient(app)
+    first = client.get("/data", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert first.json() == CONTENT
+
+    second = client.get("/data", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 304
+    assert second.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_large_bodies_are_compressed_off_the_event_loop(monkeypatch):
+    offloaded = []
+    to_thread = asyncio.to_thread
+
+    async def recording_to_thread(func, *args, **kwargs):
+        offloaded.append(func)
+        return await to_thread(func, *args, **kwargs)
+
+    monkeypatch.setattr(http_cache.asyncio, "to_thread", recording_to_thread)
+    monkeypatch.setattr(http_cache, "_OFFLOAD_BYTES", 1024)
+
+    encoded = await EncodedJSON.encode(CONTENT)
+    assert offloaded == [EncodedJSON]
+    body = await encoded.body_async("gzip")
+    assert offloaded == [EncodedJSON, http_cache._compress]
+    assert gzip.decompress(body) == encoded.body("identity")
+    assert encoded.nbytes == len(encoded) + len(body)
@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+
+from backend.openrouter import ModelCatalogResponse, OpenRouterError
+from backend.services.model_registry import ModelRegistry
+
+CATALOG = {
+    "data": [
+        {
+            "id": "tools/model",
+            "supported_parameters": ["tools", "temperature"],
+            "context_length": 128000,
+        },
+        {"id": "plain/model", "supported_parameters": ["temperature"]},
+    ]
+}
+
+
+class CountingClient:
+    def __init__(self, payload=CATALOG, *, fail: bool = False) -> None:
+        self.payload = payload
+        self.fail = fail
+        self.calls = 0
+
+    async def list_models(self, *, params=None):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise OpenRouterError(503, "unavailable")
+        return self.payload
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_fetch():
+    registry = ModelRegistry()
+    client = CountingClient()
+
+    results = await asyncio.gather(
+        registry.get_capabilities("tools/model", client=client),
+        registry.get_capabilities("plain/model", client=client),
+        registry.get_catalog(client),
+    )
+
+    assert client.calls == 1
+    tools, plain, catalog = results
+    assert tools.supports_tools is True
+    assert tools.context_length == 128000
+    assert plain.supports_tools is False
+    assert catalog is CATALOG
+
+
+@pytest.mark.asyncio
+async def test_unknown_model_and_missing_catalog():
+    registry = ModelRegistry()
+
+    assert await registry.get_capabilities("tools/model") is None
+
+    await registry.get_catalog(CountingClient())
+    unknown = await registry.get_capabilities("missing/model")
+    assert unknown.supports_tools is None
+    assert unknown.supported_parameters == frozenset()
+
+
+@pytest.mark.asyncio
+async def test_expired_catalog_is_served_while_revalidating():
+    registry = ModelRegistry(ttl_seconds=0)
+    client = CountingClient()
+    await registry.get_catalog(client)
+
+    client.payload = {"data": []}
+    assert await registry.get_catalog(client) is CATALOG
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert client.calls == 2
+    assert registry.payload == {"data": []}
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_stale_catalog():
+    registry = ModelRegistry(ttl_seconds=0)
+    client = CountingClient()
+    await registry.get_catalog(client)
+
+    client.fail = True
+    with pytest.raises(OpenRouterError):
+        await registry.refresh(client)
+    capability = await registry.get_capabilities("tools/model", client=client)
+    assert capability is not None and capability.supports_tools is True
+
+    registry.invalidate()
+    assert await registry.get_capabilities("tools/model", client=client) is None
+
+
+class ConditionalClient(CountingClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.etags = []
+
+    async def fetch_model_catalog(self, *, etag=None):
+        self.calls += 1
+        self.etags.append(etag)
+        if etag == '"v1"':
+            return ModelCatalogResponse(None, etag)
+        return ModelCatalogResponse(self.payload, '"v1"')
+
+
+@pytest.mark.asyncio
+async def test_snapshot_serves_cold_start_and_revalidates_with_etag(tmp_path):
+    cache_path = tmp_path / "model_catalog.json"
+    first = ModelRegistry(cache_path=cache_path)
+    await first.refresh(ConditionalClient())
+    assert cache_path.exists()
+
+    registry = ModelRegistry(cache_path=cache_path)
+    client = ConditionalClient()
+    catalog = await registry.get_catalog(client)
+    assert catalog == CATALOG
+    assert not registry.is_fresh()
+
+    await registry.refresh(client)
+    assert client.etags[-1] == '"v1"'
+    assert registry.payload is catalog
+    assert registry.is_fresh()
+
+
+@pytest.mark.asyncio
+async def test_not_modified_after_invalidate_refetches_in_full():
+    registry = ModelRegistry()
+    client = ConditionalClient()
+    await registry.refresh(client)
+
+    original_fetch = client.fetch_model_catalog
+
+    async def fetch_then_invalidate(*, etag=None):
+        response = await original_fetch(etag=etag)
+        registry.invalidate()
+        client.fetch_model_catalog = original_fetch
+        return response
+
+    client.fetch_model_catalog = fetch_then_invalidate
+
+    assert await registry.refresh(client) == CATALOG
+    assert client.etags == [None, '"v1"', None]
+    assert registry.payload == CATALOG
+    capability = await registry.get_capabilities("tools/model")
+    assert capability is not None and capability.supports_tools is True
+
+
+@pytest.mark.asyncio
+async def test_background_refresh_warms_catalog():
+    registry = ModelRegistry()
+    client = CountingClient()
+
+    registry.start_background_refresh(client, interval_seconds=60)
+    for _ in range(10):
+        if registry.payload is not None:
+            break
+        await asyncio.sleep(0)
+    await registry.stop_background_refresh()
+
+    assert registry.payload is CATALOG
+    assert client.calls == 1
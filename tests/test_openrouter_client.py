@@ -41,3 +41,36 @@ def test_parse_event_supports_multiple_data_lines(
         "data": "part one\npart two",
         "id": "test-id",
     }
+
+
+@pytest.mark.asyncio
+async def test_fetch_model_catalog_revalidates_with_etag(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    import httpx
+
+    seen: list[str | None] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, json={"data": []}, headers={"ETag": '"v1"'})
+
+    client = make_client()
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def get_http_client() -> httpx.AsyncClient:
+        return http_client
+
+    monkeypatch.setattr(client, "_get_http_client", get_http_client)
+
+    first = await client.fetch_model_catalog()
+    second = await client.fetch_model_catalog(etag=first.etag)
+    await http_client.aclose()
+
+    assert first.payload == {"data": []}
+    assert first.etag == '"v1"'
+    assert second.payload is None
+    assert second.etag == '"v1"'
+    assert seen == [None, '"v1"']
@@ -0,0 +1,44 @@
+import pytest
+
+from backend.utils.payload_codec import (
+    FORMAT_JSON,
+    FORMAT_ZSTD,
+    PayloadCodec,
+    decode_payload,
+    format_available,
+)
+
+VALUE = {"usage": {"prompt_tokens": 10}, "routing": ["a", "b"], "text": "héllo"}
+
+
+def test_json_roundtrip():
+    encoded = PayloadCodec(FORMAT_JSON).encode(VALUE)
+    assert isinstance(encoded, bytes)
+    assert decode_payload(encoded) == VALUE
+
+
+def test_decode_accepts_plain_json_text():
+    assert decode_payload('{"a": 1}') == {"a": 1}
+    assert decode_payload(None) is None
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        PayloadCodec("xml")
+    with pytest.raises(ValueError):
+        decode_payload(b"\x7f{}")
+
+
+def test_unavailable_format_falls_back_to_json(monkeypatch):
+    import backend.utils.payload_codec as payload_codec
+
+    monkeypatch.setattr(payload_codec, "zstandard", None)
+    codec = PayloadCodec(FORMAT_ZSTD)
+    assert codec.storage_format == FORMAT_JSON
+    assert decode_payload(codec.encode(VALUE)) == VALUE
+
+
+@pytest.mark.skipif(not format_available(FORMAT_ZSTD), reason="zstandard missing")
+def test_zstd_roundtrip():
+    encoded = PayloadCodec(FORMAT_ZSTD).encode(VALUE)
+    assert decode_payload(encoded) == VALUE
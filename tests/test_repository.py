@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import sqlite3
 from datetime import datetime, timedelta, timezone
 
 import pytest
@@ -157,6 +159,44 @@ async def test_update_latest_system_message_resets_structured_flag(repository):
     assert messages[0]["content"] == "Updated"
 
 
+@pytest.mark.anyio
+async def test_get_messages_pages_backwards_from_tail(repository):
+    for index in range(5):
+        await repository.add_message("session-1", role="user", content=f"m{index}")
+
+    tail = await repository.get_messages("session-1", limit=2)
+    assert [message["content"] for message in tail] == ["m3", "m4"]
+
+    older = await repository.get_messages(
+        "session-1", limit=2, before_id=tail[0]["message_id"]
+    )
+    assert [message["content"] for message in older] == ["m1", "m2"]
+
+    rest = await repository.get_messages(
+        "session-1", limit=2, before_id=older[0]["message_id"]
+    )
+    assert [message["content"] for message in rest] == ["m0"]
+
+
+@pytest.mark.anyio
+async def test_get_messages_truncates_tool_results(repository):
+    await repository.add_message("session-1", role="user", content="x" * 50)
+    await repository.add_message(
+        "session-1", role="tool", content="y" * 50, tool_call_id="call-1"
+    )
+
+    user, tool = await repository.get_messages("session-1", tool_result_max_chars=10)
+    assert user["content"] == "x" * 50
+    assert "content_truncated" not in user
+    assert tool["content"] == "y" * 10
+    assert tool["content_truncated"] is True
+    assert tool["content_length"] == 50
+
+    full = await repository.get_message("session-1", tool["message_id"])
+    assert full["content"] == "y" * 50
+    assert "content_truncated" not in full
+
+
 # ─── Conversation persistence tests ───
 
 
@@ -277,6 +317,110 @@ async def test_list_conversations_pagination(repository):
     assert page1[0]["session_id"] != page2[0]["session_id"]
 
 
+@pytest.mark.anyio
+async def test_list_conversations_keyset_cursor(repository):
+    for i in range(5):
+        sid = f"session-page-{i}"
+        await repository.ensure_session(sid)
+        await repository.add_message(sid, role="user", content=f"Message {i}")
+        await repository.save_session(sid)
+
+    seen: list[str] = []
+    cursor = None
+    while True:
+        page = await repository.list_saved_conversations(limit=2, cursor=cursor)
+        seen.extend(item["session_id"] for item in page)
+        if len(page) < 2:
+            break
+        cursor = page[-1]["cursor"]
+
+    assert sorted(seen) == [f"session-page-{i}" for i in range(5)]
+    assert len(set(seen)) == 5
+
+
+@pytest.mark.anyio
+async def test_conversation_summary_maintained_on_write(repository):
+    await repository.add_message(
+        "session-1", role="assistant", content="Welcome", client_message_id="a0"
+    )
+    await repository.add_message(
+        "session-1", role="user", content="First question", client_message_id="u1"
+    )
+    await repository.add_message(
+        "session-1", role="user", content="Second question", client_message_id="u2"
+    )
+    await repository.save_session("session-1")
+
+    [summary] = await repository.list_saved_conversations()
+    assert summary["message_count"] == 3
+    assert summary["preview"] == "First question"
+
+    await repository.delete_message("session-1", "u1")
+    [summary] = await repository.list_saved_conversations()
+    assert summary["message_count"] == 2
+    assert summary["preview"] == "Second question"
+
+
+@pytest.mark.anyio
+async def test_concurrent_writes_keep_summary_and_index_consistent(repository):
+    await repository.save_session("session-1")
+    for index in range(10):
+        await repository.add_message(
+            "session-1",
+            role="user",
+            content=f"question {index}",
+            client_message_id=f"u{index}",
+        )
+
+    await asyncio.gather(
+        *(
+            repository.add_message(
+                "session-1",
+                role="assistant" if index % 2 else "user",
+                content=f"reply {index}",
+                client_message_id=f"r{index}",
+                parent_client_message_id=f"u{index % 10}",
+            )
+            for index in range(30)
+        ),
+        *(repository.delete_message("session-1", f"u{index}") for index in range(5)),
+    )
+
+    async with repository._readers.acquire() as reader:
+        cursor = await reader.execute(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM messages WHERE session_id = ?),
+                (SELECT COUNT(*) FROM messages_fts WHERE session_id = ?),
+                (SELECT COUNT(*) FROM messages_fts
+                 WHERE rowid NOT IN (SELECT id FROM messages)),
+                (SELECT content FROM messages
+                 WHERE session_id = ? AND role = 'user' ORDER BY id LIMIT 1)
+            """,
+            ("session-1", "session-1", "session-1"),
+        )
+        message_rows, index_rows, orphaned, first_user = await cursor.fetchone()
+        await cursor.close()
+
+    [summary] = await repository.list_saved_conversations()
+    assert summary["message_count"] == message_rows
+    assert summary["preview"] == first_user
+    assert index_rows == message_rows
+    assert orphaned == 0
+
+
+@pytest.mark.anyio
+async def test_search_without_fts_matches_full_first_message(repository):
+    repository._search_enabled = False
+    long_message = "x" * 300 + " needle"
+    await repository.add_message("session-1", role="user", content=long_message)
+    await repository.save_session("session-1")
+
+    [summary] = await repository.list_saved_conversations(search="needle")
+    assert summary["session_id"] == "session-1"
+    assert "needle" not in summary["preview"]
+
+
 @pytest.mark.anyio
 async def test_unsaved_sessions_not_in_list(repository):
     await repository.add_message("session-1", role="user", content="Hello")
@@ -329,3 +473,141 @@ async def test_search_conversations_empty_returns_all(repository):
 
     results = await repository.list_saved_conversations(search=None)
     assert len(results) == 2
+
+
+@pytest.mark.anyio
+async def test_search_matches_assistant_replies_with_snippet(repository):
+    await repository.add_message("session-1", role="user", content="Hi there")
+    await repository.add_message(
+        "session-1",
+        role="assistant",
+        content=[{"type": "text", "text": "Sourdough needs a lively starter"}],
+    )
+    await repository.save_session("session-1")
+    await repository.ensure_session("session-2")
+    await repository.add_message("session-2", role="user", content="Weather today?")
+    await repository.save_session("session-2")
+
+    results = await repository.list_saved_conversations(search="sourdo")
+
+    assert [result["session_id"] for result in results] == ["session-1"]
+    assert results[0]["snippet"] == "**Sourdough** needs a lively starter"
+    assert results[0]["match_message_id"] is not None
+
+
+@pytest.mark.anyio
+async def test_search_index_follows_deleted_messages(repository):
+    await repository.add_message(
+        "session-1", role="user", content="ephemeral", client_message_id="m1"
+    )
+    await repository.save_session("session-1", title="Notes")
+    assert await repository.search_conversations("ephemeral")
+
+    await repository.delete_message("session-1", "m1")
+    assert await repository.search_conversations("ephemeral") == []
+
+
+@pytest.mark.anyio
+async def test_search_index_is_backfilled_for_existing_messages(tmp_path):
+    path = tmp_path / "legacy.db"
+    repo = ChatRepository(path)
+    await repo.initialize()
+    await repo.ensure_session("session-1")
+    await repo.add_message("session-1", role="assistant", content="Legacy answer")
+    await repo.save_session("session-1")
+    await repo._connection.execute("DROP TABLE messages_fts")
+    await repo._connection.commit()
+    await repo.close()
+
+    reopened = ChatRepository(path)
+    await reopened.initialize()
+    try:
+        results = await reopened.search_conversations("legacy")
+        assert [result["session_id"] for result in results] == ["session-1"]
+    finally:
+        await reopened.close()
+
+
+@pytest.mark.anyio
+async def test_reads_do_not_wait_for_open_write(repository):
+    await repository.add_message("session-1", role="user", content="committed")
+
+    writer = repository._connection
+    await writer.execute("BEGIN IMMEDIATE")
+    await writer.execute(
+        "INSERT INTO messages(session_id, role, content) VALUES (?, ?, ?)",
+        ("session-1", "user", "pending"),
+    )
+    try:
+        messages = await asyncio.wait_for(
+            repository.get_messages("session-1"), timeout=1
+        )
+        assert [message["content"] for message in messages] == ["committed"]
+    finally:
+        await writer.rollback()
+
+
+@pytest.mark.anyio
+async def test_pooled_readers_are_read_only(repository):
+    async with repository._readers.acquire() as reader:
+        with pytest.raises(sqlite3.OperationalError):
+            await reader.execute("DELETE FROM messages")
+
+
+@pytest.mark.anyio
+async def test_detail_metadata_is_split_and_skippable(repository):
+    usage = {"prompt_tokens": 12, "completion_tokens": 3}
+    await repository.add_message(
+        "session-1",
+        role="assistant",
+        content="hi",
+        metadata={"usage": usage, "reasoning": "thinking", "model": "m1"},
+    )
+
+    [full] = await repository.get_messages("session-1")
+    assert full["usage"] == usage
+    assert full["reasoning"] == "thinking"
+    assert full["model"] == "m1"
+
+    [lean] = await repository.get_messages("session-1", include_details=False)
+    assert "usage" not in lean and "reasoning" not in lean
+    assert lean["model"] == "m1"
+
+    single = await repository.get_message("session-1", full["message_id"])
+    assert single["usage"] == usage
+
+
+@pytest.mark.anyio
+async def test_unreadable_detail_metadata_is_skipped(repository):
+    message_id, _ = await repository.add_message(
+        "session-1",
+        role="assistant",
+        content="hi",
+        metadata={"usage": {"prompt_tokens": 1}, "model": "m1"},
+    )
+    # zstd-compressed msgpack that cannot be decoded here.
+    await repository._connection.execute(
+        "UPDATE messages SET metadata_detail = ? WHERE id = ?",
+        (bytes([0x82]) + b"not zstd", message_id),
+    )
+    await repository._connection.commit()
+
+    [message] = await repository.get_messages("session-1")
+    assert message["content"] == "hi"
+    assert message["model"] == "m1"
+    assert "usage" not in message
+
+
+@pytest.mark.anyio
+async def test_lone_surrogates_in_structured_content_and_metadata(repository):
+    content = [{"type": "text", "text": "cut off \ud83d"}]
+    await repository.add_message(
+        "session-1",
+        role="assistant",
+        content=content,
+        metadata={"model": "m1", "reasoning": "half \ud83d"},
+    )
+
+    [message] = await repository.get_messages("session-1")
+    assert message["content"] == content
+    assert message["reasoning"] == "half \ud83d"
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.backend.repository import ChatRepository
+from src.backend.services.session_archive import (
+    SessionArchive,
+    archive_inactive_sessions,
+    restore_archived_session,
+)
+
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+async def stores(tmp_path):
+    repo = ChatRepository(tmp_path / "chat.db")
+    archive = SessionArchive(tmp_path / "archive.db")
+    await repo.initialize()
+    await archive.initialize()
+    try:
+        yield repo, archive
+    finally:
+        await archive.close()
+        await repo.close()
+
+
+async def _add_session(repo: ChatRepository, session_id: str, *, idle_days: int):
+    await repo.ensure_session(session_id)
+    await repo.add_message(session_id, role="user", content=f"hello from {session_id}")
+    await repo.add_message(
+        session_id,
+        role="assistant",
+        content="hi",
+        metadata={"usage": {"total_tokens": 3}},
+    )
+    await repo._connection.execute(
+        "UPDATE conversations SET last_activity_at = ? WHERE session_id = ?",
+        (
+            (NOW - timedelta(days=idle_days)).strftime("%Y-%m-%d %H:%M:%S"),
+            session_id,
+        ),
+    )
+    await repo._connection.commit()
+
+
+@pytest.mark.anyio
+async def test_archives_only_idle_unsaved_sessions(stores):
+    repo, archive = stores
+    await _add_session(repo, "kiosk_old", idle_days=40)
+    await _add_session(repo, "kiosk_recent", idle_days=2)
+    await _add_session(repo, "saved_old", idle_days=40)
+    await repo.save_session("saved_old", title="Keep")
+    await _add_session(repo, "with_attachment", idle_days=40)
+    await repo.add_attachment(
+        attachment_id="att-1",
+        session_id="with_attachment",
+        storage_path="a/b",
+        mime_type="image/png",
+        size_bytes=1,
+        display_url="u",
+        delivery_url="u",
+    )
+    await repo._connection.execute(
+        "UPDATE conversations SET last_activity_at = '2026-04-01 00:00:00' "
+        "WHERE session_id = 'saved_old'"
+    )
+    await repo._connection.commit()
+
+    moved = await archive_inactive_sessions(
+        repo, archive, older_than=timedelta(days=30), now=NOW
+    )
+
+    assert moved == 1
+    assert not await repo.session_exists("kiosk_old")
+    for session_id in ("kiosk_recent", "saved_old", "with_attachment"):
+        assert await repo.session_exists(session_id)
+    assert await archive.load("kiosk_old") is not None
+    assert await archive.load("kiosk_recent") is None
+
+
+@pytest.mark.anyio
+async def test_restore_brings_session_back(stores):
+    repo, archive = stores
+    await _add_session(repo, "voice_old", idle_days=40)
+    [original_user, original_assistant] = await repo.get_messages("voice_old")
+    await archive_inactive_sessions(
+        repo, archive, older_than=timedelta(days=30), now=NOW
+    )
+    assert await repo.get_messages("voice_old") == []
+
+    assert await restore_archived_session(repo, archive, "voice_old")
+
+    restored = await repo.get_messages("voice_old")
+    assert [message["message_id"] for message in restored] == [
+        original_user["message_id"],
+        original_assistant["message_id"],
+    ]
+    assert restored[1]["usage"] == {"total_tokens": 3}
+    assert await archive.load("voice_old") is None
+    assert not await restore_archived_session(repo, archive, "voice_old")
+
+    await repo.save_session("voice_old", title="Back")
+    results = await repo.list_saved_conversations(search="hello")
+    assert [result["session_id"] for result in results] == ["voice_old"]
+
+
+@pytest.mark.anyio
+async def test_failed_import_keeps_concurrent_writes(stores):
+    repo, _ = stores
+    await _add_session(repo, "voice_old", idle_days=40)
+    await repo.ensure_session("kiosk")
+    other_id, _ = await repo.add_message("kiosk", role="user", content="before")
+    snapshot = await repo.export_session("voice_old")
+    await repo.clear_session("voice_old")
+    # Reuse an id that is already taken so the import fails part-way through.
+    snapshot["tables"]["messages"][-1]["id"] = other_id
+
+    results = await asyncio.gather(
+        repo.import_session(snapshot),
+        repo.add_message("kiosk", role="user", content="during"),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[0], sqlite3.IntegrityError)
+    assert not await repo.session_exists("voice_old")
+    messages = await repo.get_messages("kiosk")
+    assert [message["content"] for message in messages] == ["before", "during"]
+
+
+@pytest.mark.anyio
+async def test_legacy_database_is_only_vacuumed_on_request(tmp_path):
+    path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(path)
+    legacy.execute("CREATE TABLE legacy (value TEXT)")
+    legacy.commit()
+    legacy.close()
+
+    repo = ChatRepository(path)
+    await repo.initialize()
+    try:
+        await repo.compact_storage()
+        assert not await repo._incremental_vacuum_enabled()
+
+        assert await repo.enable_incremental_vacuum()
+        assert await repo._incremental_vacuum_enabled()
+        assert not await repo.enable_incremental_vacuum()
+        await repo.compact_storage()
+    finally:
+        await repo.close()
@@ -1,9 +1,25 @@
 """Tests for streaming handler functionality."""
 
+import asyncio
+import json
 from typing import Any
 
+import pytest
+from pydantic import SecretStr
+
+import backend.chat.streaming.content_builder as content_builder_module
+import backend.chat.streaming.handler as handler_module
+from backend.chat.streaming.content_builder import AssistantContentBuilder
+from backend.chat.streaming.handler import StreamingHandler, _fragment_event
+from backend.chat.streaming.context_window import (
+    ContextWindow,
+    estimate_message_tokens,
+)
 from backend.chat.streaming.tooling import finalize_tool_calls as _finalize_tool_calls
 from backend.chat.streaming.tooling import merge_tool_calls as _merge_tool_calls
+from backend.config import Settings
+from backend.openrouter import OpenRouterError
+from backend.schemas.chat import ChatCompletionRequest
 
 
 class TestFinalizeToolCalls:
@@ -192,3 +208,332 @@ class TestMergeToolCalls:
         deltas = [{"index": 0, "rationale": ""}]
         _merge_tool_calls(accumulator=accumulator, deltas=deltas)
         assert "rationale" not in accumulator[0]
+
+
+class TestAssistantContentBuilder:
+    """Image fragments are persisted in the background, in order."""
+
+    @pytest.mark.asyncio
+    async def test_scheduled_fragments_run_concurrently(self, monkeypatch):
+        started: list[str] = []
+        release = asyncio.Event()
+
+        async def fake_process(fragment, session_id, service, http_client):
+            started.append(fragment["name"])
+            await release.wait()
+            name = fragment["name"]
+            return {"type": "image_url", "image_url": {"url": name}}, f"att-{name}"
+
+        monkeypatch.setattr(
+            content_builder_module, "process_assistant_fragment", fake_process
+        )
+
+        builder = AssistantContentBuilder()
+        builder.add_text("Here:")
+        builder.schedule_structured([{"name": "a"}], "s1", None)
+        builder.add_text("and")
+        builder.schedule_structured([{"name": "b"}], "s1", None)
+        await asyncio.sleep(0)
+        assert started == ["a", "b"]
+
+        finalize = asyncio.create_task(builder.finalize("s1", None))
+        await asyncio.sleep(0)
+        assert not finalize.done()
+        release.set()
+        content = await finalize
+
+        assert content == [
+            {"type": "text", "text": "Here:"},
+            {"type": "image_url", "image_url": {"url": "a"}},
+            {"type": "text", "text": "and"},
+            {"type": "image_url", "image_url": {"url": "b"}},
+        ]
+        assert builder.created_attachment_ids == ("att-a", "att-b")
+
+
+def _image_chunk() -> dict[str, Any]:
+    return {
+        "event": "message",
+        "data": json.dumps(
+            {"choices": [{"delta": {"content": [{"type": "image_url", "name": "a"}]}}]}
+        ),
+    }
+
+
+class _FakeAttachmentService:
+    def __init__(self) -> None:
+        self.stored: list[str] = []
+        self.deleted: list[str] = []
+
+    async def delete(self, attachment_id: str) -> bool:
+        self.deleted.append(attachment_id)
+        return True
+
+
+class _ScriptedClient:
+    """Replays one scripted stream per ``stream_chat_raw`` call."""
+
+    def __init__(self, *streams: Any) -> None:
+        self._streams = list(streams)
+
+    async def stream_chat_raw(self, payload: dict[str, Any]):
+        async for event in self._streams.pop(0)():
+            yield event
+
+
+class TestAbandonedFragments:
+    """Images persisted for an abandoned response are deleted, not leaked."""
+
+    @pytest.fixture
+    def service(self, monkeypatch) -> _FakeAttachmentService:
+        service = _FakeAttachmentService()
+        settings = Settings(openrouter_api_key=SecretStr("test"))
+        monkeypatch.setattr(handler_module, "get_settings", lambda: settings)
+
+        async def fake_process(fragment, session_id, attachment_service, http_client):
+            # Still uploading when the turn is abandoned.
+            await asyncio.sleep(0.01)
+            attachment_id = f"att-{fragment['name']}"
+            attachment_service.stored.append(attachment_id)
+            return {"type": "image_url", "image_url": {"url": "stored"}}, attachment_id
+
+        monkeypatch.setattr(
+            content_builder_module, "process_assistant_fragment", fake_process
+        )
+        return service
+
+    def _stream(self, client: _ScriptedClient, service: _FakeAttachmentService):
+        handler = StreamingHandler(
+            client,  # type: ignore[arg-type]
+            object(),  # type: ignore[arg-type]
+            object(),  # type: ignore[arg-type]
+            default_model="test/model",
+            attachment_service=service,  # type: ignore[arg-type]
+        )
+        request = ChatCompletionRequest(messages=[{"role": "user", "content": "hi"}])
+        tools = [{"type": "function", "function": {"name": "search"}}]
+        return handler.stream_conversation("s1", request, [], tools, None)
+
+    @pytest.mark.asyncio
+    async def test_disconnect_deletes_uploaded_images(self, service):
+        async def image_then_more():
+            yield _image_chunk()
+            await asyncio.Event().wait()
+
+        stream = self._stream(_ScriptedClient(image_then_more), service)
+        await stream.__anext__()
+        await stream.aclose()
+
+        assert service.stored == ["att-a"]
+        assert service.deleted == ["att-a"]
+
+    @pytest.mark.asyncio
+    async def test_retry_without_tools_deletes_uploaded_images(self, service):
+        deleted_before_retry: list[str] = []
+
+        async def image_then_tool_error():
+            yield _image_chunk()
+            raise OpenRouterError(404, "No endpoints found that support tool use")
+
+        async def retry():
+            deleted_before_retry.extend(service.deleted)
+            raise RuntimeError("stop after the retry starts")
+            yield  # pragma: no cover
+
+        stream = self._stream(_ScriptedClient(image_then_tool_error, retry), service)
+        with pytest.raises(RuntimeError, match="retry starts"):
+            async for _ in stream:
+                pass
+
+        assert service.stored == ["att-a"]
+        assert deleted_before_retry == ["att-a"]
+
+
+def _tool_turn(base_id: int, question: str, output: str) -> list[dict[str, Any]]:
+    return [
+        {"role": "user", "content": question, "message_id": base_id},
+        {
+            "role": "assistant",
+            "content": "",
+            "message_id": base_id + 1,
+            "tool_calls": [
+                {
+                    "id": f"call_{base_id}",
+                    "type": "function",
+                    "function": {"name": "search", "arguments": "{}"},
+                }
+            ],
+        },
+        {
+            "role": "tool",
+            "content": output,
+            "tool_call_id": f"call_{base_id}",
+            "message_id": base_id + 2,
+        },
+        {"role": "assistant", "content": "Done.", "message_id": base_id + 3},
+    ]
+
+
+class TestContextWindow:
+    """Old tool output and turns are compacted to fit the token budget."""
+
+    def _conversation(self) -> list[dict[str, Any]]:
+        return [
+            {"role": "system", "content": "Be helpful."},
+            *_tool_turn(1, "first question", "x" * 8000),
+            *_tool_turn(10, "second question", "y" * 8000),
+            *_tool_turn(20, "third question", "z" * 8000),
+        ]
+
+    def test_fitting_conversation_is_unchanged(self):
+        window = ContextWindow()
+        messages = self._conversation()
+        assert window.fit("s1", messages, budget=100_000) == messages
+
+    def test_old_tool_results_are_summarised(self):
+        window = ContextWindow(keep_recent_turns=2)
+        messages = self._conversation()
+
+        fitted = window.fit("s1", messages, budget=4500)
+
+        assert len(fitted) == len(messages)
+        old_tool = fitted[3]
+        assert old_tool["tool_call_id"] == "call_1"
+        assert old_tool["content"].startswith("x" * 100)
+        assert "characters omitted" in old_tool["content"]
+        # The two most recent turns are untouched.
+        assert fitted[5:] == messages[5:]
+        assert messages[3]["content"] == "x" * 8000
+
+    def test_oldest_turns_fold_into_digest(self):
+        window = ContextWindow(keep_recent_turns=1)
+        messages = self._conversation()
+
+        fitted = window.fit("s1", messages, budget=2000)
+
+        assert fitted[0] == messages[0]
+        digest = fitted[1]
+        assert digest["role"] == "system"
+        assert "- user: first question" in digest["content"]
+        assert "- user: second question" in digest["content"]
+        assert "(called tools: search)" in digest["content"]
+        assert fitted[2:] == messages[9:]
+
+    def test_long_agentic_turn_is_compacted(self):
+        window = ContextWindow(keep_recent_turns=2, keep_recent_tool_results=2)
+        messages: list[dict[str, Any]] = [
+            {"role": "system", "content": "Be helpful."},
+            {"role": "user", "content": "research this", "message_id": 1},
+        ]
+        for hop in range(40):
+            base_id = 10 + hop * 2
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": "",
+                    "message_id": base_id,
+                    "tool_calls": [
+                        {
+                            "id": f"call_{hop}",
+                            "type": "function",
+                            "function": {"name": "search", "arguments": "{}"},
+                        }
+                    ],
+                }
+            )
+            messages.append(
+                {
+                    "role": "tool",
+                    "content": f"{hop}:" + "r" * 20000,
+                    "tool_call_id": f"call_{hop}",
+                    "message_id": base_id + 1,
+                }
+            )
+
+        fitted = window.fit("s1", messages, budget=15000)
+
+        assert sum(estimate_message_tokens(message) for message in fitted) <= 15000
+        assert len(fitted) == len(messages)
+        assert fitted[:2] == messages[:2]
+        # The latest tool results are sent verbatim, older ones shortened.
+        assert fitted[-2:] == messages[-2:]
+        assert fitted[-4] == messages[-4]
+        assert (
+            fitted[3]["content"]
+            == "[20002 characters omitted to fit the context window]"
+        )
+        assert [message.get("tool_call_id") for message in fitted] == [
+            message.get("tool_call_id") for message in messages
+        ]
+
+    def test_budget_uses_context_length(self):
+        window = ContextWindow(default_budget_tokens=5000)
+        assert window.budget_for(None) == 5000
+        assert window.budget_for(100_000) == 75_000
+        assert window.budget_for(100_000, max_output_tokens=50_000) == 50_000
+        assert window.budget_for(100_000, reserved_tokens=1_000) == 74_000
+
+    @pytest.mark.asyncio
+    async def test_resolved_fragments_are_released_in_order(self, monkeypatch):
+        gates = {name: asyncio.Event() for name in "abc"}
+        gates["c"].set()
+
+        async def fake_process(fragment, session_id, service, http_client):
+            name = fragment["name"]
+            await gates[name].wait()
+            if name == "b":
+                raise RuntimeError("upload failed")
+            return (
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"/stored/{name}"},
+                    "metadata": {"attachment_id": f"att-{name}"},
+                },
+                f"att-{name}",
+            )
+
+        monkeypatch.setattr(
+            content_builder_module, "process_assistant_fragment", fake_process
+        )
+
+        builder = AssistantContentBuilder()
+        builder.schedule_structured([{"name": "a"}, "caption"], "s1", None)
+        builder.schedule_structured([{"name": "b"}], "s1", None)
+        builder.schedule_structured([{"name": "c"}], "s1", None, announce=False)
+        assert builder.take_resolved() == []
+
+        gates["b"].set()
+        await asyncio.sleep(0)
+        # "b" is done but waits behind the unfinished "a".
+        assert builder.take_resolved() == []
+
+        gates["a"].set()
+        await asyncio.sleep(0)
+        assert builder.take_resolved() == [
+            {
+                "type": "image_url",
+                "image_url": {"url": "/stored/a"},
+                "metadata": {"attachment_id": "att-a"},
+            },
+            {"type": "text", "text": "caption"},
+            {"name": "b"},
+        ]
+        assert await builder.wait_resolved() == []
+        await builder.discard_pending(None)
+
+
+def test_fragment_event_is_a_content_delta():
+    event = _fragment_event([{"type": "text", "text": "hi"}])
+
+    assert event["event"] == "message"
+    assert json.loads(event["data"]) == {
+        "choices": [
+            {
+                "delta": {
+                    "content": [{"type": "text", "text": "hi"}],
+                    "role": "assistant",
+                },
+                "index": 0,
+            }
+        ]
+    }
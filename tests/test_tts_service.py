@@ -0,0 +1,63 @@
+"""Tests for the TTS service connection pooling."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import backend.services.tts_service as tts_module
+from backend.schemas.client_settings import TtsSettings
+from backend.services.tts_service import TTSService
+
+
+@pytest.fixture
+def tts_service(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    service = TTSService()
+    monkeypatch.setattr(
+        service, "get_settings", lambda settings_client_id="voice": TtsSettings()
+    )
+    return service
+
+
+@pytest.mark.asyncio
+async def test_pipeline_uses_shared_pooled_client(tts_service):
+    captured: list[object] = []
+
+    async def fake_process(**kwargs):
+        captured.append(kwargs["openai_client"])
+
+    with patch.object(tts_module, "process_tts_streams", side_effect=fake_process):
+        for _ in range(2):
+            stop = asyncio.Event()
+            chunk_q, _audio_q, seg_task, tts_task = (
+                await tts_service.create_streaming_pipeline(stop)
+            )
+            await chunk_q.put(None)
+            await asyncio.gather(seg_task, tts_task)
+
+    assert len(captured) == 2
+    assert captured[0] is not None
+    assert captured[0] is captured[1]
+    assert captured[0] is tts_service.openai_client
+    await tts_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_warm_connection_rewarms_after_idle(tts_service, monkeypatch):
+    ping = AsyncMock()
+    monkeypatch.setattr(tts_service, "_ping", ping)
+
+    await tts_service.warm_connection()
+    tts_service._last_request_at = tts_module.time.monotonic()
+    await tts_service.warm_connection()
+    assert ping.await_count == 1
+
+    tts_service._last_request_at -= tts_module._REWARM_AFTER_IDLE_SECONDS + 1
+    await tts_service.warm_connection()
+    assert ping.await_count == 2
+
+    await tts_service.aclose()
+    assert tts_service._keepalive_task is None
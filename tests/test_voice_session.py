@@ -0,0 +1,301 @@
+"""Tests for voice session helpers."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import backend.services.stt_service as stt_module
+from backend.schemas.client_settings import SttSettings
+from backend.services.stt_service import DeepgramSession
+from backend.services.voice_session import (
+    OutboundQueue,
+    ResponseTurn,
+    VoiceConnectionManager,
+    normalize_transcript,
+)
+
+
+def test_normalize_transcript_ignores_case_and_punctuation() -> None:
+    assert normalize_transcript("What's the  weather?") == "what's the weather"
+    assert ResponseTurn("Turn on the lights.").matches("turn on the lights")
+    assert not ResponseTurn("Turn on the").matches("Turn on the lights")
+
+
+@pytest.mark.asyncio
+async def test_speculative_turn_holds_output_until_commit() -> None:
+    sent: list[str] = []
+
+    async def record(value: str) -> None:
+        sent.append(value)
+
+    turn = ResponseTurn("hello", speculative=True)
+    assert turn.turn_id is not None
+    await turn.emit(lambda: record("a"))
+    await turn.emit(lambda: record("b"))
+    assert sent == []
+
+    await turn.commit()
+    assert sent == ["a", "b"]
+
+    await turn.emit(lambda: record("c"))
+    assert sent == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_turn_drops_output_and_stops_task() -> None:
+    sent: list[str] = []
+
+    async def record(value: str) -> None:
+        sent.append(value)
+
+    turn = ResponseTurn("hello", speculative=True)
+
+    async def work() -> None:
+        await turn.emit(lambda: record("held"))
+        await turn.wait_confirmed()
+        await record("after-confirm")
+
+    turn.task = asyncio.create_task(work())
+    await asyncio.sleep(0)
+    await turn.cancel()
+
+    assert turn.task.cancelled()
+    assert turn.cancel_event.is_set()
+    assert sent == []
+
+
+def test_committed_turn_starts_confirmed() -> None:
+    turn = ResponseTurn("hello")
+    assert turn.committed
+    assert turn.turn_id is None
+
+
+def test_deepgram_session_dispatches_eager_turn_events() -> None:
+    transcripts: list[tuple[str, bool]] = []
+    eager: list[str] = []
+    resumed: list[bool] = []
+
+    session = DeepgramSession(
+        api_key="test",
+        session_id="s1",
+        on_transcript=lambda text, final: transcripts.append((text, final)),
+        on_eager_end_of_turn=eager.append,
+        on_turn_resumed=lambda: resumed.append(True),
+        eager_eot_threshold=0.5,
+    )
+
+    session._handle_message(SimpleNamespace(event="EagerEndOfTurn", transcript="hi"))
+    session._handle_message(SimpleNamespace(event="TurnResumed", transcript="hi"))
+    session._handle_message(SimpleNamespace(event="EndOfTurn", transcript="hi there"))
+
+    assert eager == ["hi"]
+    assert resumed == [True]
+    assert transcripts[-1] == ("hi there", True)
+
+
+class _FakeDeepgramSession:
+    instances: list["_FakeDeepgramSession"] = []
+
+    def __init__(self, api_key, session_id, on_transcript, event_loop=None, **kwargs):
+        self.session_id = session_id
+        self.on_transcript = on_transcript
+        self.config = kwargs
+        self.paused = False
+        self.closed = False
+        self.connect_calls = 0
+        _FakeDeepgramSession.instances.append(self)
+
+    def connect(self) -> bool:
+        self.connect_calls += 1
+        return True
+
+    def pause(self) -> None:
+        self.paused = True
+
+    def resume(self) -> None:
+        self.paused = False
+
+    def close(self) -> None:
+        self.closed = True
+
+    bind_callbacks = DeepgramSession.bind_callbacks
+
+    @property
+    def is_connected(self) -> bool:
+        return not self.closed
+
+
+@pytest.fixture
+def stt_service(monkeypatch):
+    _FakeDeepgramSession.instances = []
+    monkeypatch.setattr(stt_module, "DeepgramSession", _FakeDeepgramSession)
+    monkeypatch.setattr(
+        stt_module,
+        "get_settings",
+        lambda: SimpleNamespace(
+            deepgram_api_key=SimpleNamespace(get_secret_value=lambda: "key")
+        ),
+    )
+    service = stt_module.STTService()
+    monkeypatch.setattr(
+        service,
+        "get_settings",
+        lambda settings_client_id="voice": SttSettings(mode="conversation"),
+    )
+    return service
+
+
+@pytest.mark.asyncio
+async def test_create_session_activates_prewarmed_standby(stt_service) -> None:
+    await stt_service.prewarm("kiosk_1")
+    standby = _FakeDeepgramSession.instances[0]
+    assert standby.paused
+
+    received: list[tuple[str, bool]] = []
+    assert await stt_service.create_session(
+        "kiosk_1", lambda text, final: received.append((text, final))
+    )
+
+    assert stt_service.sessions["kiosk_1"] is standby
+    assert not standby.paused
+    assert standby.session_id == "kiosk_1"
+    standby.on_transcript("hello", True)
+    assert received == [("hello", True)]
+
+    # The pool is replenished in the background with a fresh standby
+    await stt_service._prewarm_tasks["kiosk_1"]
+    assert len(_FakeDeepgramSession.instances) == 2
+    assert stt_service._standby["kiosk_1"][0][1] is _FakeDeepgramSession.instances[1]
+
+    await stt_service.discard_standby("kiosk_1")
+    assert _FakeDeepgramSession.instances[1].closed
+
+
+@pytest.mark.asyncio
+async def test_stale_standby_is_not_reused(stt_service, monkeypatch) -> None:
+    await stt_service.prewarm("kiosk_1")
+    stale = _FakeDeepgramSession.instances[0]
+
+    monkeypatch.setattr(
+        stt_service,
+        "get_settings",
+        lambda settings_client_id="voice": SttSettings(
+            mode="conversation", eot_threshold=0.8
+        ),
+    )
+    assert await stt_service.create_session("kiosk_1", lambda text, final: None)
+
+    assert stt_service.sessions["kiosk_1"] is not stale
+    await asyncio.sleep(0.05)
+    assert stale.closed
+    await stt_service.discard_standby("kiosk_1")
+
+
+async def _drain(queue: OutboundQueue) -> list[dict]:
+    drained = []
+    while len(queue):
+        drained.append(await queue.get())
+    return drained
+
+
+@pytest.mark.asyncio
+async def test_outbound_queue_orders_control_audio_text() -> None:
+    queue = OutboundQueue()
+    await queue.put({"type": "transcript", "text": "hi", "is_final": False})
+    await queue.put({"type": "tts_audio_chunk", "chunk_index": 0})
+    await queue.put({"type": "stt_session_ready"})
+
+    types = [message["type"] for message in await _drain(queue)]
+    assert types == ["stt_session_ready", "tts_audio_chunk", "transcript"]
+
+
+@pytest.mark.asyncio
+async def test_outbound_queue_keeps_tts_start_behind_previous_audio() -> None:
+    queue = OutboundQueue()
+    await queue.put({"type": "tts_audio_start", "turn": 1})
+    await queue.put({"type": "tts_audio_chunk", "chunk_index": 0, "is_last": False})
+    await queue.put({"type": "tts_audio_chunk", "chunk_index": 1, "is_last": True})
+    await queue.put({"type": "tts_audio_start", "turn": 2})
+    await queue.put({"type": "state", "state": "SPEAKING"})
+
+    drained = await _drain(queue)
+    assert [(message["type"], message.get("turn")) for message in drained] == [
+        ("state", None),
+        ("tts_audio_start", 1),
+        ("tts_audio_chunk", None),
+        ("tts_audio_chunk", None),
+        ("tts_audio_start", 2),
+    ]
+    assert drained[3]["is_last"]
+
+
+@pytest.mark.asyncio
+async def test_outbound_queue_merges_states_and_interrupt_purges_audio() -> None:
+    queue = OutboundQueue()
+    await queue.put({"type": "state", "state": "PROCESSING"})
+    await queue.put({"type": "tts_audio_chunk", "chunk_index": 0})
+    await queue.put({"type": "state", "state": "SPEAKING"})
+    await queue.put({"type": "interrupt_tts"})
+
+    drained = await _drain(queue)
+    assert drained == [
+        {"type": "state", "state": "SPEAKING"},
+        {"type": "interrupt_tts"},
+    ]
+    assert queue.dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_outbound_queue_drops_interim_transcripts_then_blocks_audio() -> None:
+    queue = OutboundQueue(max_audio=1, max_text=1)
+    await queue.put({"type": "transcript", "text": "he", "is_final": False})
+    await queue.put({"type": "transcript", "text": "hello", "is_final": True})
+    assert queue.dropped == 1
+
+    await queue.put({"type": "tts_audio_chunk", "chunk_index": 0})
+    blocked = asyncio.create_task(
+        queue.put({"type": "tts_audio_chunk", "chunk_index": 1})
+    )
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    assert (await queue.get())["chunk_index"] == 0
+    await asyncio.wait_for(blocked, timeout=1)
+    queue.close()
+    assert await queue.get() is None
+
+
+class _SlowWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent: list[dict] = []
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_text(self, text: str) -> None:
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+
+@pytest.mark.asyncio
+async def test_send_message_does_not_wait_for_slow_socket() -> None:
+    manager = VoiceConnectionManager()
+    slow = _SlowWebSocket(delay=0.2)
+    fast = _SlowWebSocket()
+    await manager.connect(slow, "kiosk_slow")
+    await manager.connect(fast, "kiosk_fast")
+
+    await asyncio.wait_for(manager.broadcast({"type": "alarm_trigger"}), timeout=0.05)
+    await asyncio.sleep(0.01)
+    assert fast.sent == [{"type": "alarm_trigger"}]
+    assert slow.sent == []
+
+    await asyncio.sleep(0.3)
+    assert slow.sent == [{"type": "alarm_trigger"}]
+    manager.disconnect("kiosk_slow")
+    manager.disconnect("kiosk_fast")